@@ -0,0 +1,86 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from app.api.deps import Database
+from app.core.config import get_settings
+from app.services.archive_service import archive_batch
+
+logger = logging.getLogger(__name__)
+
+# Pausa entre lotes, para os cadastros não esperarem uma sequência de transações de arquivamento
+ARCHIVE_BATCH_PAUSE_SECONDS = 0.05
+
+
+class ArchiveWorker:
+    """
+    Tarefa periódica que move dados antigos para as tabelas de arquivo.
+    
+    A cada ARCHIVE_INTERVAL_SECONDS, arquiva em lotes (archive_batch, uma
+    transação por lote) as caixas fechadas há mais de ARCHIVE_AFTER_DAYS
+    dias e as peças reprovadas mais antigas que isso, até não restar nada.
+    Se o banco falhar, o restante fica para o próximo intervalo.
+    """
+    
+    def __init__(self, db: Database, after_days: float, batch_boxes: int, interval_seconds: float):
+        self.db = db
+        self.after_days = after_days
+        self.batch_boxes = batch_boxes
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def start(self) -> None:
+        """Inicia a tarefa no loop atual"""
+        self._loop = asyncio.get_running_loop()
+        self._task = self._loop.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Encerra a tarefa; um lote em andamento é desfeito por inteiro"""
+        if self._task is not None and self._loop is asyncio.get_running_loop():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+    
+    async def run_once(self) -> Dict[str, int]:
+        """Arquiva tudo o que passou do prazo, um lote por vez"""
+        cutoff = datetime.utcnow() - timedelta(days=self.after_days)
+        totals = {"boxes": 0, "pieces": 0, "batches": 0}
+        while True:
+            result = await self.db.run(archive_batch, cutoff, self.batch_boxes)
+            totals["boxes"] += result["boxes"]
+            totals["pieces"] += result["pieces"]
+            totals["batches"] += 1
+            if result["done"]:
+                return totals
+            await asyncio.sleep(ARCHIVE_BATCH_PAUSE_SECONDS)
+    
+    async def _run(self) -> None:
+        while True:
+            try:
+                totals = await self.run_once()
+                if totals["boxes"] or totals["pieces"]:
+                    logger.info(
+                        "Arquivamento: %d caixa(s) e %d peça(s) em %d lote(s)",
+                        totals["boxes"], totals["pieces"], totals["batches"]
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Falha no arquivamento: %s. Nova tentativa em %.0fs", e, self.interval_seconds)
+            await asyncio.sleep(self.interval_seconds)
+
+
+_settings = get_settings()
+
+archive_worker: Optional[ArchiveWorker] = None
+if _settings.archive_after_days > 0:
+    archive_worker = ArchiveWorker(
+        Database(use_async=_settings.database_async),
+        _settings.archive_after_days,
+        _settings.archive_batch_boxes,
+        _settings.archive_interval_seconds
+    )
@@ -0,0 +1,124 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+from fastapi import Request, Response
+from pydantic import BaseModel
+from sqlmodel import Session
+from app.api.deps import Database
+from app.core.config import get_settings
+from app.services.generation_service import current_generation
+
+# Corpos maiores que isso não são guardados (uma página grande não expulsa o resto)
+MAX_CACHED_BODY_BYTES = 1024 * 1024
+
+CacheKey = Tuple[str, str]
+
+
+class ResponseCache:
+    """
+    Cache LRU limitado de corpos JSON já serializados, por URL.
+    
+    Cada entrada guarda a versão dos dados (DataGeneration) em que foi
+    gerada; só é usada enquanto a versão no banco for a mesma. Como a
+    versão é lida do banco a cada requisição, escritas feitas por outros
+    workers também invalidam o cache deste processo.
+    """
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, Tuple[Tuple[str, int], bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: CacheKey, version: Tuple[str, int]) -> Optional[bytes]:
+        """Retorna o corpo guardado para a URL se for da versão informada"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+    
+    def put(self, key: CacheKey, version: Tuple[str, int], body: bytes) -> None:
+        """Guarda o corpo, descartando as entradas menos usadas acima do limite"""
+        if self.max_entries <= 0 or len(body) > MAX_CACHED_BODY_BYTES:
+            return
+        with self._lock:
+            self._entries[key] = (version, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache(get_settings().response_cache_size)
+
+
+def make_etag(version: Tuple[str, int]) -> str:
+    """ETag forte a partir da versão dos dados (epoch do banco + generation)"""
+    epoch, generation = version
+    return f'"{epoch[:12]}-{generation}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Confere o cabeçalho If-None-Match (lista de ETags, fracas ou não, ou *)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _load_versioned_body(
+    session: Session,
+    key: CacheKey,
+    if_none_match: Optional[str],
+    fn: Callable[..., BaseModel],
+    args: Tuple[Any, ...]
+) -> Tuple[str, Optional[bytes]]:
+    # A versão é lida antes dos dados: o corpo nunca é mais antigo que o ETag
+    version = current_generation(session)
+    etag = make_etag(version)
+    if etag_matches(if_none_match, etag):
+        return etag, None
+    
+    body = response_cache.get(key, version)
+    if body is None:
+        body = fn(session, *args).model_dump_json().encode()
+        response_cache.put(key, version, body)
+    return etag, body
+
+
+async def versioned_response(
+    request: Request,
+    db: Database,
+    fn: Callable[..., BaseModel],
+    *args: Any
+) -> Response:
+    """
+    Responde um GET com ETag, 304 Not Modified e cache de corpo por versão.
+    
+    - If-None-Match igual à versão atual: 304 sem recalcular nada
+    - Corpo da mesma versão no cache: devolvido sem executar fn
+    - Caso contrário: executa fn(session, *args), serializa e guarda no cache
+    
+    Cache-Control: no-cache faz o navegador revalidar (If-None-Match) a cada uso.
+    
+    Args:
+        request: Requisição (URL e If-None-Match)
+        db: Acesso ao banco do endpoint
+        fn: Função síncrona que recebe a sessão e retorna o modelo de resposta
+        
+    Returns:
+        Response JSON (200) ou 304
+    """
+    key = (request.url.path, request.url.query)
+    etag, body = await db.run(_load_versioned_body, key, request.headers.get("if-none-match"), fn, args)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if body is None:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+from app.core.config import get_settings
+from app.db.engine import (
+    engine, async_engine, replica_engine, async_replica_engine,
+    warm_up_engine, warm_up_async_engine
+)
+from app.db.init_db import prepare_database
+
+logger = logging.getLogger(__name__)
+
+# Primeira espera entre tentativas de reconexão (dobra a cada falha, até o intervalo)
+RECONNECT_INITIAL_DELAY_SECONDS = 0.5
+
+
+class DatabaseSupervisor:
+    """
+    Acompanha o estado do banco em segundo plano para o endpoint /ready.
+    
+    Uma tarefa de fundo prepara o banco (migrações e linhas de controle) e
+    aquece o pool, em threads do threadpool; o startup não espera por ela,
+    então /health responde desde o início e /ready responde 503 até o banco
+    ficar pronto. Depois, a tarefa verifica a conexão a cada
+    DB_HEALTH_INTERVAL_SECONDS; se o banco cair (ou não estava disponível
+    no startup), marca como não pronto e tenta de novo com espera
+    crescente. /ready apenas lê o estado guardado, sem consultar o banco.
+    """
+    
+    def __init__(self, interval_seconds: float, warmup_connections: int):
+        self.interval_seconds = interval_seconds
+        self.warmup_connections = warmup_connections
+        self.ready = False
+        self.schema_version: Optional[int] = None
+        self.checked_at: Optional[datetime] = None
+        self.error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def state(self) -> Dict[str, Any]:
+        """Último estado conhecido do banco"""
+        return {
+            "ready": self.ready,
+            "schema_version": self.schema_version,
+            "checked_at": self.checked_at,
+            "error": self.error,
+        }
+    
+    def start(self) -> None:
+        """Inicia a tarefa de fundo (preparação do banco e verificação periódica) no loop atual"""
+        self.ready = False
+        self.schema_version = None
+        self.checked_at = None
+        self.error = None
+        self._loop = asyncio.get_running_loop()
+        self._task = self._loop.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Encerra a verificação periódica"""
+        if self._task is not None and self._loop is asyncio.get_running_loop():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+    
+    def _mark(self, ready: bool, error: Optional[Exception] = None) -> None:
+        self.ready = ready
+        self.error = None if error is None else f"{type(error).__name__}: {error}"
+        self.checked_at = datetime.utcnow()
+    
+    @staticmethod
+    def _warm_up(connections: int) -> int:
+        opened = warm_up_engine(engine, connections)
+        if replica_engine is not None:
+            warm_up_engine(replica_engine, connections)
+        return opened
+    
+    async def _prepare(self) -> bool:
+        """Migrações, linhas de controle e aquecimento do pool; False se o banco falhar"""
+        try:
+            self.schema_version = await run_in_threadpool(prepare_database)
+            opened = await run_in_threadpool(self._warm_up, self.warmup_connections)
+            if async_engine is not None:
+                opened = await warm_up_async_engine(async_engine, self.warmup_connections)
+            if async_replica_engine is not None:
+                await warm_up_async_engine(async_replica_engine, self.warmup_connections)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if self.ready or self.error is None:
+                logger.warning("Banco indisponível: %s. Reconexão em segundo plano.", e)
+            self._mark(False, e)
+            return False
+        logger.info("Banco pronto (schema versão %s, %d conexão(ões) aquecida(s))", self.schema_version, opened)
+        self._mark(True)
+        return True
+    
+    @staticmethod
+    def _ping() -> None:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    
+    async def _run(self) -> None:
+        delay = RECONNECT_INITIAL_DELAY_SECONDS
+        await self._prepare()
+        while True:
+            if self.ready:
+                await asyncio.sleep(self.interval_seconds)
+                try:
+                    await run_in_threadpool(self._ping)
+                    self._mark(True)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning("Banco indisponível: %s. Reconexão em segundo plano.", e)
+                    self._mark(False, e)
+                    delay = RECONNECT_INITIAL_DELAY_SECONDS
+            else:
+                await asyncio.sleep(delay)
+                if not await self._prepare():
+                    delay = min(delay * 2, self.interval_seconds)
+
+
+_settings = get_settings()
+
+db_supervisor = DatabaseSupervisor(_settings.db_health_interval_seconds, _settings.db_pool_warmup)
@@ -1,6 +1,20 @@
-from fastapi import Depends
+import logging
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, Sequence, Tuple, TypeVar
+from fastapi import Depends, Request
+from sqlalchemy import Row, Select
+from sqlalchemy.exc import DBAPIError
 from sqlmodel import Session
-from app.db.engine import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from app.api.replica import MIN_DATA_VERSION_HEADER, parse_data_version
+from app.core.config import get_settings
+from app.core.metrics import DB_REPLICA_READS
+from app.db.engine import engine, get_session, async_engine, replica_engine, async_replica_engine
+from app.services.generation_service import current_generation
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
 
 
 def get_db_session(session: Session = Depends(get_session)) -> Session:
@@ -11,3 +25,152 @@ def get_db_session(session: Session = Depends(get_session)) -> Session:
     """
     return session
 
+
+class Database:
+    """
+    Executa o trabalho de banco de um endpoint assíncrono.
+    
+    Os serviços (boxing, quality, report) continuam escritos sobre Session;
+    run() abre uma sessão, executa a função e fecha a sessão:
+    - Modo assíncrono (DATABASE_ASYNC=true): via AsyncSession.run_sync, sem
+      ocupar thread enquanto espera o banco
+    - Modo síncrono: em uma thread do threadpool, como os endpoints def
+    
+    A conexão volta ao pool ao fim de run(), e não só depois de enviada a
+    resposta.
+    
+    Com read_only=True (get_read_db) e DATABASE_REPLICA_URL configurada,
+    run() usa a réplica, desde que ela já tenha aplicado min_version (a
+    última escrita do cliente); caso contrário, ou se a réplica falhar,
+    usa o banco principal.
+    """
+    
+    def __init__(self, use_async: bool, read_only: bool = False, min_version: Optional[Tuple[str, int]] = None):
+        self.use_async = use_async
+        self.read_only = read_only
+        self.min_version = min_version
+    
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Executa fn(session, *args, **kwargs) em uma sessão própria.
+        
+        Args:
+            fn: Função síncrona que recebe a sessão como primeiro argumento
+            
+        Returns:
+            O retorno de fn
+        """
+        if self.use_async:
+            if self.read_only and async_replica_engine is not None:
+                try:
+                    async with AsyncSession(async_replica_engine) as async_session:
+                        served, result = await async_session.run_sync(
+                            _run_if_current, self.min_version, fn, args, kwargs
+                        )
+                except DBAPIError as e:
+                    _replica_failed(e)
+                else:
+                    if served:
+                        return result
+            async with AsyncSession(async_engine) as async_session:
+                return await async_session.run_sync(fn, *args, **kwargs)
+        if self.read_only and replica_engine is not None:
+            return await run_in_threadpool(_run_on_replica, self.min_version, fn, *args, **kwargs)
+        return await run_in_threadpool(_run_in_session, fn, *args, **kwargs)
+    
+    async def stream(self, statement: Select, chunk_size: int) -> AsyncIterator[Sequence[Row]]:
+        """
+        Executa a consulta com cursor no servidor e entrega as linhas em blocos.
+        
+        A sessão fica aberta até o último bloco ser consumido; apenas um
+        bloco de chunk_size linhas fica em memória por vez.
+        
+        Args:
+            statement: Consulta a executar
+            chunk_size: Linhas por bloco
+        """
+        if self.use_async:
+            async with AsyncSession(async_engine) as async_session:
+                result = await async_session.stream(statement.execution_options(yield_per=chunk_size))
+                async for partition in result.partitions():
+                    yield partition
+        else:
+            async for partition in iterate_in_threadpool(_iter_partitions(statement, chunk_size)):
+                yield partition
+
+
+def _run_in_session(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    with Session(engine) as session:
+        return fn(session, *args, **kwargs)
+
+
+def _run_if_current(
+    session: Session,
+    min_version: Optional[Tuple[str, int]],
+    fn: Callable[..., T],
+    args: Tuple[Any, ...],
+    kwargs: dict
+) -> Tuple[bool, Optional[T]]:
+    """
+    Executa fn na sessão da réplica se ela já refletir min_version.
+    
+    Returns:
+        (True, retorno de fn), ou (False, None) se a réplica estiver atrasada
+    """
+    if min_version is not None:
+        epoch, generation = current_generation(session)
+        if epoch != min_version[0] or generation < min_version[1]:
+            DB_REPLICA_READS.labels(target="primary_lag").inc()
+            return False, None
+    DB_REPLICA_READS.labels(target="replica").inc()
+    return True, fn(session, *args, **kwargs)
+
+
+def _replica_failed(error: DBAPIError) -> None:
+    DB_REPLICA_READS.labels(target="primary_error").inc()
+    logger.warning("Falha na réplica; consultando o banco principal: %s", str(error).splitlines()[0])
+
+
+def _run_on_replica(min_version: Optional[Tuple[str, int]], fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    try:
+        with Session(replica_engine) as session:
+            served, result = _run_if_current(session, min_version, fn, args, kwargs)
+    except DBAPIError as e:
+        _replica_failed(e)
+    else:
+        if served:
+            return result
+    return _run_in_session(fn, *args, **kwargs)
+
+
+def _iter_partitions(statement: Select, chunk_size: int) -> Iterator[Sequence[Row]]:
+    with Session(engine) as session:
+        result = session.execute(statement.execution_options(yield_per=chunk_size))
+        for partition in result.partitions():
+            yield partition
+
+
+def get_db() -> Database:
+    """
+    Dependency injection para endpoints assíncronos.
+    
+    Usa o engine assíncrono quando DATABASE_ASYNC está ativo; caso contrário,
+    uma Session síncrona executada no threadpool.
+    """
+    return Database(use_async=get_settings().database_async)
+
+
+def get_read_db(request: Request) -> Database:
+    """
+    Dependency injection para endpoints somente leitura.
+    
+    Usa a réplica (DATABASE_REPLICA_URL), se configurada. O cabeçalho
+    X-Min-Data-Version (o X-Data-Version da última escrita do cliente)
+    garante que o cliente veja as próprias escritas: se a réplica ainda não
+    as aplicou, a consulta vai para o banco principal.
+    """
+    return Database(
+        use_async=get_settings().database_async,
+        read_only=True,
+        min_version=parse_data_version(request.headers.get(MIN_DATA_VERSION_HEADER))
+    )
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+from app.api.deps import Database
+from app.core.config import get_settings
+from app.schemas.piece import PieceCreate, PieceResponse
+from app.services.generation_service import CommittedVersion, committed_version
+from app.services.ingestion_service import ingest_piece, ingest_pieces_group
+
+logger = logging.getLogger(__name__)
+
+PendingPiece = Tuple[PieceCreate, asyncio.Future]
+
+
+def _create_pieces_group(session: Session, pieces_data: List[PieceCreate]) -> List[Optional[PieceResponse]]:
+    # Mantém os atributos após o commit: as respostas saem sem recarregar cada peça
+    session.expire_on_commit = False
+    pieces = ingest_pieces_group(session, pieces_data)
+    return [PieceResponse.model_validate(piece) if piece else None for piece in pieces]
+
+
+def _create_piece_alone(session: Session, piece_data: PieceCreate) -> Optional[PieceResponse]:
+    piece = ingest_piece(session, piece_data)
+    return PieceResponse.model_validate(piece) if piece else None
+
+
+class PieceGroupCommitter:
+    """
+    Agrupa cadastros unitários de peças concorrentes em uma única transação.
+    
+    Cada requisição entra em uma fila e aguarda o próprio resultado. Uma
+    única tarefa gravadora retira da fila a primeira peça, espera até
+    `window` segundos (ou até `max_pieces` peças) por outras e grava o
+    grupo com ingest_pieces_group: avaliação, alocação em caixas e um
+    único commit. Enquanto um grupo é gravado, as próximas requisições se
+    acumulam para o grupo seguinte.
+    
+    Se o grupo falhar por conflito de ID com outro processo, as peças são
+    regravadas uma a uma para que cada requisição receba o resultado que
+    teria sem o agrupamento.
+    """
+    
+    def __init__(self, db: Database, window: float, max_pieces: int):
+        self.db = db
+        self.window = window
+        self.max_pieces = max_pieces
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def _ensure_started(self) -> None:
+        """Inicia a tarefa gravadora no loop atual (uma por loop/processo)"""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+    
+    async def submit(self, piece_data: PieceCreate) -> Optional[PieceResponse]:
+        """
+        Enfileira a peça e aguarda a gravação do grupo.
+        
+        Returns:
+            Peça cadastrada, ou None se já existir peça com o mesmo ID
+        """
+        self._ensure_started()
+        future = self._loop.create_future()
+        self._queue.put_nowait((piece_data, future))
+        result, version = await future
+        
+        # O commit foi feito na tarefa gravadora: repassa a versão gravada à
+        # requisição (cabeçalho X-Data-Version)
+        tracker = committed_version.get()
+        if tracker is not None and version is not None:
+            tracker.record(version)
+        return result
+    
+    async def stop(self) -> None:
+        """Encerra a tarefa gravadora (desligamento da aplicação)"""
+        if self._task is not None and self._loop is asyncio.get_running_loop():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _collect(self) -> List[PendingPiece]:
+        """Aguarda a primeira peça e junta as que chegarem dentro da janela"""
+        group = [await self._queue.get()]
+        deadline = self._loop.time() + self.window
+        while len(group) < self.max_pieces:
+            if not self._queue.empty():
+                group.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                group.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return group
+    
+    async def _run(self) -> None:
+        while True:
+            group = await self._collect()
+            # Requisições canceladas (cliente desconectou) saem do grupo
+            group = [(piece_data, future) for piece_data, future in group if not future.done()]
+            if group:
+                await self._write(group)
+    
+    async def _write(self, group: List[PendingPiece]) -> None:
+        tracker = CommittedVersion()
+        token = committed_version.set(tracker)
+        try:
+            await self._write_group(group, tracker)
+        finally:
+            committed_version.reset(token)
+    
+    async def _write_group(self, group: List[PendingPiece], tracker: CommittedVersion) -> None:
+        try:
+            results = await self.db.run(_create_pieces_group, [piece_data for piece_data, _ in group])
+        except IntegrityError:
+            logger.warning("Conflito ao gravar grupo de %d peças; gravando individualmente", len(group))
+            for piece_data, future in group:
+                try:
+                    result = await self.db.run(_create_piece_alone, piece_data)
+                except Exception as e:
+                    _set_exception(future, e)
+                else:
+                    _set_result(future, result, tracker.version)
+            return
+        except Exception as e:
+            for _, future in group:
+                _set_exception(future, e)
+            return
+        
+        for (_, future), result in zip(group, results):
+            _set_result(future, result, tracker.version)
+
+
+def _set_result(future: asyncio.Future, result: Optional[PieceResponse], version: Optional[Tuple[str, int]]) -> None:
+    if not future.done():
+        future.set_result((result, version))
+
+
+def _set_exception(future: asyncio.Future, error: Exception) -> None:
+    if not future.done():
+        future.set_exception(error)
+
+
+_settings = get_settings()
+
+piece_committer = PieceGroupCommitter(
+    Database(use_async=_settings.database_async),
+    window=_settings.group_commit_window_ms / 1000,
+    max_pieces=_settings.group_commit_max_pieces
+)
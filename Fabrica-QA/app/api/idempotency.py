@@ -0,0 +1,86 @@
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+from fastapi import HTTPException
+from app.core.config import get_settings
+from app.core.metrics import PIECES_DUPLICATE
+from app.schemas.piece import PieceCreate, PieceResponse
+
+
+class RecentPieces:
+    """
+    LRU limitado das peças cadastradas recentemente por este processo.
+    
+    Guarda a resposta original de cada cadastro (POST /pieces), por ID.
+    Um ID presente indica um provável reenvio (o CLP repete a requisição
+    após um timeout): o endpoint confirma a peça por chave primária em vez
+    de tentar a gravação. O filtro é só uma dica: peças removidas por outro
+    worker continuam nele até a confirmação falhar. A garantia de
+    unicidade continua sendo do banco (insert_piece_if_absent).
+    """
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, PieceResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, piece_id: str) -> Optional[PieceResponse]:
+        """Resposta original do cadastro do ID, se estiver no filtro (pode estar desatualizada)"""
+        with self._lock:
+            piece = self._entries.get(piece_id)
+            if piece is not None:
+                self._entries.move_to_end(piece_id)
+            return piece
+    
+    def put(self, piece: PieceResponse) -> None:
+        """Registra um cadastro, descartando os IDs menos recentes acima do limite"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[piece.id] = piece
+            self._entries.move_to_end(piece.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def discard(self, piece_ids: Iterable[str]) -> None:
+        """Remove IDs do filtro (peças removidas podem ser cadastradas de novo)"""
+        with self._lock:
+            for piece_id in piece_ids:
+                self._entries.pop(piece_id, None)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+recent_pieces = RecentPieces(get_settings().recent_piece_ids_size)
+
+
+def is_same_piece(piece_data: PieceCreate, stored: PieceResponse) -> bool:
+    """Indica se o cadastro é um reenvio da peça gravada (mesmos dados de medição)"""
+    return (
+        piece_data.peso == stored.peso
+        and piece_data.cor == stored.cor
+        and piece_data.comprimento == stored.comprimento
+    )
+
+
+def duplicate_piece_response(piece_data: PieceCreate, stored: Optional[PieceResponse], source: str) -> PieceResponse:
+    """
+    Resposta de um cadastro com ID já existente.
+    
+    Com IDEMPOTENT_INGEST, um reenvio com os mesmos dados devolve a peça
+    gravada; caso contrário (ou com dados diferentes), 400.
+    
+    Args:
+        piece_data: Peça recebida
+        stored: Peça gravada com o mesmo ID (None se não foi consultada)
+        source: Onde o ID repetido foi detectado: "recent" ou "database"
+    """
+    PIECES_DUPLICATE.labels(source=source).inc()
+    if get_settings().idempotent_ingest and stored is not None and is_same_piece(piece_data, stored):
+        return stored
+    raise HTTPException(
+        status_code=400,
+        detail=f"Peça com ID '{piece_data.id}' já existe"
+    )
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from app.api.deps import Database
+from app.core.config import get_settings
+from app.services.ingest_journal_service import IngestJournal, apply_journal_entries
+
+logger = logging.getLogger(__name__)
+
+# Intervalo de verificação do journal quando não há avisos de novos cadastros
+# (entradas gravadas por outros workers ou reservas expiradas)
+INGEST_POLL_SECONDS = 0.5
+
+# Espera máxima entre tentativas enquanto o banco estiver indisponível
+INGEST_MAX_BACKOFF_SECONDS = 5.0
+
+
+class IngestConsumer:
+    """
+    Tarefa que esvazia o journal de ingestão no banco em lotes.
+    
+    Reserva até INGEST_BATCH_SIZE entradas, grava peças e tickets em uma
+    transação (apply_journal_entries) e só então remove as entradas do
+    journal. Se o banco falhar, as entradas voltam para a fila e a gravação
+    é tentada de novo com espera crescente; o POST /ingest continua
+    respondendo 202 enquanto isso.
+    """
+    
+    def __init__(self, journal: IngestJournal, db: Database):
+        self.journal = journal
+        self.db = db
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def start(self) -> None:
+        """Inicia a tarefa no loop atual"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Encerra a tarefa; entradas reservadas voltam à fila quando a reserva expirar"""
+        if self._task is not None and self._loop is asyncio.get_running_loop():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+    
+    def notify(self) -> None:
+        """Avisa que há cadastro novo no journal (evita esperar o próximo poll)"""
+        if self._wakeup is not None and self._loop is asyncio.get_running_loop():
+            self._wakeup.set()
+    
+    async def _run(self) -> None:
+        backoff = INGEST_POLL_SECONDS
+        while True:
+            entries = await run_in_threadpool(self.journal.claim)
+            if not entries:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), INGEST_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            try:
+                result = await self.db.run(apply_journal_entries, entries)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    "Falha ao gravar %d cadastros do journal: %s. Nova tentativa em %.1fs",
+                    len(entries), e, backoff
+                )
+                await run_in_threadpool(self.journal.release, entries)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, INGEST_MAX_BACKOFF_SECONDS)
+                continue
+            
+            backoff = INGEST_POLL_SECONDS
+            await run_in_threadpool(self.journal.complete, entries)
+            logger.debug("Journal: %s", result)
+
+
+_settings = get_settings()
+
+ingest_consumer: Optional[IngestConsumer] = None
+if _settings.ingest_journal_path:
+    ingest_consumer = IngestConsumer(
+        IngestJournal(_settings.ingest_journal_path),
+        Database(use_async=_settings.database_async)
+    )
@@ -0,0 +1,107 @@
+import logging
+import time
+from fastapi import Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import get_settings
+from app.core.metrics import (
+    DB_SECONDS_PER_REQUEST,
+    DB_STATEMENTS_PER_REQUEST,
+    HTTP_REQUEST_SECONDS,
+    HTTP_REQUESTS_IN_PROGRESS,
+    RequestStats,
+    current_request_stats,
+)
+
+logger = logging.getLogger(__name__)
+
+# Rota usada nas métricas quando a URL não corresponde a nenhum endpoint
+# (evita um label por URL inválida)
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI com as métricas por requisição.
+    
+    Mede duração e requisições em andamento e, a partir dos eventos do
+    engine (app.core.metrics.instrument_engine), a quantidade de comandos
+    SQL e o tempo de banco de cada requisição. As métricas usam o caminho
+    da rota (ex.: /api/v1/pieces/{piece_id}), não a URL. Requisições acima
+    de SLOW_REQUEST_MS ou SLOW_REQUEST_SQL são registradas no log com a
+    lista de comandos executados.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        settings = get_settings()
+        self.slow_seconds = settings.slow_request_ms / 1000
+        self.slow_statements = settings.slow_request_sql
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        method = scope["method"]
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        status_code = 500
+        event_stream = False
+        
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code, event_stream
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                event_stream = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", [])
+                )
+            await send(message)
+        
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method=method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_progress.dec()
+            current_request_stats.reset(token)
+            
+            route = scope.get("route")
+            route_path = getattr(route, "path", UNMATCHED_ROUTE)
+            HTTP_REQUEST_SECONDS.labels(method=method, route=route_path, status=str(status_code)).observe(elapsed)
+            DB_STATEMENTS_PER_REQUEST.labels(route=route_path).observe(stats.statements)
+            DB_SECONDS_PER_REQUEST.labels(route=route_path).observe(stats.db_seconds)
+            
+            # Conexões SSE (/events) duram o tempo que o cliente ficar conectado
+            if not event_stream and self._is_slow(elapsed, stats):
+                self._log_slow_request(scope, status_code, elapsed, stats)
+    
+    def _is_slow(self, elapsed: float, stats: RequestStats) -> bool:
+        return (
+            (self.slow_seconds > 0 and elapsed >= self.slow_seconds)
+            or (self.slow_statements > 0 and stats.statements >= self.slow_statements)
+        )
+    
+    def _log_slow_request(self, scope: Scope, status_code: int, elapsed: float, stats: RequestStats) -> None:
+        path = scope["path"]
+        if scope.get("query_string"):
+            path += "?" + scope["query_string"].decode("latin-1")
+        statements = "\n".join(
+            f"  [{seconds * 1000:.1f} ms] {statement}" for seconds, statement in stats.logged
+        )
+        omitted = stats.statements - len(stats.logged)
+        if omitted > 0:
+            statements += f"\n  ... mais {omitted} comando(s)"
+        logger.warning(
+            "Requisição lenta: %s %s -> %d em %.1f ms, %d comando(s) SQL em %.1f ms\n%s",
+            scope["method"], path, status_code, elapsed * 1000,
+            stats.statements, stats.db_seconds * 1000, statements
+        )
+
+
+def metrics_response() -> Response:
+    """Métricas do processo no formato de exposição do Prometheus"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
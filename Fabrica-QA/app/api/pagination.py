@@ -0,0 +1,75 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Literal, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlmodel import Session, select, func
+
+# Modos de cálculo do total em listagens paginadas
+CountMode = Literal["none", "exact", "estimate"]
+
+
+def encode_cursor(position: datetime, key: Any) -> str:
+    """
+    Gera um cursor opaco para paginação por chave (keyset).
+    
+    Args:
+        position: Valor da coluna de ordenação do último item da página
+        key: Chave primária do último item (desempate)
+        
+    Returns:
+        Cursor em base64 url-safe
+    """
+    raw = json.dumps([position.isoformat(), key]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, Any]:
+    """
+    Lê um cursor gerado por encode_cursor.
+    
+    Raises:
+        HTTPException 400 se o cursor for inválido
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position, key = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(position), key
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido")
+
+
+def count_rows(session: Session, column: Any, filters: list, mode: CountMode) -> Tuple[Optional[int], bool]:
+    """
+    Calcula o total de linhas de uma listagem conforme o modo pedido.
+    
+    - none: não calcula (mantém a requisição proporcional ao tamanho da página)
+    - exact: SELECT COUNT no banco
+    - estimate: estimativa do planejador no PostgreSQL (EXPLAIN); nos demais
+      bancos cai para a contagem exata
+    
+    Args:
+        session: Sessão do banco de dados
+        column: Coluna a contar (ex.: Piece.id)
+        filters: Condições WHERE da listagem
+        mode: Modo de cálculo
+        
+    Returns:
+        Tupla (total, estimado). total é None no modo "none".
+    """
+    if mode == "none":
+        return None, False
+    
+    if mode == "estimate" and session.get_bind().dialect.name == "postgresql":
+        statement = select(column).where(*filters)
+        compiled = statement.compile(
+            dialect=session.get_bind().dialect,
+            compile_kwargs={"literal_binds": True}
+        )
+        plan = session.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+        return int(plan[0]["Plan"]["Plan Rows"]), True
+    
+    total = session.exec(select(func.count(column)).where(*filters)).one()
+    return total, False
@@ -0,0 +1,61 @@
+from typing import Optional, Tuple
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.services.generation_service import CommittedVersion, committed_version
+
+# Cabeçalho das respostas de escrita com a versão dos dados gravada
+DATA_VERSION_HEADER = "X-Data-Version"
+
+# Cabeçalho das consultas: versão mínima que a resposta deve refletir
+# (o X-Data-Version da última escrita do cliente)
+MIN_DATA_VERSION_HEADER = "X-Min-Data-Version"
+
+
+def format_data_version(version: Tuple[str, int]) -> str:
+    """Versão dos dados (epoch, generation) no formato dos cabeçalhos: <epoch>-<generation>"""
+    epoch, generation = version
+    return f"{epoch}-{generation}"
+
+
+def parse_data_version(value: Optional[str]) -> Optional[Tuple[str, int]]:
+    """Lê o cabeçalho X-Min-Data-Version; None se ausente ou inválido"""
+    if not value:
+        return None
+    epoch, _, generation = value.strip().rpartition("-")
+    if not epoch or not generation.isdigit():
+        return None
+    return epoch, int(generation)
+
+
+class DataVersionMiddleware:
+    """
+    Middleware ASGI de leitura das próprias escritas com réplica.
+    
+    Registra a versão dos dados gravada pelos commits da requisição
+    (generation_service.committed_version) e a devolve no cabeçalho
+    X-Data-Version. O cliente envia esse valor em X-Min-Data-Version nas
+    consultas seguintes; as rotas de leitura só usam a réplica se ela já
+    tiver aplicado essa versão (ver app.api.deps.get_read_db).
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        tracker = CommittedVersion()
+        token = committed_version.set(tracker)
+        
+        async def send_with_version(message: Message) -> None:
+            if message["type"] == "http.response.start" and tracker.version is not None:
+                headers = MutableHeaders(scope=message)
+                headers[DATA_VERSION_HEADER] = format_data_version(tracker.version)
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_version)
+        finally:
+            committed_version.reset(token)
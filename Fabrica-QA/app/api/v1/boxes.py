@@ -1,67 +1,172 @@
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import tuple_
 from sqlmodel import Session, select
-from app.api.deps import get_db_session
+from app.api.cache import versioned_response
+from app.api.deps import Database, get_db, get_read_db
+from app.api.pagination import CountMode, count_rows, encode_cursor, decode_cursor
+from app.models.archive import ArchivedBox, ArchivedPiece
 from app.models.box import Box
 from app.models.piece import Piece
 from app.models.enums import BoxStatus, PieceStatus
-from app.schemas.box import BoxResponse, BoxDetailResponse, BoxListResponse, BoxDeleteResponse, ReallocatedPieceInfo
-from app.services.boxing_service import reallocate_pieces_from_box
+from app.schemas.box import (
+    BoxResponse,
+    BoxDetailResponse,
+    BoxListResponse,
+    BoxDeleteResponse,
+    BoxBatchDeleteResponse,
+    ReallocatedPieceInfo,
+)
+from app.services.boxing_service import delete_boxes
+from app.services.export_service import (
+    EXPORT_CHUNK_SIZE,
+    EXPORT_MEDIA_TYPES,
+    BOX_EXPORT_COLUMNS,
+    ExportFormat,
+    export_chunks,
+    box_record,
+    boxes_export_statement,
+)
 
 router = APIRouter(prefix="/boxes", tags=["Caixas"])
 
+# Máximo de caixas por DELETE /boxes?ids=...
+MAX_DELETE_BOX_IDS = 1000
+
 
 @router.get("", response_model=BoxListResponse)
-def list_boxes(
+async def list_boxes(
+    request: Request,
     status: Optional[BoxStatus] = Query(None, description="Filtrar por status (open/closed)"),
-    session: Session = Depends(get_db_session)
-) -> BoxListResponse:
+    partition: Optional[str] = Query(None, description="Filtrar por partição (ex.: azul, com BOX_PARTITION_BY=cor)"),
+    limit: int = Query(100, ge=1, le=1000, description="Limite de resultados"),
+    cursor: Optional[str] = Query(None, description="Cursor retornado em next_cursor da página anterior"),
+    count: CountMode = Query("none", description="Cálculo do total: none, exact ou estimate"),
+    db: Database = Depends(get_read_db)
+) -> Response:
     """
-    Lista caixas cadastradas.
+    Lista caixas cadastradas, das mais recentes para as mais antigas.
     
-    - Filtro opcional por status (open/closed)
-    - Por padrão, lista todas as caixas
-    """
-    statement = select(Box)
+    - Filtros opcionais por status (open/closed) e partição
+    - Paginação por cursor: use o next_cursor da resposta para buscar a próxima página
+    - total só é calculado quando pedido (count=exact, ou count=estimate
+      para estimativa do PostgreSQL)
+    - Responde com ETag; envie If-None-Match para receber 304 se nada mudou
     
+    O número de consultas não depende da quantidade de caixas: a contagem de
+    peças vem de box.piece_count.
+    """
+    return await versioned_response(request, db, _list_boxes, status, partition, limit, cursor, count)
+
+
+def _list_boxes(
+    session: Session,
+    status: Optional[BoxStatus],
+    partition: Optional[str],
+    limit: int,
+    cursor: Optional[str],
+    count: CountMode
+) -> BoxListResponse:
+    filters = []
     if status:
-        statement = statement.where(Box.status == status)
+        filters.append(Box.status == status)
+    if partition is not None:
+        filters.append(Box.partition == partition)
     
-    boxes = session.exec(statement.order_by(Box.opened_at.desc())).all()
+    # Total, se pedido (respeitando apenas os filtros de status e partição)
+    total, total_estimated = count_rows(session, Box.id, filters, count)
     
-    # Calcula piece_count para cada caixa
-    box_responses = []
-    for box in boxes:
-        piece_count_statement = select(Piece).where(
-            Piece.box_id == box.id,
-            Piece.status == PieceStatus.APPROVED
-        )
-        pieces = session.exec(piece_count_statement).all()
-        piece_count = len(pieces)
-        
-        box_responses.append(BoxResponse(
+    statement = select(Box).where(*filters)
+    
+    if cursor:
+        opened_at, last_id = decode_cursor(cursor)
+        if not isinstance(last_id, int):
+            raise HTTPException(status_code=400, detail="Cursor de paginação inválido")
+        # Comparação de tuplas: o banco posiciona no índice (opened_at, id)
+        statement = statement.where(tuple_(Box.opened_at, Box.id) < tuple_(opened_at, last_id))
+    
+    # Busca um item a mais para saber se existe próxima página
+    statement = statement.order_by(Box.opened_at.desc(), Box.id.desc()).limit(limit + 1)
+    boxes = session.exec(statement).all()
+    
+    next_cursor = None
+    if len(boxes) > limit:
+        boxes = boxes[:limit]
+        next_cursor = encode_cursor(boxes[-1].opened_at, boxes[-1].id)
+    
+    box_responses = [
+        BoxResponse(
             id=box.id,
+            partition=box.partition,
             status=box.status,
             opened_at=box.opened_at,
             closed_at=box.closed_at,
-            piece_count=piece_count
-        ))
+            piece_count=box.piece_count
+        )
+        for box in boxes
+    ]
     
     return BoxListResponse(
         items=box_responses,
-        total=len(box_responses)
+        total=total,
+        total_estimated=total_estimated,
+        next_cursor=next_cursor
+    )
+
+
+@router.get("/export")
+async def export_boxes(
+    format: ExportFormat = Query("ndjson", description="Formato: ndjson ou csv"),
+    status: Optional[BoxStatus] = Query(None, description="Filtrar por status (open/closed)"),
+    desde: Optional[datetime] = Query(None, description="Abertas a partir desta data (inclusive)"),
+    ate: Optional[datetime] = Query(None, description="Abertas antes desta data"),
+    partition: Optional[str] = Query(None, description="Filtrar por partição"),
+    db: Database = Depends(get_db)
+) -> StreamingResponse:
+    """
+    Exporta caixas em NDJSON ou CSV, em ordem de abertura.
+    
+    A resposta é enviada em streaming, lendo o banco em blocos de
+    EXPORT_CHUNK_SIZE linhas. Para as peças de uma caixa, use
+    /pieces/export?box_id=...
+    """
+    statement = boxes_export_statement(status, desde, ate, partition)
+    chunks = export_chunks(
+        db.stream(statement, EXPORT_CHUNK_SIZE),
+        box_record,
+        BOX_EXPORT_COLUMNS,
+        format
+    )
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=boxes.{format}"}
     )
 
 
 @router.get("/{box_id}", response_model=BoxDetailResponse)
-def get_box(
+async def get_box(
     box_id: int,
-    session: Session = Depends(get_db_session)
-) -> BoxDetailResponse:
+    request: Request,
+    db: Database = Depends(get_read_db)
+) -> Response:
     """
     Retorna detalhes de uma caixa específica com lista de peças.
+    
+    Responde com ETag; envie If-None-Match para receber 304 se nada mudou.
     """
+    return await versioned_response(request, db, _get_box, box_id)
+
+
+def _get_box(session: Session, box_id: int) -> BoxDetailResponse:
     box = session.get(Box, box_id)
+    piece_model = Piece
+    if not box:
+        # Caixas arquivadas continuam disponíveis para consulta, com as peças do arquivo
+        box = session.get(ArchivedBox, box_id)
+        piece_model = ArchivedPiece
     if not box:
         raise HTTPException(
             status_code=404,
@@ -69,16 +174,17 @@ def get_box(
         )
     
     # Busca peças da caixa
-    statement = select(Piece).where(
-        Piece.box_id == box.id,
-        Piece.status == PieceStatus.APPROVED
+    statement = select(piece_model).where(
+        piece_model.box_id == box.id,
+        piece_model.status == PieceStatus.APPROVED
     )
-    pieces = session.exec(statement.order_by(Piece.created_at)).all()
+    pieces = session.exec(statement.order_by(piece_model.created_at)).all()
     
     from app.schemas.piece import PieceResponse
     
     return BoxDetailResponse(
         id=box.id,
+        partition=box.partition,
         status=box.status,
         opened_at=box.opened_at,
         closed_at=box.closed_at,
@@ -87,10 +193,53 @@ def get_box(
     )
 
 
+@router.delete("", response_model=BoxBatchDeleteResponse, status_code=200)
+async def delete_boxes_batch(
+    ids: str = Query(..., description="IDs das caixas separados por vírgula (ex.: 1,2,3)"),
+    db: Database = Depends(get_db)
+) -> BoxBatchDeleteResponse:
+    """
+    Exclui várias caixas em uma única transação.
+    
+    As peças de todas as caixas são realocadas juntas, como na exclusão de
+    uma caixa: completam a caixa aberta existente e depois formam caixas
+    novas de 10 peças. Se algum ID não existir, nenhuma caixa é excluída (404).
+    """
+    try:
+        box_ids = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=422,
+            detail="ids deve ser uma lista de inteiros separados por vírgula"
+        )
+    if not box_ids or len(box_ids) > MAX_DELETE_BOX_IDS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Informe de 1 a {MAX_DELETE_BOX_IDS} IDs de caixa"
+        )
+    
+    return await db.run(_delete_boxes_batch, box_ids)
+
+
+def _delete_boxes_batch(session: Session, box_ids: List[int]) -> BoxBatchDeleteResponse:
+    result = _delete_boxes(session, box_ids)
+    piece_count = len(result["reallocated_pieces"])
+    message = f"{len(result['deleted_box_ids'])} caixa(s) excluída(s) com sucesso."
+    if piece_count:
+        message += f" {piece_count} peça(s) foram realocadas ({result['boxes_created']} nova(s) caixa(s))."
+    
+    return BoxBatchDeleteResponse(
+        message=message,
+        deleted_box_ids=result["deleted_box_ids"],
+        reallocated_pieces=[ReallocatedPieceInfo(**item) for item in result["reallocated_pieces"]],
+        boxes_created=result["boxes_created"]
+    )
+
+
 @router.delete("/{box_id}", response_model=BoxDeleteResponse, status_code=200)
-def delete_box(
+async def delete_box(
     box_id: int,
-    session: Session = Depends(get_db_session)
+    db: Database = Depends(get_db)
 ) -> BoxDeleteResponse:
     """
     Exclui uma caixa cadastrada.
@@ -103,19 +252,11 @@ def delete_box(
     
     Retorna informações sobre peças realocadas e caixas criadas.
     """
-    box = session.get(Box, box_id)
-    if not box:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Caixa com ID '{box_id}' não encontrada"
-        )
-    
-    # Realoca peças da caixa antes de excluir
-    reallocation_info = reallocate_pieces_from_box(session, box)
-    
-    # Exclui a caixa
-    session.delete(box)
-    session.commit()
+    return await db.run(_delete_box, box_id)
+
+
+def _delete_box(session: Session, box_id: int) -> BoxDeleteResponse:
+    reallocation_info = _delete_boxes(session, [box_id])
     
     # Monta resposta
     if reallocation_info["reallocated_pieces"]:
@@ -145,3 +286,17 @@ def delete_box(
         boxes_created=reallocation_info["boxes_created"]
     )
 
+
+def _delete_boxes(session: Session, box_ids: List[int]) -> Dict[str, Any]:
+    """Exclui as caixas e confirma a transação, ou 404 se algum ID não existir"""
+    result = delete_boxes(session, box_ids)
+    if result["missing_box_ids"]:
+        missing = ", ".join(str(box_id) for box_id in result["missing_box_ids"])
+        if len(box_ids) == 1:
+            detail = f"Caixa com ID '{missing}' não encontrada"
+        else:
+            detail = f"Caixa(s) não encontrada(s): {missing}"
+        raise HTTPException(status_code=404, detail=detail)
+    
+    session.commit()
+    return result
@@ -0,0 +1,36 @@
+from typing import Optional
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from app.services.events_service import broker, sse_stream
+
+router = APIRouter(prefix="/events", tags=["Eventos"])
+
+
+@router.get("")
+async def stream_events(
+    types: Optional[str] = Query(
+        None,
+        description="Tipos ou famílias separados por vírgula (ex.: box,report.delta). Padrão: todos"
+    )
+) -> StreamingResponse:
+    """
+    Transmite eventos de produção em tempo real (Server-Sent Events).
+    
+    Cada mensagem tem `event: <tipo>` e `data` JSON com id, type, at e data:
+    - piece.created / piece.deleted: peças cadastradas ou removidas
+    - box.opened / box.closed / box.reopened / box.updated / box.deleted:
+      estado da caixa (id, status, piece_count, opened_at, closed_at)
+    - pieces.moved: peças movidas entre caixas (piece_ids, from_box_id, to_box_id)
+    - report.delta: variação dos agregados do relatório final
+    - stream.resync: o cliente ficou para trás e eventos foram descartados;
+      recarregue os dados
+      
+    Os eventos são publicados somente após o commit da transação.
+    """
+    type_filter = [t.strip() for t in types.split(",") if t.strip()] if types else None
+    subscriber = broker.subscribe(type_filter)
+    return StreamingResponse(
+        sse_stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
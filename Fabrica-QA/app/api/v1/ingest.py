@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+from app.api.deps import Database, get_db
+from app.api.ingest_worker import ingest_consumer
+from app.models.enums import IngestStatus
+from app.models.ingest_ticket import IngestTicket
+from app.models.archive import ArchivedPiece
+from app.models.piece import Piece
+from app.schemas.ingest import IngestAcceptedResponse, IngestStatusResponse
+from app.schemas.piece import PieceCreate, PieceResponse
+
+router = APIRouter(prefix="/ingest", tags=["Ingestão"])
+
+
+def _require_journal():
+    if ingest_consumer is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Fila de ingestão desativada (defina INGEST_JOURNAL_PATH)"
+        )
+    return ingest_consumer
+
+
+@router.post("", response_model=IngestAcceptedResponse, status_code=202)
+async def enqueue_piece(
+    piece_data: PieceCreate
+) -> IngestAcceptedResponse:
+    """
+    Recebe uma peça para cadastro assíncrono e responde 202 com um ticket.
+    
+    A peça é gravada em um journal local durável antes da resposta, sem
+    depender do banco; uma tarefa em segundo plano cadastra as peças no
+    banco em lotes (mesma avaliação e alocação de POST /pieces). Consulte
+    o resultado em GET /ingest/{ticket}.
+    
+    Requer INGEST_JOURNAL_PATH configurado (503 caso contrário).
+    """
+    consumer = _require_journal()
+    entry = await run_in_threadpool(consumer.journal.append, piece_data)
+    consumer.notify()
+    return IngestAcceptedResponse(ticket=entry.ticket, received_at=entry.received_at)
+
+
+@router.get("/{ticket}", response_model=IngestStatusResponse)
+async def get_ingest_status(
+    ticket: str,
+    db: Database = Depends(get_db)
+) -> IngestStatusResponse:
+    """
+    Retorna a situação de um cadastro recebido por POST /ingest.
+    
+    - queued: ainda no journal, aguardando gravação no banco
+    - created: peça cadastrada (dados atuais da peça em `piece`)
+    - duplicate: já existia peça com o mesmo ID; nada foi alterado
+    """
+    consumer = _require_journal()
+    # Journal antes do banco: o consumidor só remove a entrada do journal
+    # depois do commit, então um ticket fora do journal já está no banco
+    entry = await run_in_threadpool(consumer.journal.get, ticket)
+    if entry is not None:
+        return IngestStatusResponse(
+            ticket=entry.ticket,
+            piece_id=entry.piece.id,
+            status=IngestStatus.QUEUED,
+            received_at=entry.received_at
+        )
+    
+    response = await db.run(_get_processed_ticket, ticket)
+    if response is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Ticket '{ticket}' não encontrado"
+        )
+    return response
+
+
+def _get_processed_ticket(session: Session, ticket: str):
+    record = session.get(IngestTicket, ticket)
+    if record is None:
+        return None
+    
+    piece = None
+    if record.status == IngestStatus.CREATED:
+        db_piece = session.get(Piece, record.piece_id) or session.get(ArchivedPiece, record.piece_id)
+        if db_piece is not None:
+            piece = PieceResponse.model_validate(db_piece)
+    
+    return IngestStatusResponse(
+        ticket=record.ticket,
+        piece_id=record.piece_id,
+        status=record.status,
+        received_at=record.received_at,
+        processed_at=record.processed_at,
+        piece=piece
+    )
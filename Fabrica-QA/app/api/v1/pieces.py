@@ -1,112 +1,307 @@
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import tuple_
 from sqlmodel import Session, select
-from app.api.deps import get_db_session
+from app.api.deps import Database, get_db, get_read_db
+from app.api.group_commit import piece_committer
+from app.api.idempotency import duplicate_piece_response, recent_pieces
+from app.core.config import get_settings
+from app.api.pagination import CountMode, count_rows, encode_cursor, decode_cursor
+from app.models.archive import ArchivedPiece
 from app.models.piece import Piece
-from app.models.enums import PieceStatus
-from app.schemas.piece import PieceCreate, PieceResponse, PieceListResponse, PieceDeleteResponse
-from app.services.quality_service import evaluate_piece
-from app.services.boxing_service import find_or_create_open_box, allocate_piece_to_box, remove_piece_from_box
+from app.models.enums import PieceStatus, RejectionReason
+from app.schemas.piece import (
+    PieceCreate,
+    PieceResponse,
+    PieceListResponse,
+    PieceDeleteResponse,
+    PieceBulkDelete,
+    PieceBulkDeleteResponse,
+    PieceMoveGroup,
+    PieceBatchCreate,
+    PieceBatchResponse,
+)
+from app.services.quality_service import REASON_BITS
+from app.services.boxing_service import remove_piece_from_box
+from app.services.deletion_service import delete_pieces
+from app.services.ingestion_service import ingest_piece, ingest_pieces_batch
+from app.services.report_service import record_pieces_deleted
+from app.services.export_service import (
+    EXPORT_CHUNK_SIZE,
+    EXPORT_MEDIA_TYPES,
+    PIECE_EXPORT_COLUMNS,
+    ExportFormat,
+    export_chunks,
+    piece_record,
+    pieces_export_statement,
+)
 
 router = APIRouter(prefix="/pieces", tags=["Peças"])
 
+# Máximo de peças removidas por DELETE /pieces
+MAX_BULK_DELETE_PIECES = 50000
+
 
 @router.post("", response_model=PieceResponse, status_code=201)
-def create_piece(
+async def create_piece(
     piece_data: PieceCreate,
-    session: Session = Depends(get_db_session)
+    response: Response,
+    db: Database = Depends(get_db)
 ) -> PieceResponse:
     """
     Cadastra uma nova peça e avalia automaticamente sua qualidade.
     
     - Se aprovada: aloca em uma caixa (cria nova se necessário)
     - Se reprovada: armazena os motivos de reprovação
+    - ID já cadastrado: 400; com IDEMPOTENT_INGEST, um reenvio com os mesmos
+      dados devolve a peça gravada (200), inclusive com reenvios simultâneos
+      
+    Com GROUP_COMMIT ativo, cadastros concorrentes são gravados juntos em
+    uma única transação; a resposta de cada requisição é a mesma.
     
     Retorna a peça criada com status e informações de alocação.
     """
-    # Verifica se peça já existe
-    existing_piece = session.get(Piece, piece_data.id)
-    if existing_piece:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Peça com ID '{piece_data.id}' já existe"
-        )
-    
-    # Avalia qualidade
-    evaluation = evaluate_piece(piece_data)
-    
-    # Cria peça
-    piece = Piece(
-        id=piece_data.id,
-        peso=piece_data.peso,
-        cor=piece_data.cor,
-        comprimento=piece_data.comprimento,
-        status=evaluation["status"],
-        rejection_reasons=evaluation["rejection_reasons"]
-    )
-    
-    # Adiciona peça ao session primeiro
-    session.add(piece)
-    session.flush()  # Flush para obter ID se necessário, mas não commita ainda
-    
-    # Se aprovada, aloca em caixa (allocate_piece_to_box fará o commit)
-    if piece.status == PieceStatus.APPROVED:
-        box = find_or_create_open_box(session)
-        allocate_piece_to_box(session, piece, box)
-    else:
-        # Se reprovada, apenas commita
-        session.commit()
+    # IDs cadastrados há pouco por este processo: provável reenvio, confirmado
+    # por chave primária (sem abrir transação de escrita). Outro worker pode
+    # ter removido a peça; nesse caso o cadastro segue normalmente
+    stored = None
+    source = "recent"
+    if recent_pieces.get(piece_data.id) is not None:
+        stored = await db.run(_get_stored_piece, piece_data.id)
+        if stored is None:
+            recent_pieces.discard([piece_data.id])
+    if stored is None:
+        if get_settings().group_commit:
+            piece = await piece_committer.submit(piece_data)
+        else:
+            piece = await db.run(_create_piece, piece_data)
+        if piece is not None:
+            recent_pieces.put(piece)
+            return piece
+        
+        source = "database"
+        if get_settings().idempotent_ingest:
+            stored = await db.run(_get_stored_piece, piece_data.id)
     
-    session.refresh(piece)
+    response.status_code = 200
+    return duplicate_piece_response(piece_data, stored, source)
+
+
+def _create_piece(session: Session, piece_data: PieceCreate) -> Optional[PieceResponse]:
+    piece = ingest_piece(session, piece_data)
+    return PieceResponse.model_validate(piece) if piece else None
+
+
+def _get_stored_piece(session: Session, piece_id: str) -> Optional[PieceResponse]:
+    piece = session.get(Piece, piece_id) or session.get(ArchivedPiece, piece_id)
+    return PieceResponse.model_validate(piece) if piece else None
+
+
+@router.post("/batch", response_model=PieceBatchResponse, status_code=200)
+async def create_pieces_batch(
+    batch: PieceBatchCreate,
+    db: Database = Depends(get_db)
+) -> PieceBatchResponse:
+    """
+    Cadastra um lote de peças em uma única transação.
     
-    return PieceResponse.model_validate(piece)
+    - IDs já existentes (ou repetidos no lote) são ignorados e marcados como duplicados
+    - Aprovadas são alocadas em caixas na ordem do lote, fechando caixas cheias
+      e abrindo novas conforme necessário
+      
+    Retorna status e box_id de cada peça, na mesma ordem do lote.
+    """
+    return await db.run(_create_pieces_batch, batch)
+
+
+def _create_pieces_batch(session: Session, batch: PieceBatchCreate) -> PieceBatchResponse:
+    result = ingest_pieces_batch(session, batch.pieces)
+    return PieceBatchResponse(**result)
 
 
 @router.get("", response_model=PieceListResponse)
-def list_pieces(
+async def list_pieces(
     status: Optional[PieceStatus] = Query(None, description="Filtrar por status"),
+    motivo: Optional[List[RejectionReason]] = Query(None, description="Filtrar por motivo de reprovação (peso/cor/comprimento)"),
+    motivo_exato: bool = Query(False, description="Se true, apenas peças reprovadas exatamente pelos motivos informados"),
     limit: int = Query(100, ge=1, le=1000, description="Limite de resultados"),
-    offset: int = Query(0, ge=0, description="Offset para paginação"),
-    session: Session = Depends(get_db_session)
+    offset: int = Query(0, ge=0, description="Offset para paginação (ignorado quando há cursor)"),
+    cursor: Optional[str] = Query(None, description="Cursor retornado em next_cursor da página anterior"),
+    count: CountMode = Query("none", description="Cálculo do total: none, exact ou estimate"),
+    db: Database = Depends(get_read_db)
 ) -> PieceListResponse:
     """
-    Lista peças cadastradas com filtros opcionais.
+    Lista peças cadastradas com filtros opcionais, das mais recentes para as mais antigas.
     
     - Filtro por status (approved/rejected)
-    - Paginação com limit e offset
+    - Filtro por motivo de reprovação (qualquer um dos informados, ou
+      exatamente os informados com motivo_exato=true)
+    - Paginação por cursor (next_cursor) ou com limit e offset
+    - total só é calculado quando pedido (count=exact, ou count=estimate
+      para estimativa do PostgreSQL)
     """
-    statement = select(Piece)
-    
+    return await db.run(_list_pieces, status, motivo, motivo_exato, limit, offset, cursor, count)
+
+
+def _list_pieces(
+    session: Session,
+    status: Optional[PieceStatus],
+    motivo: Optional[List[RejectionReason]],
+    motivo_exato: bool,
+    limit: int,
+    offset: int,
+    cursor: Optional[str],
+    count: CountMode
+) -> PieceListResponse:
+    filters = []
     if status:
-        statement = statement.where(Piece.status == status)
+        filters.append(Piece.status == status)
+    if motivo:
+        mask = 0
+        for reason in motivo:
+            mask |= REASON_BITS[reason]
+        if motivo_exato:
+            filters.append(Piece.rejection_mask == mask)
+        else:
+            filters.append(Piece.rejection_mask.op("&")(mask) != 0)
     
-    # Conta total
-    count_statement = select(Piece)
-    if status:
-        count_statement = count_statement.where(Piece.status == status)
-    total = len(session.exec(count_statement).all())
+    total, total_estimated = count_rows(session, Piece.id, filters, count)
+    
+    statement = select(Piece).where(*filters)
     
-    # Aplica paginação
-    statement = statement.offset(offset).limit(limit).order_by(Piece.created_at.desc())
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        # Comparação de tuplas: o banco posiciona no índice (created_at, id)
+        # em vez de percorrer as páginas anteriores
+        statement = statement.where(tuple_(Piece.created_at, Piece.id) < tuple_(created_at, str(last_id)))
+    elif offset:
+        statement = statement.offset(offset)
+    
+    # Busca um item a mais para saber se existe próxima página
+    statement = statement.order_by(Piece.created_at.desc(), Piece.id.desc()).limit(limit + 1)
     pieces = session.exec(statement).all()
     
+    next_cursor = None
+    if len(pieces) > limit:
+        pieces = pieces[:limit]
+        next_cursor = encode_cursor(pieces[-1].created_at, pieces[-1].id)
+    
     return PieceListResponse(
         items=[PieceResponse.model_validate(p) for p in pieces],
         total=total,
+        total_estimated=total_estimated,
         limit=limit,
-        offset=offset
+        offset=0 if cursor else offset,
+        next_cursor=next_cursor
+    )
+
+
+@router.get("/export")
+async def export_pieces(
+    format: ExportFormat = Query("ndjson", description="Formato: ndjson ou csv"),
+    status: Optional[PieceStatus] = Query(None, description="Filtrar por status"),
+    desde: Optional[datetime] = Query(None, description="Cadastradas a partir desta data (inclusive)"),
+    ate: Optional[datetime] = Query(None, description="Cadastradas antes desta data"),
+    box_id: Optional[int] = Query(None, description="Filtrar pela caixa"),
+    db: Database = Depends(get_db)
+) -> StreamingResponse:
+    """
+    Exporta peças em NDJSON ou CSV, em ordem de cadastro.
+    
+    A resposta é enviada em streaming, lendo o banco em blocos de
+    EXPORT_CHUNK_SIZE linhas: a memória usada não depende do volume exportado.
+    """
+    statement = pieces_export_statement(status, desde, ate, box_id)
+    chunks = export_chunks(
+        db.stream(statement, EXPORT_CHUNK_SIZE),
+        piece_record,
+        PIECE_EXPORT_COLUMNS,
+        format
+    )
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=pieces.{format}"}
+    )
+
+
+@router.delete("", response_model=PieceBulkDeleteResponse, status_code=200)
+async def delete_pieces_bulk(
+    criteria: PieceBulkDelete,
+    db: Database = Depends(get_db)
+) -> PieceBulkDeleteResponse:
+    """
+    Remove peças em bloco, por IDs e/ou intervalo de cadastro (desde/ate).
+    
+    - Todas as peças são removidas em uma única transação
+    - As caixas fechadas que perderam peças são compactadas em uma única
+      passada: as caixas com mais peças são completadas e continuam
+      fechadas, a sobra fica em uma única caixa aberta (reabrindo uma
+      fechada se necessário) e as caixas esvaziadas são excluídas
+    - Se algum ID não existir, nada é removido (404)
+    - No máximo MAX_BULK_DELETE_PIECES peças por requisição (422 acima disso)
+    
+    Retorna as peças removidas e as movimentações agrupadas por caixa.
+    """
+    result = await db.run(_delete_pieces_bulk, criteria)
+    recent_pieces.discard(result.deleted_piece_ids)
+    return result
+
+
+def _delete_pieces_bulk(session: Session, criteria: PieceBulkDelete) -> PieceBulkDeleteResponse:
+    result = delete_pieces(session, criteria.ids, criteria.desde, criteria.ate, limit=MAX_BULK_DELETE_PIECES)
+    if result["missing_piece_ids"]:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Peça(s) não encontrada(s): {', '.join(result['missing_piece_ids'])}"
+        )
+    if result["limit_exceeded"]:
+        raise HTTPException(
+            status_code=422,
+            detail=f"O filtro seleciona mais de {MAX_BULK_DELETE_PIECES} peças; restrinja o intervalo"
+        )
+    session.commit()
+    
+    moves = {}
+    for piece_id, from_box_id, to_box_id in result["moved_pieces"]:
+        moves.setdefault((from_box_id, to_box_id), []).append(piece_id)
+    
+    deleted = len(result["deleted_piece_ids"])
+    message = f"{deleted} peça(s) removida(s) com sucesso."
+    if result["moved_pieces"]:
+        message += f" {len(result['moved_pieces'])} peça(s) movida(s) entre caixas."
+    
+    return PieceBulkDeleteResponse(
+        message=message,
+        deleted=deleted,
+        deleted_piece_ids=result["deleted_piece_ids"],
+        moves=[
+            PieceMoveGroup(from_box_id=from_box_id, to_box_id=to_box_id, piece_ids=piece_ids)
+            for (from_box_id, to_box_id), piece_ids in moves.items()
+        ],
+        moved_pieces=len(result["moved_pieces"]),
+        closed_box_ids=result["closed_box_ids"],
+        reopened_box_ids=result["reopened_box_ids"],
+        removed_box_ids=result["removed_box_ids"]
     )
 
 
 @router.get("/{piece_id}", response_model=PieceResponse)
-def get_piece(
+async def get_piece(
     piece_id: str,
-    session: Session = Depends(get_db_session)
+    db: Database = Depends(get_read_db)
 ) -> PieceResponse:
     """
     Retorna detalhes de uma peça específica pelo ID.
     """
-    piece = session.get(Piece, piece_id)
+    return await db.run(_get_piece, piece_id)
+
+
+def _get_piece(session: Session, piece_id: str) -> PieceResponse:
+    # Peças arquivadas continuam disponíveis para consulta
+    piece = session.get(Piece, piece_id) or session.get(ArchivedPiece, piece_id)
     if not piece:
         raise HTTPException(
             status_code=404,
@@ -117,9 +312,9 @@ def get_piece(
 
 
 @router.delete("/{piece_id}", response_model=PieceDeleteResponse, status_code=200)
-def delete_piece(
+async def delete_piece(
     piece_id: str,
-    session: Session = Depends(get_db_session)
+    db: Database = Depends(get_db)
 ) -> PieceDeleteResponse:
     """
     Remove uma peça cadastrada.
@@ -129,9 +324,15 @@ def delete_piece(
     - Se removida de caixa fechada e restarem < 10 peças:
       - Move peças de caixa aberta para a fechada até completar 10
       - Ou reabre a caixa fechada se não houver caixa aberta
-    
+      
     Retorna informações sobre peças movidas entre caixas, se aplicável.
     """
+    result = await db.run(_delete_piece, piece_id)
+    recent_pieces.discard([piece_id])
+    return result
+
+
+def _delete_piece(session: Session, piece_id: str) -> PieceDeleteResponse:
     piece = session.get(Piece, piece_id)
     if not piece:
         raise HTTPException(
@@ -143,6 +344,7 @@ def delete_piece(
     move_info = remove_piece_from_box(session, piece)
     
     # Remove peça
+    record_pieces_deleted(session, [piece])
     session.delete(piece)
     session.commit()
     
@@ -1,16 +1,22 @@
-from fastapi import APIRouter, Depends
-from sqlmodel import Session
-from app.api.deps import get_db_session
-from app.schemas.report import FinalReportResponse
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from app.api.cache import versioned_response
+from app.api.deps import Database, get_read_db
+from app.models.enums import Granularity
+from app.schemas.report import FinalReportResponse, TimeseriesResponse
 from app.services.report_service import generate_final_report
+from app.services.timeseries_service import generate_timeseries_report
 
 router = APIRouter(prefix="/reports", tags=["Relatórios"])
 
 
 @router.get("/final", response_model=FinalReportResponse)
-def get_final_report(
-    session: Session = Depends(get_db_session)
-) -> FinalReportResponse:
+async def get_final_report(
+    request: Request,
+    partition: Optional[str] = Query(None, description="Restringe o relatório a uma partição de caixas (ex.: azul, com BOX_PARTITION_BY=cor)"),
+    db: Database = Depends(get_read_db)
+) -> Response:
     """
     Gera relatório final consolidado com estatísticas de produção.
     
@@ -19,6 +25,37 @@ def get_final_report(
     - Total de peças reprovadas
     - Contagem de reprovações por motivo
     - Total de caixas utilizadas (abertas e fechadas)
+    
+    Com partition, os totais se limitam às peças e caixas da partição
+    (calculados a partir das tabelas, não dos agregados).
+    
+    Responde com ETag; envie If-None-Match para receber 304 se nada mudou.
+    """
+    try:
+        return await versioned_response(request, db, generate_final_report, partition)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/timeseries", response_model=TimeseriesResponse)
+async def get_timeseries_report(
+    granularity: Granularity = Query(Granularity.HOUR, description="Tamanho do intervalo: minute, hour ou day"),
+    desde: Optional[datetime] = Query(None, description="Início do período (inclusive). Padrão: 1h, 24h ou 30 dias antes de 'ate'"),
+    ate: Optional[datetime] = Query(None, description="Fim do período (exclusivo). Padrão: agora"),
+    db: Database = Depends(get_read_db)
+) -> TimeseriesResponse:
+    """
+    Gera relatório de produção por intervalo de tempo.
+    
+    Para cada intervalo com produção, retorna:
+    - Peças aprovadas e reprovadas cadastradas (por created_at)
+    - Contagem de reprovações por motivo
+    - Caixas fechadas (por closed_at)
+    
+    Lido das contagens mantidas a cada cadastro, sem varrer a tabela de peças.
     """
-    return generate_final_report(session)
+    try:
+        return await db.run(generate_timeseries_report, granularity, desde, ate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
@@ -0,0 +1,124 @@
+"""
+Comandos de manutenção da aplicação.
+
+Uso:
+    python -m app.cli check-box-counts [--repair]
+    python -m app.cli rebuild-report-stats
+    python -m app.cli rebuild-timeseries
+    python -m app.cli archive [--older-than-days N] [--batch-boxes N]
+    python -m app.cli migrate
+"""
+import argparse
+import sys
+from datetime import datetime, timedelta
+from sqlmodel import Session
+from app.db.engine import engine
+from app.core.config import get_settings
+from app.db.init_db import prepare_database
+from app.db.migrations import LATEST_VERSION, MIGRATIONS, current_version
+from app.services.archive_service import archive_older_than
+from app.services.boxing_service import verify_box_piece_counts
+from app.services.report_service import rebuild_production_stats
+from app.services.timeseries_service import rebuild_production_rollups
+
+
+def check_box_counts(args: argparse.Namespace) -> int:
+    """Confere (e opcionalmente corrige) o contador de peças das caixas"""
+    with Session(engine) as session:
+        drifts = verify_box_piece_counts(session, repair=args.repair)
+    
+    for drift in drifts:
+        print(f"Caixa {drift['box_id']}: contador={drift['stored']} real={drift['actual']}")
+    
+    if not drifts:
+        print("Contadores de peças consistentes.")
+        return 0
+    if args.repair:
+        print(f"{len(drifts)} caixa(s) corrigida(s).")
+        return 0
+    print(f"{len(drifts)} caixa(s) com contador divergente. Use --repair para corrigir.")
+    return 1
+
+
+def rebuild_report_stats(args: argparse.Namespace) -> int:
+    """Recalcula os agregados do relatório a partir dos dados brutos"""
+    with Session(engine) as session:
+        drifts = rebuild_production_stats(session)
+    
+    for (partition, column), drift in drifts.items():
+        print(f"{column} (partição '{partition}'): armazenado={drift['stored']} recalculado={drift['actual']}")
+    
+    if drifts:
+        print(f"{len(drifts)} agregado(s) corrigido(s).")
+    else:
+        print("Agregados do relatório consistentes.")
+    return 0
+
+
+def rebuild_timeseries(args: argparse.Namespace) -> int:
+    """Recalcula as contagens por intervalo (minuto/hora/dia) a partir dos dados brutos"""
+    with Session(engine) as session:
+        rows = rebuild_production_rollups(session)
+    
+    print(f"{rows} intervalo(s) recalculado(s).")
+    return 0
+
+
+def archive(args: argparse.Namespace) -> int:
+    """Move caixas fechadas e peças reprovadas antigas para as tabelas de arquivo"""
+    settings = get_settings()
+    days = args.older_than_days if args.older_than_days is not None else settings.archive_after_days
+    if days <= 0:
+        print("Informe --older-than-days (ou ARCHIVE_AFTER_DAYS) maior que zero.")
+        return 1
+    
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    with Session(engine) as session:
+        totals = archive_older_than(session, cutoff, args.batch_boxes or settings.archive_batch_boxes)
+    
+    print(f"{totals['boxes']} caixa(s) e {totals['pieces']} peça(s) arquivada(s) em {totals['batches']} lote(s).")
+    return 0
+
+
+def migrate(args: argparse.Namespace) -> int:
+    """Aplica as migrações pendentes (prepare_database) e mostra a versão do schema"""
+    version = current_version()
+    for migration in MIGRATIONS:
+        print(f"{migration.version}: {migration.description}")
+    if version < LATEST_VERSION:
+        print(f"Schema na versão {version} (esperada {LATEST_VERSION}).")
+        return 1
+    print(f"Schema na versão {version}.")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Comandos de manutenção do Fabrica QA")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    check_parser = subparsers.add_parser("check-box-counts", help="Confere o contador de peças das caixas")
+    check_parser.add_argument("--repair", action="store_true", help="Corrige os contadores divergentes")
+    check_parser.set_defaults(func=check_box_counts)
+    
+    rebuild_parser = subparsers.add_parser("rebuild-report-stats", help="Recalcula e confere os agregados do relatório")
+    rebuild_parser.set_defaults(func=rebuild_report_stats)
+    
+    timeseries_parser = subparsers.add_parser("rebuild-timeseries", help="Recalcula as contagens de produção por intervalo")
+    timeseries_parser.set_defaults(func=rebuild_timeseries)
+    
+    archive_parser = subparsers.add_parser("archive", help="Arquiva caixas fechadas e peças reprovadas antigas")
+    archive_parser.add_argument("--older-than-days", type=float, help="Idade mínima em dias (padrão: ARCHIVE_AFTER_DAYS)")
+    archive_parser.add_argument("--batch-boxes", type=int, help="Caixas por transação (padrão: ARCHIVE_BATCH_BOXES)")
+    archive_parser.set_defaults(func=archive)
+    
+    migrate_parser = subparsers.add_parser("migrate", help="Aplica as migrações de schema pendentes")
+    migrate_parser.set_defaults(func=migrate)
+    
+    args = parser.parse_args(argv)
+    # Falhas ao preparar o banco interrompem o comando (saída diferente de zero)
+    prepare_database()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
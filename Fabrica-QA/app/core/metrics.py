@@ -0,0 +1,173 @@
+import time
+from contextvars import ContextVar
+from typing import List, Optional, Tuple, Type
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+# Comandos guardados por requisição para o log de requisições lentas
+MAX_LOGGED_STATEMENTS = 200
+
+# Tamanho máximo de cada comando no log
+MAX_LOGGED_STATEMENT_LENGTH = 300
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+# HTTP
+HTTP_REQUEST_SECONDS = Histogram(
+    "fabrica_http_request_duration_seconds",
+    "Duração das requisições HTTP por rota",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "fabrica_http_requests_in_progress",
+    "Requisições HTTP em andamento",
+    ["method"],
+)
+
+# Banco de dados
+DB_STATEMENTS_PER_REQUEST = Histogram(
+    "fabrica_db_statements_per_request",
+    "Comandos SQL executados por requisição",
+    ["route"],
+    buckets=STATEMENT_BUCKETS,
+)
+DB_SECONDS_PER_REQUEST = Histogram(
+    "fabrica_db_seconds_per_request",
+    "Tempo gasto em comandos SQL por requisição",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_STATEMENTS = Counter(
+    "fabrica_db_statements",
+    "Comandos SQL executados (inclusive fora de requisições)",
+    ["engine"],
+)
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "fabrica_db_pool_checkout_seconds",
+    "Espera para obter uma conexão do pool",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+DB_REPLICA_READS = Counter(
+    "fabrica_db_replica_reads",
+    "Consultas das rotas de leitura por destino: replica, ou primary quando a "
+    "réplica está atrasada em relação às escritas do cliente (lag) ou falhou (error)",
+    ["target"],
+)
+DB_POOL_SIZE = Gauge("fabrica_db_pool_size", "Conexões permanentes do pool", ["engine"])
+DB_POOL_CHECKED_OUT = Gauge("fabrica_db_pool_checked_out", "Conexões do pool em uso", ["engine"])
+DB_POOL_OVERFLOW = Gauge("fabrica_db_pool_overflow", "Conexões abertas além de pool_size", ["engine"])
+DB_POOL_SATURATION = Gauge(
+    "fabrica_db_pool_saturation",
+    "Conexões em uso / capacidade máxima do pool (pool_size + max_overflow)",
+    ["engine"],
+)
+
+# Produção (incrementados somente após o commit)
+PIECES_CREATED = Counter("fabrica_pieces_created", "Peças cadastradas", ["status"])
+PIECES_REJECTED_BY_REASON = Counter(
+    "fabrica_pieces_rejected_by_reason",
+    "Peças reprovadas por motivo (uma peça pode ter mais de um motivo)",
+    ["reason"],
+)
+BOXES_OPENED = Counter("fabrica_boxes_opened", "Caixas abertas (novas)")
+BOXES_CLOSED = Counter("fabrica_boxes_closed", "Caixas fechadas")
+BOXES_REOPENED = Counter("fabrica_boxes_reopened", "Caixas fechadas reabertas após remoção de peça")
+PIECES_MOVED = Counter(
+    "fabrica_pieces_moved",
+    "Peças movidas entre caixas no rebalanceamento",
+    ["cause"],
+)
+
+# Cadastros unitários com ID repetido, por onde foram detectados: recent
+# (filtro de IDs recentes do processo, sem consultar o banco) ou database
+PIECES_DUPLICATE = Counter(
+    "fabrica_pieces_duplicate",
+    "Cadastros de peça com ID já existente (reenvios), por origem da detecção",
+    ["source"],
+)
+
+
+class RequestStats:
+    """Comandos SQL e tempo de banco da requisição corrente"""
+    
+    __slots__ = ("statements", "db_seconds", "logged")
+    
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.logged: List[Tuple[float, str]] = []
+    
+    def record(self, statement: str, seconds: float) -> None:
+        self.statements += 1
+        self.db_seconds += seconds
+        if len(self.logged) < MAX_LOGGED_STATEMENTS:
+            self.logged.append((seconds, statement[:MAX_LOGGED_STATEMENT_LENGTH]))
+
+
+# Propagado ao threadpool (run_in_threadpool copia o contexto) e ao greenlet
+# do AsyncSession, então os comandos das rotas são atribuídos à requisição
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+def timed_pool_class(pool_class: Type[Pool], engine_label: str) -> Type[Pool]:
+    """
+    Subclasse do pool que mede a espera por conexão.
+    
+    _do_get é o ponto de extensão dos pools do SQLAlchemy para obter uma
+    conexão; o tempo inclui a espera por uma conexão livre (pool saturado)
+    e a abertura de conexões novas.
+    """
+    class TimedPool(pool_class):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                DB_POOL_CHECKOUT_SECONDS.labels(engine=engine_label).observe(time.perf_counter() - start)
+    
+    TimedPool.__name__ = f"Timed{pool_class.__name__}"
+    return TimedPool
+
+
+def instrument_engine(engine: Engine, engine_label: str) -> None:
+    """
+    Registra as métricas de comandos SQL e do pool de um engine.
+    
+    Args:
+        engine: Engine síncrono (no assíncrono, use async_engine.sync_engine)
+        engine_label: Valor do label "engine" nas métricas
+    """
+    statements = DB_STATEMENTS.labels(engine=engine_label)
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+    
+    @event.listens_for(engine, "after_cursor_execute")
+    def _record_statement(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        statements.inc()
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+    
+    @event.listens_for(engine, "handle_error")
+    def _discard_timer(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start"):
+            connection.info["query_start"].pop()
+    
+    pool = engine.pool
+    if hasattr(pool, "checkedout") and hasattr(pool, "size"):
+        max_overflow = max(getattr(pool, "_max_overflow", 0), 0)
+        DB_POOL_SIZE.labels(engine=engine_label).set_function(pool.size)
+        DB_POOL_CHECKED_OUT.labels(engine=engine_label).set_function(pool.checkedout)
+        DB_POOL_OVERFLOW.labels(engine=engine_label).set_function(lambda: max(pool.overflow(), 0))
+        DB_POOL_SATURATION.labels(engine=engine_label).set_function(
+            lambda: pool.checkedout() / max(pool.size() + max_overflow, 1)
+        )
@@ -1,26 +1,171 @@
+from typing import Optional
 from sqlmodel import create_engine, Session
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.core.config import get_settings
+from app.core.metrics import instrument_engine, timed_pool_class
+from app.db.sqlite import configure_sqlite_engine, is_memory_database
 
 settings = get_settings()
 
-# SQLite precisa de connect_args específico, PostgreSQL não
-if settings.database_url.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
-    engine = create_engine(settings.database_url, echo=False, connect_args=connect_args)
-else:
-    # PostgreSQL: adiciona pool_pre_ping para reconectar automaticamente
-    # e pool_recycle para evitar conexões antigas
-    # Para psycopg, connect_timeout deve ser passado na URL ou via connect_args
-    engine = create_engine(
-        settings.database_url,
-        echo=False,
-        pool_pre_ping=True,  # Verifica conexão antes de usar
-        pool_recycle=300,    # Recicla conexões após 5 minutos
-        pool_timeout=5,      # Timeout para obter conexão do pool (reduzido)
-        connect_args={
-            "connect_timeout": 5  # Timeout de 5 segundos para conexão inicial (reduzido)
-        } if "postgresql" in settings.database_url else {}
-    )
+
+def _pool_options(database_url: str, pool_class, engine_label: str) -> dict:
+    """
+    Pool com medição da espera por conexão (métrica fabrica_db_pool_checkout_seconds).
+    
+    SQLite em memória mantém o pool padrão (uma conexão por thread).
+    """
+    if is_memory_database(database_url):
+        return {}
+    return {"poolclass": timed_pool_class(pool_class, engine_label)}
+
+
+def _postgres_options(database_url: str) -> dict:
+    """
+    Opções do pool do PostgreSQL a partir de Settings (DB_POOL_*).
+    
+    pool_pre_ping reconecta automaticamente e pool_recycle evita conexões
+    antigas; para psycopg, connect_timeout vai em connect_args.
+    """
+    return {
+        "pool_pre_ping": True,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_timeout": settings.db_pool_timeout,
+        "connect_args": {"connect_timeout": 5} if "postgresql" in database_url else {},
+    }
+
+
+def create_sync_engine(database_url: str, engine_label: str, writer_lock: bool = False) -> Engine:
+    """
+    Cria e instrumenta um engine síncrono.
+    
+    Args:
+        database_url: URL do banco (SQLite ou PostgreSQL)
+        engine_label: Label "engine" nas métricas
+        writer_lock: Lock de escrita do perfil SQLite (apenas no banco principal)
+    """
+    # SQLite precisa de connect_args específico, PostgreSQL não
+    if database_url.startswith("sqlite"):
+        created = create_engine(
+            database_url,
+            echo=False,
+            connect_args={"check_same_thread": False},
+            **_pool_options(database_url, QueuePool, engine_label)
+        )
+        # Perfil SQLite (WAL, PRAGMAs e lock de escrita); o QueuePool mantém as
+        # conexões abertas, então os PRAGMAs e o cache de páginas valem por conexão
+        if not is_memory_database(database_url):
+            configure_sqlite_engine(created, settings, writer_lock=writer_lock)
+    else:
+        created = create_engine(
+            database_url,
+            echo=False,
+            **_postgres_options(database_url),
+            **_pool_options(database_url, QueuePool, engine_label)
+        )
+    instrument_engine(created, engine_label)
+    return created
+
+
+def to_async_url(database_url: str) -> str:
+    """
+    Converte a DATABASE_URL para o driver assíncrono equivalente.
+    
+    - sqlite:///... -> sqlite+aiosqlite:///...
+    - postgresql://... ou postgresql+psycopg2://... -> postgresql+psycopg://... (psycopg 3 async)
+    """
+    scheme, sep, rest = database_url.partition("://")
+    if scheme.startswith("sqlite"):
+        return f"sqlite+aiosqlite{sep}{rest}"
+    if scheme.startswith("postgresql"):
+        return f"postgresql+psycopg{sep}{rest}"
+    return database_url
+
+
+def create_async_database_engine(database_url: str, engine_label: str) -> AsyncEngine:
+    """Cria e instrumenta um engine assíncrono (aiosqlite / psycopg 3 async)"""
+    if database_url.startswith("sqlite"):
+        created = create_async_engine(
+            to_async_url(database_url),
+            echo=False,
+            **_pool_options(database_url, AsyncAdaptedQueuePool, engine_label)
+        )
+        if not is_memory_database(database_url):
+            configure_sqlite_engine(created.sync_engine, settings)
+    else:
+        created = create_async_engine(
+            to_async_url(database_url),
+            echo=False,
+            **_postgres_options(database_url),
+            **_pool_options(database_url, AsyncAdaptedQueuePool, engine_label)
+        )
+    instrument_engine(created.sync_engine, engine_label)
+    return created
+
+
+def warm_up_engine(target: Engine, connections: int) -> int:
+    """
+    Abre conexões do pool antes das primeiras requisições.
+    
+    Cada conexão executa SELECT 1 (PRAGMAs do SQLite, autenticação do
+    PostgreSQL) e volta ao pool; limitado ao tamanho do pool.
+    
+    Returns:
+        Número de conexões abertas
+    """
+    size = getattr(target.pool, "size", None)
+    if callable(size):
+        connections = min(connections, size())
+    opened = []
+    try:
+        for _ in range(max(connections, 0)):
+            connection = target.connect()
+            opened.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
+
+
+async def warm_up_async_engine(target: AsyncEngine, connections: int) -> int:
+    """Versão assíncrona de warm_up_engine"""
+    size = getattr(target.sync_engine.pool, "size", None)
+    if callable(size):
+        connections = min(connections, size())
+    opened = []
+    try:
+        for _ in range(max(connections, 0)):
+            connection = await target.connect()
+            opened.append(connection)
+            await connection.execute(text("SELECT 1"))
+    finally:
+        for connection in opened:
+            await connection.close()
+    return len(opened)
+
+
+engine = create_sync_engine(settings.database_url, "sync", writer_lock=settings.sqlite_writer_lock)
+
+# Engine assíncrono: criado apenas quando DATABASE_ASYNC está ativo,
+# para que aiosqlite não seja necessário no modo síncrono
+async_engine: Optional[AsyncEngine] = None
+if settings.database_async:
+    async_engine = create_async_database_engine(settings.database_url, "async")
+
+# Réplica somente leitura das rotas de consulta (app.api.deps.get_read_db),
+# com pool próprio: consultas do dashboard não disputam conexões com cadastros
+replica_engine: Optional[Engine] = None
+async_replica_engine: Optional[AsyncEngine] = None
+if settings.database_replica_url:
+    if settings.database_async:
+        async_replica_engine = create_async_database_engine(settings.database_replica_url, "async_replica")
+    else:
+        replica_engine = create_sync_engine(settings.database_replica_url, "replica")
 
 def get_session():
     with Session(engine) as session:
@@ -0,0 +1,343 @@
+"""
+Migrações de schema versionadas.
+
+Cada migração tem um número e é aplicada uma única vez por banco, em ordem;
+as versões aplicadas ficam na tabela schema_version. Com o schema em dia, o
+startup faz apenas uma consulta (a versão atual), sem create_all nem
+inspeção das tabelas.
+
+A migração 1 cria o schema completo dos models em bancos novos, então as
+migrações seguintes precisam conferir o que já existe (checkfirst) antes
+de criar tabelas, colunas ou índices.
+"""
+import logging
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Callable, Iterator, List, NamedTuple
+from sqlalchemy import MetaData, inspect, text, update
+from sqlalchemy.schema import CreateIndex, CreateTable
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+from sqlmodel import Session, SQLModel, select, func
+from app.db.engine import engine
+from app.db.sqlite import engine_writer_lock
+
+# Importa todos os models para que SQLModel os registre
+from app.models.piece import Piece
+from app.models.box import Box
+from app.models.production_stats import ProductionStats
+from app.models.production_rollup import ProductionRollup
+from app.models.data_generation import DataGeneration  # noqa: F401
+from app.models.ingest_ticket import IngestTicket  # noqa: F401
+from app.models.archive import ArchivedBox, ArchivedPiece  # noqa: F401
+from app.models.schema_version import SchemaVersion
+from app.models.enums import PieceStatus
+from app.services.quality_service import mask_from_reasons
+from app.services.boxing_service import merge_extra_open_boxes
+from app.services.report_service import rebuild_production_stats
+from app.services.timeseries_service import rebuild_production_rollups
+
+logger = logging.getLogger(__name__)
+
+# Chave do advisory lock do PostgreSQL que serializa as migrações entre workers
+MIGRATION_LOCK_KEY = 72_510_001
+
+
+class Migration(NamedTuple):
+    """Alteração de schema aplicada uma vez por banco"""
+    version: int
+    description: str
+    apply: Callable[[], None]
+
+
+def _box_index(name: str):
+    return next(index for index in Box.__table__.indexes if index.name == name)
+
+
+def _upgrade_legacy_schema() -> None:
+    """
+    Ajusta bancos criados antes do versionamento de schema.
+    
+    create_all não altera tabelas existentes, então as colunas e índices
+    adicionados desde então são criados (e preenchidos) aqui, conferindo
+    o que já existe.
+    """
+    inspector = inspect(engine)
+    
+    # Tabela de intervalos recém-criada em banco com dados: preenche ao final,
+    # depois das demais migrações (usa rejection_mask). Tabela anterior às
+    # partições: recriada e preenchida pela migração 6
+    rollup_columns = {column["name"] for column in inspector.get_columns("production_rollup")}
+    with Session(engine) as session:
+        needs_rollup_backfill = (
+            "partition" in rollup_columns
+            and session.exec(select(ProductionRollup.granularity).limit(1)).first() is None
+            and session.exec(select(Piece.id).limit(1)).first() is not None
+        )
+    
+    box_columns = {column["name"] for column in inspector.get_columns("box")}
+    
+    if "piece_count" not in box_columns:
+        logger.info("Adicionando coluna box.piece_count...")
+        piece_count_subquery = (
+            select(func.count(Piece.id))
+            .where(Piece.box_id == Box.id, Piece.status == PieceStatus.APPROVED)
+            .scalar_subquery()
+        )
+        with engine.begin() as connection:
+            connection.execute(text("ALTER TABLE box ADD COLUMN piece_count INTEGER NOT NULL DEFAULT 0"))
+            connection.execute(update(Box).values(piece_count=piece_count_subquery))
+    
+    # Caixas e caixas arquivadas anteriores às partições ficam na partição padrão ("")
+    for table in ("box", "box_archive"):
+        if "partition" not in {column["name"] for column in inspector.get_columns(table)}:
+            logger.info(f"Adicionando coluna {table}.partition...")
+            with engine.begin() as connection:
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN \"partition\" VARCHAR NOT NULL DEFAULT ''"))
+    
+    box_indexes = {index["name"] for index in inspector.get_indexes("box")}
+    
+    if "uq_box_open_per_partition" not in box_indexes:
+        logger.info("Criando índice de caixa aberta única por partição...")
+        with Session(engine) as session:
+            merged = merge_extra_open_boxes(session)
+            if merged:
+                logger.info(f"{merged} caixa(s) aberta(s) extra(s) fechada(s) antes de criar o índice")
+        if "uq_box_single_open" in box_indexes:
+            # Índice anterior (uma caixa aberta no total) impediria uma caixa aberta por partição
+            with engine.begin() as connection:
+                connection.execute(text("DROP INDEX uq_box_single_open"))
+        _box_index("uq_box_open_per_partition").create(engine)
+    
+    if "ix_box_partition_opened_at" not in box_indexes:
+        _box_index("ix_box_partition_opened_at").create(engine)
+    
+    piece_columns = {column["name"] for column in inspector.get_columns("piece")}
+    
+    if "rejection_mask" not in piece_columns:
+        logger.info("Adicionando coluna piece.rejection_mask...")
+        with engine.begin() as connection:
+            connection.execute(text("ALTER TABLE piece ADD COLUMN rejection_mask INTEGER NOT NULL DEFAULT 0"))
+            connection.execute(text("CREATE INDEX ix_piece_rejection_mask ON piece (rejection_mask)"))
+            
+            # Preenche a máscara a partir dos motivos em JSON das peças reprovadas
+            rejected = connection.execute(
+                select(Piece.id, Piece.rejection_reasons).where(Piece.status == PieceStatus.REJECTED)
+            ).all()
+            ids_by_mask = defaultdict(list)
+            for piece_id, reasons in rejected:
+                ids_by_mask[mask_from_reasons(reasons or [])].append(piece_id)
+            
+            for mask, piece_ids in ids_by_mask.items():
+                for start in range(0, len(piece_ids), 500):
+                    connection.execute(
+                        update(Piece)
+                        .where(Piece.id.in_(piece_ids[start:start + 500]))
+                        .values(rejection_mask=mask)
+                    )
+    
+    if needs_rollup_backfill:
+        logger.info("Preenchendo contagens de produção por intervalo...")
+        with Session(engine) as session:
+            rebuild_production_rollups(session)
+
+
+def _baseline() -> None:
+    """Schema até o versionamento: tabelas dos models e ajustes de bancos anteriores"""
+    SQLModel.metadata.create_all(engine)
+    _upgrade_legacy_schema()
+
+
+def _create_indexes(table, names) -> None:
+    """Cria os índices do model com esses nomes, se ainda não existirem"""
+    for index in table.indexes:
+        if index.name in names:
+            index.create(engine, checkfirst=True)
+
+
+def _hot_query_indexes() -> None:
+    """Índices das consultas mais frequentes (listagens, detalhe de caixa, remoções)"""
+    _create_indexes(Piece.__table__, ("ix_piece_status", "ix_piece_box_id_created_at"))
+    _create_indexes(Box.__table__, ("ix_box_status_opened_at",))
+
+
+def _piece_listing_index() -> None:
+    """Listagem de peças sem filtro, em ordem (created_at, id), sem ordenar a tabela inteira"""
+    _create_indexes(Piece.__table__, ("ix_piece_created_at_id",))
+
+
+def _box_listing_index() -> None:
+    """Listagem de caixas sem filtro, em ordem (opened_at, id), sem ordenar a tabela inteira"""
+    _create_indexes(Box.__table__, ("ix_box_opened_at_id",))
+
+
+def _box_autoincrement() -> None:
+    """
+    Recria a tabela box com AUTOINCREMENT no SQLite (IDs não reutilizados).
+    
+    O SQLite não altera a definição da chave primária de uma tabela
+    existente: a tabela é copiada para uma nova com a definição do model,
+    em uma única transação. O contador (sqlite_sequence) começa acima do
+    maior ID de caixa, ativa ou arquivada. No PostgreSQL, a sequência do
+    SERIAL já não reutiliza IDs.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    
+    # Transação explícita no pysqlite: a definição e o maior ID são lidos
+    # depois do BEGIN IMMEDIATE, sem escritas de outras conexões até o COMMIT
+    raw_connection = engine.raw_connection()
+    try:
+        connection = raw_connection.driver_connection
+        cursor = connection.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            table_sql = cursor.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'box'"
+            ).fetchone()[0]
+            max_box_id = cursor.execute(
+                "SELECT MAX(id) FROM (SELECT MAX(id) AS id FROM box UNION ALL SELECT MAX(id) FROM box_archive)"
+            ).fetchone()[0] or 0
+            for statement in _box_autoincrement_statements(table_sql, max_box_id):
+                cursor.execute(statement)
+        except BaseException:
+            connection.rollback()
+            raise
+        connection.commit()
+    finally:
+        raw_connection.close()
+
+
+def _partitioned_aggregates() -> None:
+    """
+    Agregados por partição: recria production_stats e production_rollup com a coluna partition.
+    
+    As tabelas são derivadas dos dados brutos: em vez de copiar as linhas,
+    são recalculadas (rebuild_production_stats/rebuild_production_rollups)
+    com as contagens separadas por partição.
+    """
+    inspector = inspect(engine)
+    recreated = False
+    for table in (ProductionStats.__table__, ProductionRollup.__table__):
+        if "partition" not in {column["name"] for column in inspector.get_columns(table.name)}:
+            logger.info(f"Recriando {table.name} por partição...")
+            table.drop(engine)
+            table.create(engine)
+            recreated = True
+    
+    if recreated:
+        with Session(engine) as session:
+            rebuild_production_stats(session)
+            rebuild_production_rollups(session)
+
+
+def _box_autoincrement_statements(table_sql: str, max_box_id: int) -> List[str]:
+    """Comandos da migração 5 para a definição atual da tabela box e o maior ID de caixa"""
+    statements = []
+    if "AUTOINCREMENT" not in table_sql.upper():
+        box_table = Box.__table__
+        new_table = box_table.to_metadata(MetaData(), name="box_new")
+        quote = engine.dialect.identifier_preparer.quote
+        columns = ", ".join(quote(column.name) for column in box_table.columns)
+        statements += [
+            str(CreateTable(new_table, include_foreign_key_constraints=[]).compile(engine)),
+            f"INSERT INTO box_new ({columns}) SELECT {columns} FROM box",
+            "DROP TABLE box",
+            "ALTER TABLE box_new RENAME TO box",
+        ]
+        statements += [str(CreateIndex(index).compile(engine)) for index in box_table.indexes]
+    statements += [
+        "DELETE FROM sqlite_sequence WHERE name = 'box'",
+        f"INSERT INTO sqlite_sequence (name, seq) VALUES ('box', {int(max_box_id)})",
+    ]
+    return statements
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Schema inicial (tabelas e ajustes de bancos anteriores ao versionamento)", _baseline),
+    Migration(2, "Índices: piece.status, piece(box_id, created_at), box(status, opened_at)", _hot_query_indexes),
+    Migration(3, "Índice: piece(created_at, id)", _piece_listing_index),
+    Migration(4, "Índice: box(opened_at, id)", _box_listing_index),
+    Migration(5, "box com AUTOINCREMENT no SQLite (IDs de caixas arquivadas não são reutilizados)", _box_autoincrement),
+    Migration(6, "Agregados de produção e contagens por intervalo separados por partição", _partitioned_aggregates),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def _max_version() -> int:
+    with Session(engine) as session:
+        return session.exec(select(func.max(SchemaVersion.version))).one() or 0
+
+
+def current_version() -> int:
+    """Versão do schema do banco (0 se nenhuma migração foi aplicada)"""
+    try:
+        return _max_version()
+    except (OperationalError, ProgrammingError):
+        # Tabela schema_version ainda não existe (banco novo ou anterior ao versionamento)
+        if not inspect(engine).has_table(SchemaVersion.__tablename__):
+            return 0
+        # Criada por outro processo entre a consulta e a inspeção
+        return _max_version()
+
+
+@contextmanager
+def _migration_lock() -> Iterator[None]:
+    """
+    Serializa as migrações entre processos.
+    
+    PostgreSQL: advisory lock em uma conexão própria, liberado ao final.
+    SQLite: o lock de escrita do arquivo do banco (SQLiteWriterLock, o mesmo
+    das transações de escrita), detido durante todas as migrações; os outros
+    processos esperam por ele para migrar ou gravar. SQLite em memória: sem
+    lock (um único processo).
+    """
+    if engine.dialect.name == "sqlite":
+        writer_lock = engine_writer_lock(engine)
+        with writer_lock.hold() if writer_lock is not None else nullcontext():
+            yield
+        return
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect() as connection:
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            yield
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+
+def migrate() -> int:
+    """
+    Aplica as migrações pendentes, em ordem de versão.
+    
+    Returns:
+        Versão do schema após as migrações
+    """
+    version = current_version()
+    if version >= LATEST_VERSION:
+        return version
+    
+    with _migration_lock():
+        SchemaVersion.__table__.create(engine, checkfirst=True)
+        # Outro worker pode ter migrado enquanto este esperava o lock
+        version = current_version()
+        for migration in MIGRATIONS:
+            if migration.version <= version:
+                continue
+            logger.info(f"Aplicando migração {migration.version}: {migration.description}...")
+            migration.apply()
+            try:
+                with Session(engine) as session:
+                    session.add(SchemaVersion(
+                        version=migration.version,
+                        description=migration.description,
+                        applied_at=datetime.utcnow()
+                    ))
+                    session.commit()
+            except IntegrityError:
+                logger.info(f"Migração {migration.version} já registrada por outro processo")
+            version = migration.version
+    return version
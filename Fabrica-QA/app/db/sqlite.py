@@ -0,0 +1,237 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+from weakref import WeakKeyDictionary
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import Settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: o lock vale apenas entre as threads do processo
+    fcntl = None
+
+# Valores aceitos nos PRAGMAs configuráveis (entram no texto do comando)
+JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SYNCHRONOUS_LEVELS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+TEMP_STORES = {"DEFAULT", "FILE", "MEMORY"}
+
+# Comandos que iniciam a transação de escrita no pysqlite
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+# Chave em connection.info: a conexão detém o lock de escrita
+WRITER_LOCK_KEY = "sqlite_writer_lock"
+
+# Sufixo do arquivo de lock compartilhado pelos processos (ao lado do banco)
+WRITER_LOCK_FILE_SUFFIX = "-lock"
+
+# Espera máxima entre tentativas de obter o lock do arquivo
+WRITER_LOCK_MAX_POLL_SECONDS = 0.005
+
+# Lock de escrita de cada engine (configure_sqlite_engine / engine_writer_lock)
+_writer_locks: "WeakKeyDictionary[Engine, SQLiteWriterLock]" = WeakKeyDictionary()
+
+
+def is_memory_database(database_url: str) -> bool:
+    """True para SQLite em memória (sem arquivo: WAL e lock de escrita não se aplicam)"""
+    return database_url in ("sqlite://", "sqlite+aiosqlite://") or ":memory:" in database_url
+
+
+def _choice(name: str, value: str, allowed: set) -> Optional[str]:
+    value = value.strip().upper()
+    if not value:
+        return None
+    if value not in allowed:
+        raise ValueError(f"{name} inválido: '{value}' (aceitos: {', '.join(sorted(allowed))})")
+    return value
+
+
+def sqlite_pragmas(settings: Settings) -> List[str]:
+    """
+    PRAGMAs do perfil SQLite configurado em Settings.
+    
+    - journal_mode=WAL: leitores não bloqueiam o escritor (nem o contrário)
+    - synchronous=NORMAL: em WAL, fsync só no checkpoint; uma queda de
+      energia pode perder as últimas transações, mas não corrompe o banco
+    - busy_timeout: espera pelo lock do arquivo antes de "database is locked"
+    - mmap_size, cache_size e temp_store: leituras pelo mapeamento em
+      memória, cache de páginas maior e tabelas temporárias em memória
+      
+    Returns:
+        Comandos PRAGMA, na ordem em que devem ser executados
+    """
+    pragmas = []
+    journal_mode = _choice("SQLITE_JOURNAL_MODE", settings.sqlite_journal_mode, JOURNAL_MODES)
+    if journal_mode:
+        pragmas.append(f"PRAGMA journal_mode={journal_mode}")
+    synchronous = _choice("SQLITE_SYNCHRONOUS", settings.sqlite_synchronous, SYNCHRONOUS_LEVELS)
+    if synchronous:
+        pragmas.append(f"PRAGMA synchronous={synchronous}")
+    if settings.sqlite_busy_timeout_ms > 0:
+        pragmas.append(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    if settings.sqlite_mmap_size > 0:
+        pragmas.append(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    if settings.sqlite_cache_size_kb > 0:
+        # Valor negativo: tamanho em KiB, não em páginas
+        pragmas.append(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kb)}")
+    temp_store = _choice("SQLITE_TEMP_STORE", settings.sqlite_temp_store, TEMP_STORES)
+    if temp_store:
+        pragmas.append(f"PRAGMA temp_store={temp_store}")
+    return pragmas
+
+
+class SQLiteWriterLock:
+    """
+    Lock de escrita das conexões de um engine SQLite.
+    
+    O SQLite aceita um escritor por vez; os que perdem a disputa ficam no
+    busy handler (espera com recuo, sem ordem) e podem estourar o
+    busy_timeout com "database is locked". Aqui cada transação de escrita
+    obtém antes o lock, no primeiro comando de escrita, e o libera quando
+    a conexão volta ao pool (a Session devolve a conexão no commit/rollback):
+    - Entre as threads do processo, um threading.Lock (fila de espera)
+    - Entre processos (vários workers do uvicorn), flock em um arquivo ao
+      lado do banco, obtido pela thread que detém o lock do processo
+      
+    O pysqlite só abre a transação (BEGIN) no primeiro comando de escrita,
+    então com o lock nenhum outro escritor grava durante a transação. Sem
+    fcntl (Windows), vale apenas o lock do processo. Se o lock não for
+    obtido em `timeout` segundos, o comando segue sem ele e o busy_timeout
+    do SQLite decide, como sem o lock.
+    
+    hold() detém o lock fora das transações, por um bloco inteiro (ex.:
+    migrações); os comandos de escrita da thread que o detém não esperam.
+    """
+    
+    def __init__(self, timeout: float, lock_path: Optional[str] = None):
+        self.timeout = timeout
+        self.lock_path = lock_path if fcntl is not None else None
+        self._lock = threading.Lock()
+        self._file = None
+        self._file_pid: Optional[int] = None
+        self._owner: Optional[int] = None
+    
+    def _lock_fd(self) -> int:
+        # Um descritor por processo: após um fork, o descritor herdado
+        # compartilharia o lock com o processo pai
+        if self._file_pid != os.getpid():
+            self._file = open(self.lock_path, "a+b")
+            self._file_pid = os.getpid()
+        return self._file.fileno()
+    
+    def _acquire_file(self, deadline: float) -> bool:
+        fd = self._lock_fd()
+        delay = 0.0002
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                pass
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(delay)
+            delay = min(delay * 2, WRITER_LOCK_MAX_POLL_SECONDS)
+    
+    def acquire(self, info: dict) -> None:
+        if info.get(WRITER_LOCK_KEY) or self._owner == threading.get_ident():
+            return
+        deadline = time.monotonic() + self.timeout
+        if not self._lock.acquire(timeout=self.timeout):
+            return
+        if self.lock_path is not None and not self._acquire_file(deadline):
+            self._lock.release()
+            return
+        info[WRITER_LOCK_KEY] = True
+    
+    def release(self, info: dict) -> None:
+        if info.pop(WRITER_LOCK_KEY, False):
+            if self.lock_path is not None:
+                fcntl.flock(self._lock_fd(), fcntl.LOCK_UN)
+            self._lock.release()
+    
+    @contextmanager
+    def hold(self) -> Iterator[None]:
+        """Detém o lock até o fim do bloco, esperando o quanto for preciso para obtê-lo"""
+        self._lock.acquire()
+        try:
+            if self.lock_path is not None:
+                fcntl.flock(self._lock_fd(), fcntl.LOCK_EX)
+            self._owner = threading.get_ident()
+            try:
+                yield
+            finally:
+                self._owner = None
+                if self.lock_path is not None:
+                    fcntl.flock(self._lock_fd(), fcntl.LOCK_UN)
+        finally:
+            self._lock.release()
+
+
+def _writer_lock_path(engine: Engine) -> Optional[str]:
+    return f"{engine.url.database}{WRITER_LOCK_FILE_SUFFIX}" if engine.url.database else None
+
+
+def engine_writer_lock(engine: Engine) -> Optional[SQLiteWriterLock]:
+    """
+    Lock de escrita de um engine SQLite, para detê-lo fora das transações (SQLiteWriterLock.hold).
+    
+    Se o engine não usa o lock nas transações (SQLITE_WRITER_LOCK desativado),
+    devolve um lock sobre o mesmo arquivo, que os outros processos respeitam.
+    
+    Returns:
+        O lock, ou None para SQLite em memória (não há outros processos)
+    """
+    lock = _writer_locks.get(engine)
+    if lock is None:
+        if engine.url.database in (None, "", ":memory:"):
+            return None
+        lock = _writer_locks.setdefault(engine, SQLiteWriterLock(timeout=0, lock_path=_writer_lock_path(engine)))
+    return lock
+
+
+def configure_sqlite_engine(engine: Engine, settings: Settings, writer_lock: bool = False) -> None:
+    """
+    Aplica o perfil SQLite às conexões do engine.
+    
+    Args:
+        engine: Engine síncrono (no assíncrono, use async_engine.sync_engine)
+        settings: Configurações (SQLITE_*)
+        writer_lock: Se True, registra o SQLiteWriterLock; apenas para o
+            engine síncrono (no assíncrono, esperar o lock bloquearia o
+            event loop)
+    """
+    pragmas = sqlite_pragmas(settings)
+    
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+    
+    if not writer_lock:
+        return
+    
+    lock = SQLiteWriterLock(
+        timeout=max(settings.sqlite_busy_timeout_ms, 0) / 1000 or 5.0,
+        lock_path=_writer_lock_path(engine)
+    )
+    _writer_locks[engine] = lock
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def _acquire_writer_lock(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+            lock.acquire(conn.info)
+    
+    @event.listens_for(engine.pool, "checkin")
+    def _release_on_checkin(dbapi_connection, connection_record):
+        lock.release(connection_record.info)
+    
+    @event.listens_for(engine.pool, "invalidate")
+    def _release_on_invalidate(dbapi_connection, connection_record, exception):
+        lock.release(connection_record.info)
@@ -1,9 +1,15 @@
 import logging
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import get_settings
-from app.db.init_db import init_db
 from app.api.routes import api_router
+from app.api.group_commit import piece_committer
+from app.api.ingest_worker import ingest_consumer
+from app.api.archive_worker import archive_worker
+from app.api.db_supervisor import db_supervisor
+from app.api.metrics import MetricsMiddleware, metrics_response
+from app.api.replica import DataVersionMiddleware
 
 # Configura logging
 logging.basicConfig(
@@ -32,47 +38,68 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Métricas por requisição (duração, comandos SQL, tempo de banco)
+app.add_middleware(MetricsMiddleware)
+
+# Versão dos dados gravada (X-Data-Version), para ler as próprias escritas na réplica
+app.add_middleware(DataVersionMiddleware)
+
 # Registra routers da API
 app.include_router(api_router, prefix="/api")
 
-# Flag para rastrear se o banco já foi inicializado
-_db_initialized = False
-
 @app.on_event("startup")
 async def on_startup():
-    """Inicializa o banco de dados na inicialização da aplicação"""
-    global _db_initialized
+    """Inicia a preparação do banco e as tarefas de fundo, sem esperar pelo banco"""
     logger.info("Iniciando aplicação...")
-    # Inicializa banco de forma não-bloqueante
-    # Se falhar, não bloqueia o startup - tenta novamente na primeira requisição
-    try:
-        init_db()
-        _db_initialized = True
-        logger.info("Aplicação iniciada com sucesso!")
-    except Exception as e:
-        # Não levanta exceção para não bloquear o startup do FastAPI
-        # O banco será inicializado na primeira requisição que precisar dele
-        logger.warning(f"Banco não inicializado no startup: {e}. Será tentado novamente na primeira requisição.")
-        logger.info("Aplicação iniciada (banco será inicializado sob demanda)")
-
-@app.get("/health")
-def health():
-    """Endpoint de health check - não depende do banco estar pronto"""
-    global _db_initialized
+    # Migrações e aquecimento do pool em segundo plano: /health responde desde
+    # já e /ready responde 503 até o banco ficar pronto (ou voltar, se cair)
+    db_supervisor.start()
     
-    # Tenta inicializar banco apenas uma vez se ainda não foi inicializado
-    if not _db_initialized:
-        try:
-            init_db()
-            _db_initialized = True
-        except Exception:
-            # Se falhar, não importa - healthcheck ainda retorna ok
-            # O banco será tentado novamente na próxima requisição
-            pass
+    # Fila de ingestão: retoma o que ficou no journal (inclusive antes de uma queda)
+    if ingest_consumer is not None:
+        ingest_consumer.start()
     
+    # Arquivamento periódico de caixas fechadas e peças antigas (ARCHIVE_AFTER_DAYS)
+    if archive_worker is not None:
+        archive_worker.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    """Encerra as tarefas de group commit, da fila de ingestão, de arquivamento e de verificação do banco"""
+    await piece_committer.stop()
+    if ingest_consumer is not None:
+        await ingest_consumer.stop()
+    if archive_worker is not None:
+        await archive_worker.stop()
+    await db_supervisor.stop()
+
+@app.get("/health")
+async def health():
+    """Liveness: o processo está respondendo (não consulta o banco)"""
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness: último estado do banco verificado em segundo plano (503 se indisponível)"""
+    state = db_supervisor.state()
+    return JSONResponse(
+        status_code=200 if state["ready"] else 503,
+        content={
+            "status": "ready" if state["ready"] else "unavailable",
+            "schema_version": state["schema_version"],
+            "checked_at": state["checked_at"].isoformat() if state["checked_at"] else None,
+            "error": state["error"],
+        }
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Métricas no formato do Prometheus (HTTP, banco, pool e produção)"""
+    return metrics_response()
+
+
 @app.get("/")
 def root():
     """Endpoint raiz com informações da API"""
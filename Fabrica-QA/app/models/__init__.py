@@ -1,6 +1,28 @@
-from app.models.enums import Color, PieceStatus, BoxStatus
+from app.models.enums import Color, PieceStatus, BoxStatus, RejectionReason, Granularity, IngestStatus
 from app.models.piece import Piece
 from app.models.box import Box
+from app.models.production_stats import ProductionStats
+from app.models.production_rollup import ProductionRollup
+from app.models.data_generation import DataGeneration
+from app.models.ingest_ticket import IngestTicket
+from app.models.archive import ArchivedBox, ArchivedPiece
+from app.models.schema_version import SchemaVersion
 
-__all__ = ["Color", "PieceStatus", "BoxStatus", "Piece", "Box"]
+__all__ = [
+    "Color",
+    "PieceStatus",
+    "BoxStatus",
+    "RejectionReason",
+    "Granularity",
+    "IngestStatus",
+    "Piece",
+    "Box",
+    "ProductionStats",
+    "ProductionRollup",
+    "DataGeneration",
+    "IngestTicket",
+    "ArchivedBox",
+    "ArchivedPiece",
+    "SchemaVersion",
+]
 
@@ -0,0 +1,49 @@
+from datetime import datetime
+from typing import Optional, List
+from sqlmodel import SQLModel, Field, Column, JSON
+from app.models.enums import Color, PieceStatus, BoxStatus
+
+
+class ArchivedBox(SQLModel, table=True):
+    """
+    Caixa fechada movida para o arquivo (archive_service).
+    
+    Mesmas colunas de Box, mantendo o ID original; caixas arquivadas são
+    somente leitura e não participam da alocação.
+    """
+    
+    __tablename__ = "box_archive"
+    
+    id: int = Field(primary_key=True, description="ID original da caixa")
+    partition: str = Field(default="", description="Partição da caixa")
+    status: BoxStatus = Field(default=BoxStatus.CLOSED)
+    opened_at: datetime = Field(index=True)
+    closed_at: Optional[datetime] = Field(default=None)
+    piece_count: int = Field(default=0)
+    archived_at: datetime = Field(default_factory=datetime.utcnow, description="Data do arquivamento")
+
+
+class ArchivedPiece(SQLModel, table=True):
+    """
+    Peça movida para o arquivo junto com sua caixa (ou reprovada antiga).
+    
+    Mesmas colunas de Piece, mantendo o ID original; box_id aponta para
+    box_archive.
+    """
+    
+    __tablename__ = "piece_archive"
+    
+    id: str = Field(primary_key=True, description="Identificador único da peça")
+    peso: float = Field(description="Peso em gramas")
+    cor: Color = Field(description="Cor da peça")
+    comprimento: float = Field(description="Comprimento em centímetros")
+    status: PieceStatus = Field(description="Status de aprovação")
+    rejection_reasons: List[str] = Field(
+        default_factory=list,
+        sa_column=Column(JSON),
+        description="Lista de motivos de reprovação"
+    )
+    rejection_mask: int = Field(default=0, description="Máscara de bits dos motivos de reprovação")
+    box_id: Optional[int] = Field(default=None, index=True, description="ID da caixa arquivada")
+    created_at: datetime = Field(index=True, description="Data de criação")
+    archived_at: datetime = Field(default_factory=datetime.utcnow, description="Data do arquivamento")
@@ -1,5 +1,6 @@
 from datetime import datetime
 from typing import Optional, TYPE_CHECKING
+from sqlalchemy import Index, text
 from sqlmodel import SQLModel, Field, Relationship
 from app.models.enums import BoxStatus
 
@@ -10,10 +11,35 @@ if TYPE_CHECKING:
 class Box(SQLModel, table=True):
     """Model de Caixa para armazenar peças aprovadas"""
     
+    __table_args__ = (
+        # Índice único parcial: no máximo uma caixa aberta por partição, garantido pelo banco
+        Index(
+            "uq_box_open_per_partition",
+            "partition",
+            "status",
+            unique=True,
+            sqlite_where=text("status = 'OPEN'"),
+            postgresql_where=text("status = 'OPEN'"),
+        ),
+        # Listagem de caixas filtrada por partição, em ordem de abertura
+        Index("ix_box_partition_opened_at", "partition", "opened_at"),
+        # Listagem de caixas filtrada por status, em ordem de abertura
+        Index("ix_box_status_opened_at", "status", "opened_at"),
+        # Listagem paginada (keyset) sem filtros, em ordem (opened_at, id)
+        Index("ix_box_opened_at_id", "opened_at", "id"),
+        # IDs nunca reutilizados no SQLite (sem AUTOINCREMENT, o próximo ID é
+        # o maior existente + 1 e repetiria IDs de caixas arquivadas)
+        {"sqlite_autoincrement": True},
+    )
+    
     id: Optional[int] = Field(default=None, primary_key=True)
+    # Valor da chave de partição (BOX_PARTITION_BY) das peças da caixa; "" sem particionamento
+    partition: str = Field(default="")
     status: BoxStatus = Field(default=BoxStatus.OPEN)
     opened_at: datetime = Field(default_factory=datetime.utcnow)
     closed_at: Optional[datetime] = Field(default=None)
+    # Contador desnormalizado de peças, mantido pelo boxing_service
+    piece_count: int = Field(default=0)
     
     # Relacionamento com Piece (one-to-many)
     pieces: list["Piece"] = Relationship(back_populates="box")
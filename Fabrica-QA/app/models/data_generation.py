@@ -0,0 +1,22 @@
+import uuid
+from sqlmodel import SQLModel, Field
+
+
+class DataGeneration(SQLModel, table=True):
+    """
+    Contador de versão dos dados de peças, caixas e agregados.
+    
+    Tabela de linha única (id=1) incrementada logo após o commit de toda
+    transação que altera essas tabelas, em uma transação própria; serve de
+    chave para o cache de respostas (ETag), compartilhada entre workers
+    através do banco.
+    """
+    
+    __tablename__ = "data_generation"
+    
+    id: int = Field(default=1, primary_key=True)
+    epoch: str = Field(
+        default_factory=lambda: uuid.uuid4().hex,
+        description="Identificador aleatório do banco (ETags não se repetem se o banco for recriado)"
+    )
+    generation: int = Field(default=0, description="Incrementado a cada transação de escrita")
@@ -18,3 +18,23 @@ class BoxStatus(str, Enum):
     OPEN = "open"
     CLOSED = "closed"
 
+
+class RejectionReason(str, Enum):
+    """Critérios de reprovação (usados em filtros por motivo)"""
+    PESO = "peso"
+    COR = "cor"
+    COMPRIMENTO = "comprimento"
+
+
+class Granularity(str, Enum):
+    """Tamanho do intervalo nos relatórios por tempo"""
+    MINUTE = "minute"
+    HOUR = "hour"
+    DAY = "day"
+
+
+class IngestStatus(str, Enum):
+    """Situação de um cadastro recebido pela fila de ingestão (/ingest)"""
+    QUEUED = "queued"
+    CREATED = "created"
+    DUPLICATE = "duplicate"
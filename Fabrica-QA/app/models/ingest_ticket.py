@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import SQLModel, Field
+from app.models.enums import IngestStatus
+
+
+class IngestTicket(SQLModel, table=True):
+    """
+    Resultado de um cadastro recebido pela fila de ingestão (POST /ingest).
+    
+    Gravado na mesma transação que cadastra a peça: se o ticket existe, a
+    peça já foi processada, o que permite reprocessar o journal após uma
+    queda sem cadastrar nada duas vezes.
+    """
+    
+    __tablename__ = "ingest_ticket"
+    
+    ticket: str = Field(primary_key=True, description="Identificador devolvido no 202")
+    piece_id: str = Field(index=True, description="ID da peça enviada")
+    status: IngestStatus = Field(description="created ou duplicate")
+    received_at: datetime = Field(description="Recebimento (gravação no journal)")
+    processed_at: datetime = Field(default_factory=datetime.utcnow, description="Processamento no banco")
+    box_id: Optional[int] = Field(default=None, description="Caixa em que a peça foi alocada (se aprovada)")
@@ -1,5 +1,6 @@
 from datetime import datetime
 from typing import Optional, List, TYPE_CHECKING
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship, Column, JSON
 from app.models.enums import Color, PieceStatus
 
@@ -10,16 +11,28 @@ if TYPE_CHECKING:
 class Piece(SQLModel, table=True):
     """Model de Peça fabricada"""
     
+    __table_args__ = (
+        # Peças de uma caixa em ordem de cadastro (detalhe da caixa, remoções e compactação)
+        Index("ix_piece_box_id_created_at", "box_id", "created_at"),
+        # Listagem paginada (keyset) em ordem (created_at, id)
+        Index("ix_piece_created_at_id", "created_at", "id"),
+    )
+    
     id: str = Field(primary_key=True, description="Identificador único da peça")
     peso: float = Field(description="Peso em gramas")
     cor: Color = Field(description="Cor da peça")
     comprimento: float = Field(description="Comprimento em centímetros")
-    status: PieceStatus = Field(description="Status de aprovação")
+    status: PieceStatus = Field(index=True, description="Status de aprovação")
     rejection_reasons: List[str] = Field(
         default_factory=list,
         sa_column=Column(JSON),
         description="Lista de motivos de reprovação"
     )
+    rejection_mask: int = Field(
+        default=0,
+        index=True,
+        description="Máscara de bits dos motivos de reprovação (ver quality_service.REASON_*)"
+    )
     box_id: Optional[int] = Field(default=None, foreign_key="box.id", description="ID da caixa onde está armazenada")
     created_at: datetime = Field(default_factory=datetime.utcnow, description="Data de criação")
     
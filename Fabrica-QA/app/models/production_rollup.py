@@ -0,0 +1,26 @@
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+
+
+class ProductionRollup(SQLModel, table=True):
+    """
+    Contagens de produção por intervalo de tempo (minuto, hora e dia).
+    
+    Uma linha por (granularity, bucket_start, partition), atualizada na mesma
+    transação de cada cadastro/remoção de peça e fechamento/reabertura de
+    caixa. Peças contam no intervalo de created_at e na partição da peça;
+    caixas, no de closed_at e na partição da caixa. Os relatórios somam as
+    partições de cada intervalo.
+    """
+    
+    __tablename__ = "production_rollup"
+    
+    granularity: str = Field(primary_key=True, description="minute, hour ou day")
+    bucket_start: datetime = Field(primary_key=True, description="Início do intervalo (UTC)")
+    partition: str = Field(default="", primary_key=True, description="Partição; vazio sem particionamento")
+    aprovadas: int = Field(default=0, description="Peças aprovadas cadastradas no intervalo")
+    reprovadas: int = Field(default=0, description="Peças reprovadas cadastradas no intervalo")
+    motivo_peso: int = Field(default=0, description="Reprovações por peso fora da faixa")
+    motivo_cor: int = Field(default=0, description="Reprovações por cor inválida")
+    motivo_comprimento: int = Field(default=0, description="Reprovações por comprimento fora da faixa")
+    caixas_fechadas: int = Field(default=0, description="Caixas fechadas no intervalo")
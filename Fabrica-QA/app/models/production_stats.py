@@ -0,0 +1,22 @@
+from sqlmodel import SQLModel, Field
+
+
+class ProductionStats(SQLModel, table=True):
+    """
+    Agregados de produção mantidos incrementalmente, um por partição.
+    
+    Uma linha por partição de caixas (ver partition_service): peças contam
+    na partição da peça e caixas, na partição da caixa. Cada cadastro/remoção
+    de peça e criação/exclusão de caixa atualiza apenas a linha da sua
+    partição, na mesma transação; os totais da fábrica são a soma das linhas.
+    """
+    
+    __tablename__ = "production_stats"
+    
+    partition: str = Field(default="", primary_key=True, description="Partição; vazio sem particionamento")
+    total_aprovadas: int = Field(default=0, description="Total de peças aprovadas")
+    total_reprovadas: int = Field(default=0, description="Total de peças reprovadas")
+    motivo_peso: int = Field(default=0, description="Reprovações por peso fora da faixa")
+    motivo_cor: int = Field(default=0, description="Reprovações por cor inválida")
+    motivo_comprimento: int = Field(default=0, description="Reprovações por comprimento fora da faixa")
+    total_caixas: int = Field(default=0, description="Total de caixas (abertas e fechadas)")
@@ -0,0 +1,16 @@
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+
+
+class SchemaVersion(SQLModel, table=True):
+    """
+    Migrações de schema aplicadas ao banco (app.db.migrations).
+    
+    Uma linha por versão aplicada; a maior versão é a versão atual do schema.
+    """
+    
+    __tablename__ = "schema_version"
+    
+    version: int = Field(primary_key=True, description="Número da migração")
+    description: str = Field(description="Descrição da migração")
+    applied_at: datetime = Field(default_factory=datetime.utcnow, description="Data de aplicação")
@@ -1,14 +1,21 @@
-from app.schemas.piece import PieceCreate, PieceResponse, PieceListResponse
+from app.schemas.piece import PieceCreate, PieceResponse, PieceListResponse, PieceBatchCreate, PieceBatchResponse
 from app.schemas.box import BoxResponse, BoxListResponse
-from app.schemas.report import FinalReportResponse, RejectionReasonCount
+from app.schemas.report import FinalReportResponse, RejectionReasonCount, TimeseriesBucket, TimeseriesResponse
+from app.schemas.ingest import IngestAcceptedResponse, IngestStatusResponse
 
 __all__ = [
     "PieceCreate",
     "PieceResponse",
     "PieceListResponse",
+    "PieceBatchCreate",
+    "PieceBatchResponse",
     "BoxResponse",
     "BoxListResponse",
     "FinalReportResponse",
+    "TimeseriesBucket",
+    "TimeseriesResponse",
     "RejectionReasonCount",
+    "IngestAcceptedResponse",
+    "IngestStatusResponse",
 ]
 
@@ -8,6 +8,7 @@ from app.schemas.piece import PieceResponse
 class BoxResponse(BaseModel):
     """Schema de resposta para caixa"""
     id: int
+    partition: str = Field(default="", description="Partição da caixa (ex.: cor das peças); vazio sem particionamento")
     status: BoxStatus
     opened_at: datetime
     closed_at: Optional[datetime] = None
@@ -18,6 +19,7 @@ class BoxResponse(BaseModel):
         json_schema_extra = {
             "example": {
                 "id": 1,
+                "partition": "azul",
                 "status": "closed",
                 "opened_at": "2024-01-01T12:00:00",
                 "closed_at": "2024-01-01T12:30:00",
@@ -32,9 +34,11 @@ class BoxDetailResponse(BoxResponse):
 
 
 class BoxListResponse(BaseModel):
-    """Schema de resposta para lista de caixas"""
+    """Schema de resposta para lista paginada de caixas"""
     items: List[BoxResponse]
-    total: int
+    total: Optional[int] = Field(default=None, description="Total de caixas (None se não solicitado)")
+    total_estimated: bool = Field(default=False, description="True se total for estimativa do banco")
+    next_cursor: Optional[str] = Field(default=None, description="Cursor da próxima página (None se for a última)")
 
 
 class ReallocatedPieceInfo(BaseModel):
@@ -70,3 +74,17 @@ class BoxDeleteResponse(BaseModel):
                 "boxes_created": 1
             }
         }
+
+
+class BoxBatchDeleteResponse(BaseModel):
+    """Schema de resposta para exclusão de várias caixas"""
+    message: str = Field(..., description="Mensagem de sucesso")
+    deleted_box_ids: List[int] = Field(default_factory=list, description="IDs das caixas excluídas")
+    reallocated_pieces: List[ReallocatedPieceInfo] = Field(
+        default_factory=list,
+        description="Lista de peças realocadas"
+    )
+    boxes_created: int = Field(
+        default=0,
+        description="Número de novas caixas criadas durante a realocação"
+    )
@@ -0,0 +1,31 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, Field
+from app.models.enums import IngestStatus
+from app.schemas.piece import PieceResponse
+
+
+class IngestAcceptedResponse(BaseModel):
+    """Schema de resposta (202) para cadastro recebido pela fila de ingestão"""
+    ticket: str = Field(..., description="Identificador para consultar GET /ingest/{ticket}")
+    status: IngestStatus = Field(default=IngestStatus.QUEUED)
+    received_at: datetime
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "ticket": "4f9c2b7e0d5a4c1e9b3f6a8d2c7e1f0a",
+                "status": "queued",
+                "received_at": "2024-01-01T10:00:00"
+            }
+        }
+
+
+class IngestStatusResponse(BaseModel):
+    """Schema de resposta para a situação de um cadastro da fila de ingestão"""
+    ticket: str
+    piece_id: str
+    status: IngestStatus = Field(..., description="queued, created ou duplicate")
+    received_at: datetime
+    processed_at: Optional[datetime] = None
+    piece: Optional[PieceResponse] = Field(default=None, description="Peça cadastrada (status created)")
@@ -1,6 +1,6 @@
 from datetime import datetime
-from typing import Optional, List
-from pydantic import BaseModel, Field
+from typing import Any, Optional, List
+from pydantic import BaseModel, Field, model_validator
 from app.models.enums import Color, PieceStatus
 
 
@@ -33,6 +33,20 @@ class PieceResponse(BaseModel):
     box_id: Optional[int] = None
     created_at: datetime
     
+    @model_validator(mode="before")
+    @classmethod
+    def derive_rejection_reasons(cls, data: Any) -> Any:
+        """Ao ler do model Piece, deriva rejection_reasons da máscara de bits"""
+        mask = getattr(data, "rejection_mask", None)
+        if mask is None:
+            return data
+        
+        from app.services.quality_service import reasons_from_mask
+        
+        values = {name: getattr(data, name) for name in cls.model_fields if hasattr(data, name)}
+        values["rejection_reasons"] = reasons_from_mask(mask)
+        return values
+    
     class Config:
         from_attributes = True
         json_schema_extra = {
@@ -52,9 +66,11 @@ class PieceResponse(BaseModel):
 class PieceListResponse(BaseModel):
     """Schema de resposta para lista paginada de peças"""
     items: List[PieceResponse]
-    total: int
+    total: Optional[int] = Field(default=None, description="Total de peças (None se não solicitado)")
+    total_estimated: bool = Field(default=False, description="True se total for estimativa do banco")
     limit: int
     offset: int
+    next_cursor: Optional[str] = Field(default=None, description="Cursor da próxima página (None se for a última)")
 
 
 class PieceDeleteResponse(BaseModel):
@@ -73,3 +89,76 @@ class PieceDeleteResponse(BaseModel):
                 "to_box_id": 1
             }
         }
+
+
+class PieceBulkDelete(BaseModel):
+    """Schema para remoção de peças em bloco (IDs e/ou intervalo de cadastro)"""
+    ids: Optional[List[str]] = Field(default=None, min_length=1, max_length=10000, description="IDs das peças a remover")
+    desde: Optional[datetime] = Field(default=None, description="Remove peças cadastradas a partir desta data (inclusive)")
+    ate: Optional[datetime] = Field(default=None, description="Remove peças cadastradas antes desta data")
+    
+    @model_validator(mode="after")
+    def require_criteria(self) -> "PieceBulkDelete":
+        """Exige ao menos um critério: sem filtro, removeria todas as peças"""
+        if self.ids is None and self.desde is None and self.ate is None:
+            raise ValueError("Informe ids, desde ou ate")
+        return self
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "ids": ["P001", "P002", "P003"]
+            }
+        }
+
+
+class PieceMoveGroup(BaseModel):
+    """Peças movidas de uma caixa para outra na compactação"""
+    from_box_id: int
+    to_box_id: int
+    piece_ids: List[str]
+
+
+class PieceBulkDeleteResponse(BaseModel):
+    """Schema de resposta para remoção de peças em bloco"""
+    message: str = Field(..., description="Mensagem de sucesso")
+    deleted: int = Field(..., description="Quantidade de peças removidas")
+    deleted_piece_ids: List[str] = Field(default_factory=list, description="IDs das peças removidas")
+    moves: List[PieceMoveGroup] = Field(default_factory=list, description="Peças movidas, agrupadas por origem e destino")
+    moved_pieces: int = Field(default=0, description="Total de peças movidas")
+    closed_box_ids: List[int] = Field(default_factory=list, description="Caixas fechadas na compactação")
+    reopened_box_ids: List[int] = Field(default_factory=list, description="Caixas reabertas na compactação")
+    removed_box_ids: List[int] = Field(default_factory=list, description="Caixas esvaziadas e excluídas")
+
+
+class PieceBatchCreate(BaseModel):
+    """Schema para cadastro de peças em lote"""
+    pieces: List[PieceCreate] = Field(..., min_length=1, max_length=5000, description="Peças a cadastrar")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "pieces": [
+                    {"id": "P001", "peso": 100.0, "cor": "azul", "comprimento": 15.0},
+                    {"id": "P002", "peso": 90.0, "cor": "verde", "comprimento": 15.0}
+                ]
+            }
+        }
+
+
+class PieceBatchItem(BaseModel):
+    """Resultado do cadastro de uma peça do lote"""
+    id: str
+    status: Optional[PieceStatus] = Field(default=None, description="Status da peça (None se duplicada)")
+    box_id: Optional[int] = Field(default=None, description="ID da caixa se aprovada")
+    rejection_reasons: List[str] = Field(default_factory=list)
+    duplicate: bool = Field(default=False, description="True se o ID já existia e a peça foi ignorada")
+
+
+class PieceBatchResponse(BaseModel):
+    """Schema de resposta para cadastro de peças em lote"""
+    items: List[PieceBatchItem]
+    created: int = Field(..., description="Quantidade de peças cadastradas")
+    duplicates: int = Field(..., description="Quantidade de peças ignoradas por ID duplicado")
+    boxes_opened: int = Field(..., description="Caixas abertas durante o lote")
+    boxes_closed: int = Field(..., description="Caixas fechadas durante o lote")
@@ -1,5 +1,7 @@
+from datetime import datetime
 from typing import Dict, List
 from pydantic import BaseModel, Field
+from app.models.enums import Granularity
 
 
 class RejectionReasonCount(BaseModel):
@@ -32,3 +34,46 @@ class FinalReportResponse(BaseModel):
             }
         }
 
+
+class TimeseriesBucket(BaseModel):
+    """Produção em um intervalo de tempo"""
+    bucket_start: datetime = Field(..., description="Início do intervalo (UTC)")
+    total_aprovadas: int = Field(..., description="Peças aprovadas cadastradas no intervalo")
+    total_reprovadas: int = Field(..., description="Peças reprovadas cadastradas no intervalo")
+    motivo_contagem: List[RejectionReasonCount] = Field(
+        default_factory=list,
+        description="Contagem de reprovações por motivo no intervalo"
+    )
+    caixas_fechadas: int = Field(..., description="Caixas fechadas no intervalo")
+
+
+class TimeseriesResponse(BaseModel):
+    """Schema de resposta para relatório de produção por intervalo de tempo"""
+    granularity: Granularity
+    desde: datetime = Field(..., description="Início do período (inclusive)")
+    ate: datetime = Field(..., description="Fim do período (exclusivo)")
+    buckets: List[TimeseriesBucket] = Field(
+        default_factory=list,
+        description="Intervalos com produção, em ordem cronológica (intervalos vazios são omitidos)"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "granularity": "hour",
+                "desde": "2024-01-01T00:00:00",
+                "ate": "2024-01-02T00:00:00",
+                "buckets": [
+                    {
+                        "bucket_start": "2024-01-01T08:00:00",
+                        "total_aprovadas": 120,
+                        "total_reprovadas": 8,
+                        "motivo_contagem": [
+                            {"motivo": "peso fora da faixa", "quantidade": 5},
+                            {"motivo": "cor inválida", "quantidade": 3}
+                        ],
+                        "caixas_fechadas": 12
+                    }
+                ]
+            }
+        }
@@ -1,16 +1,29 @@
-from app.services.quality_service import evaluate_piece
+from app.services.quality_service import evaluate_piece, evaluate_pieces, reasons_from_mask, mask_from_reasons
 from app.services.boxing_service import (
     find_or_create_open_box,
     allocate_piece_to_box,
     remove_piece_from_box,
+    allocate_pieces_in_batch,
 )
 from app.services.report_service import generate_final_report
+from app.services.timeseries_service import generate_timeseries_report
+from app.services.ingestion_service import ingest_piece, ingest_pieces_batch
+from app.services.generation_service import current_generation, bump_data_generation
 
 __all__ = [
     "evaluate_piece",
+    "evaluate_pieces",
+    "reasons_from_mask",
+    "mask_from_reasons",
     "find_or_create_open_box",
     "allocate_piece_to_box",
     "remove_piece_from_box",
+    "allocate_pieces_in_batch",
     "generate_final_report",
+    "generate_timeseries_report",
+    "ingest_piece",
+    "ingest_pieces_batch",
+    "current_generation",
+    "bump_data_generation",
 ]
 
@@ -0,0 +1,142 @@
+from datetime import datetime
+from typing import Any, Dict, List
+from sqlalchemy import delete, insert, literal
+from sqlmodel import Session, select
+from app.models.archive import ArchivedBox, ArchivedPiece
+from app.models.box import Box
+from app.models.piece import Piece
+from app.models.enums import BoxStatus
+from app.services.boxing_service import BOX_CAPACITY
+from app.services.events_service import emit_event
+
+# Caixas arquivadas por transação (as peças reprovadas vão em lotes de
+# ARCHIVE_BATCH_BOXES * BOX_CAPACITY)
+ARCHIVE_BATCH_BOXES = 100
+
+# Quantidade máxima de IDs por consulta IN (evita limites de parâmetros do SQLite)
+ARCHIVE_ID_CHUNK = 500
+
+BOX_ARCHIVE_COLUMNS = ["id", "partition", "status", "opened_at", "closed_at", "piece_count"]
+
+PIECE_ARCHIVE_COLUMNS = [
+    "id",
+    "peso",
+    "cor",
+    "comprimento",
+    "status",
+    "rejection_reasons",
+    "rejection_mask",
+    "box_id",
+    "created_at",
+]
+
+
+def _copy_rows(session: Session, source, target, columns: List[str], key, ids: List[Any], archived_at: datetime) -> int:
+    """Copia as linhas (INSERT ... SELECT) de source para target, em blocos de IDs"""
+    copied = 0
+    for start in range(0, len(ids), ARCHIVE_ID_CHUNK):
+        chunk = ids[start:start + ARCHIVE_ID_CHUNK]
+        rows = select(
+            *[getattr(source, column) for column in columns],
+            literal(archived_at, target.__table__.c.archived_at.type)
+        ).where(key.in_(chunk))
+        result = session.execute(insert(target).from_select(columns + ["archived_at"], rows))
+        copied += result.rowcount
+    return copied
+
+
+def _delete_rows(session: Session, model, key, ids: List[Any]) -> None:
+    for start in range(0, len(ids), ARCHIVE_ID_CHUNK):
+        session.execute(
+            delete(model)
+            .where(key.in_(ids[start:start + ARCHIVE_ID_CHUNK]))
+            .execution_options(synchronize_session=False)
+        )
+
+
+def archive_batch(session: Session, cutoff: datetime, batch_boxes: int = ARCHIVE_BATCH_BOXES) -> Dict[str, Any]:
+    """
+    Move um lote de dados antigos das tabelas ativas para o arquivo.
+    
+    Em uma transação: até batch_boxes caixas fechadas antes de cutoff, com
+    suas peças, e até batch_boxes * BOX_CAPACITY peças sem caixa
+    (reprovadas) cadastradas antes de cutoff. As linhas são copiadas para
+    box_archive/piece_archive e removidas de box/piece, deixando nas
+    tabelas ativas apenas o que a alocação e as listagens usam.
+    
+    Os agregados (relatório final e por intervalo) não mudam: dados
+    arquivados continuam contados. Linhas travadas
+    por outra transação (no PostgreSQL) ficam para o próximo lote.
+    
+    Args:
+        session: Sessão do banco de dados
+        cutoff: Arquiva caixas fechadas e peças sem caixa anteriores a esta data
+        batch_boxes: Máximo de caixas no lote
+        
+    Returns:
+        Dicionário com:
+        - boxes: Caixas arquivadas
+        - pieces: Peças arquivadas (das caixas e sem caixa)
+        - done: False se algum limite do lote foi atingido (há mais a arquivar)
+    """
+    archived_at = datetime.utcnow()
+    piece_limit = batch_boxes * BOX_CAPACITY
+    
+    box_ids = list(session.exec(
+        select(Box.id)
+        .where(Box.status == BoxStatus.CLOSED, Box.closed_at < cutoff)
+        .order_by(Box.closed_at, Box.id)
+        .limit(batch_boxes)
+        .with_for_update(skip_locked=True)
+    ).all())
+    
+    loose_piece_ids = list(session.exec(
+        select(Piece.id)
+        .where(Piece.box_id.is_(None), Piece.created_at < cutoff)
+        .order_by(Piece.created_at, Piece.id)
+        .limit(piece_limit)
+        .with_for_update(skip_locked=True)
+    ).all())
+    
+    pieces = 0
+    if box_ids:
+        _copy_rows(session, Box, ArchivedBox, BOX_ARCHIVE_COLUMNS, Box.id, box_ids, archived_at)
+        pieces += _copy_rows(session, Piece, ArchivedPiece, PIECE_ARCHIVE_COLUMNS, Piece.box_id, box_ids, archived_at)
+        # Peças antes das caixas (chave estrangeira piece.box_id)
+        _delete_rows(session, Piece, Piece.box_id, box_ids)
+        _delete_rows(session, Box, Box.id, box_ids)
+    if loose_piece_ids:
+        pieces += _copy_rows(session, Piece, ArchivedPiece, PIECE_ARCHIVE_COLUMNS, Piece.id, loose_piece_ids, archived_at)
+        _delete_rows(session, Piece, Piece.id, loose_piece_ids)
+    
+    if box_ids or loose_piece_ids:
+        emit_event(session, "boxes.archived", {"box_ids": box_ids, "pieces": pieces})
+        session.commit()
+    
+    return {
+        "boxes": len(box_ids),
+        "pieces": pieces,
+        "done": len(box_ids) < batch_boxes and len(loose_piece_ids) < piece_limit,
+    }
+
+
+def archive_older_than(session: Session, cutoff: datetime, batch_boxes: int = ARCHIVE_BATCH_BOXES) -> Dict[str, int]:
+    """
+    Arquiva tudo o que for anterior a cutoff, um lote (transação) por vez.
+    
+    Args:
+        session: Sessão do banco de dados
+        cutoff: Data limite (ver archive_batch)
+        batch_boxes: Máximo de caixas por lote
+        
+    Returns:
+        Totais arquivados: boxes, pieces e batches
+    """
+    totals = {"boxes": 0, "pieces": 0, "batches": 0}
+    while True:
+        result = archive_batch(session, cutoff, batch_boxes)
+        totals["boxes"] += result["boxes"]
+        totals["pieces"] += result["pieces"]
+        totals["batches"] += 1
+        if result["done"]:
+            return totals
@@ -1,74 +1,217 @@
 from datetime import datetime
-from typing import Any, Dict, List, Optional
-from sqlmodel import Session, select
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import case, delete, false, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select, func
 from app.models.box import Box
 from app.models.piece import Piece
 from app.models.enums import BoxStatus, PieceStatus
+from app.services.partition_service import BOX_CAPACITY, DEFAULT_PARTITION, box_capacity, partition_key, piece_partition
+from app.services.report_service import record_boxes_created, record_boxes_deleted
+from app.services.timeseries_service import record_box_closures
+from app.services.events_service import emit_event, emit_box_event
+from app.services.metrics_service import count_metric
+from app.core.metrics import BOXES_CLOSED, BOXES_REOPENED, PIECES_MOVED
 
-# Capacidade máxima de peças por caixa
-BOX_CAPACITY = 10
+# Peças por UPDATE em bloco na realocação de caixas excluídas
+REALLOCATION_UPDATE_CHUNK = 500
 
 
-def find_or_create_open_box(session: Session) -> Box:
+def _begin_write(session: Session) -> None:
     """
-    Busca uma caixa aberta ou cria uma nova se não houver.
-    Garante que não existam múltiplas caixas abertas (fecha as extras).
+    SQLite: não há lock de linha; um UPDATE sem efeito inicia a transação
+    de escrita, serializando os escritores (inclusive entre processos).
+    """
+    if session.get_bind().dialect.name == "sqlite":
+        session.execute(
+            update(Box)
+            .where(false())
+            .values(piece_count=Box.piece_count)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def lock_open_box(session: Session, partition: str = DEFAULT_PARTITION) -> Optional[Box]:
+    """
+    Busca a caixa aberta da partição travando-a para escrita até o fim da transação.
     
+    - PostgreSQL: SELECT ... FOR UPDATE na linha da caixa aberta da
+      partição; alocações concorrentes na mesma partição esperam o commit e
+      então leem o contador atualizado, as das demais partições seguem
+    - SQLite: não há lock de linha (ver _begin_write); os escritores são
+      serializados independentemente da partição
+      
     Args:
         session: Sessão do banco de dados
+        partition: Partição da caixa (ver piece_partition)
         
     Returns:
-        Box aberta (mais antiga se houver múltiplas)
+        Box aberta travada, ou None se não houver caixa aberta na partição
     """
-    # Busca todas as caixas abertas ordenadas por data de abertura
-    statement = select(Box).where(Box.status == BoxStatus.OPEN).order_by(Box.opened_at)
-    open_boxes = session.exec(statement).all()
+    _begin_write(session)
+    statement = (
+        select(Box)
+        .where(Box.status == BoxStatus.OPEN, Box.partition == partition)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    return session.exec(statement).first()
+
+
+def lock_open_boxes(session: Session, partitions: Optional[Iterable[str]] = None) -> Dict[str, Box]:
+    """
+    Trava as caixas abertas de várias partições (todas, se partitions for None).
     
-    if len(open_boxes) == 0:
-        # Cria nova caixa
-        open_box = Box(
-            status=BoxStatus.OPEN,
-            opened_at=datetime.utcnow()
-        )
+    As linhas são travadas em ordem de partição: transações que travam
+    mais de uma caixa aberta não entram em deadlock entre si.
+    
+    Returns:
+        Dicionário partição -> caixa aberta travada (partições sem caixa aberta ficam de fora)
+    """
+    _begin_write(session)
+    statement = select(Box).where(Box.status == BoxStatus.OPEN)
+    if partitions is not None:
+        statement = statement.where(Box.partition.in_(list(partitions)))
+    statement = (
+        statement
+        .order_by(Box.partition)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    return {box.partition: box for box in session.exec(statement).all()}
+
+
+def _create_open_box(session: Session, partition: str = DEFAULT_PARTITION) -> Tuple[Box, bool]:
+    """
+    Cria a caixa aberta da partição respeitando o índice único parcial de caixa aberta.
+    
+    Se outro processo criar a caixa aberta ao mesmo tempo, a inserção desta
+    viola o índice; nesse caso usa a caixa criada pelo outro processo.
+    
+    Returns:
+        Tupla (caixa aberta travada, True se foi criada por esta transação)
+    """
+    open_box = Box(
+        partition=partition,
+        status=BoxStatus.OPEN,
+        opened_at=datetime.utcnow()
+    )
+    
+    if session.get_bind().dialect.name == "sqlite":
+        # Escritores já serializados por lock_open_box
         session.add(open_box)
-        session.commit()
-        session.refresh(open_box)
-        return open_box
+        session.flush()
+    else:
+        try:
+            with session.begin_nested():
+                session.add(open_box)
+        except IntegrityError:
+            existing_box = lock_open_box(session, partition)
+            if existing_box is None:
+                raise
+            return existing_box, False
     
-    # Mantém apenas a mais antiga aberta, fecha as outras
-    open_box = open_boxes[0]
+    record_boxes_created(session, [open_box])
+    emit_box_event(session, "box.opened", open_box)
+    return open_box, True
+
+
+def find_or_create_open_box(session: Session, partition: str = DEFAULT_PARTITION) -> Box:
+    """
+    Busca a caixa aberta da partição ou cria uma nova se não houver.
     
-    if len(open_boxes) > 1:
-        # Fecha todas as caixas abertas extras (exceto a mais antiga)
+    A caixa fica travada até o fim da transação (ver lock_open_box) e o
+    índice único parcial em (box.partition, box.status) garante no máximo
+    uma caixa aberta por partição, mesmo com vários workers. Não faz commit.
+    
+    Args:
+        session: Sessão do banco de dados
+        partition: Partição da caixa (ver piece_partition)
+        
+    Returns:
+        Box aberta
+    """
+    open_box = lock_open_box(session, partition)
+    if open_box is None:
+        open_box, _ = _create_open_box(session, partition)
+    return open_box
+
+
+def close_box(session: Session, box: Box, closed_at: Optional[datetime] = None) -> None:
+    """
+    Fecha a caixa e contabiliza o fechamento no relatório por intervalo.
+    
+    Args:
+        session: Sessão do banco de dados
+        box: Caixa a fechar
+        closed_at: Data de fechamento (padrão: agora)
+    """
+    box.status = BoxStatus.CLOSED
+    box.closed_at = closed_at or datetime.utcnow()
+    session.add(box)
+    record_box_closures(session, [box])
+    count_metric(session, BOXES_CLOSED)
+    emit_box_event(session, "box.closed", box)
+
+
+def merge_extra_open_boxes(session: Session) -> int:
+    """
+    Corrige bancos com mais de uma caixa aberta na mesma partição (anteriores ao índice único).
+    
+    Em cada partição, as peças das caixas extras são movidas para a caixa
+    aberta mais antiga até a capacidade; quando ela enche, é fechada e a
+    caixa extra com as peças restantes passa a ser a caixa aberta. Caixas
+    esvaziadas são fechadas.
+    
+    Args:
+        session: Sessão do banco de dados
+        
+    Returns:
+        Número de caixas fechadas
+    """
+    statement = select(Box).where(Box.status == BoxStatus.OPEN).order_by(Box.partition, Box.opened_at)
+    open_boxes_by_partition: Dict[str, List[Box]] = {}
+    for box in session.exec(statement).all():
+        open_boxes_by_partition.setdefault(box.partition, []).append(box)
+    
+    extra = [boxes for boxes in open_boxes_by_partition.values() if len(boxes) > 1]
+    if not extra:
+        return 0
+    
+    now = datetime.utcnow()
+    closed = 0
+    for open_boxes in extra:
+        capacity = box_capacity(open_boxes[0].partition)
+        open_box = open_boxes[0]
         for extra_box in open_boxes[1:]:
-            # Verifica se a caixa tem peças antes de fechar
-            piece_count = count_pieces_in_box(session, extra_box.id)
-            if piece_count >= BOX_CAPACITY:
-                # Se já tem 10 ou mais peças, fecha normalmente
-                extra_box.status = BoxStatus.CLOSED
-                extra_box.closed_at = datetime.utcnow()
-            else:
-                # Se tem menos de 10 peças, move para a caixa principal antes de fechar
-                pieces_statement = select(Piece).where(
-                    Piece.box_id == extra_box.id,
-                    Piece.status == PieceStatus.APPROVED
-                ).order_by(Piece.created_at)
-                pieces_to_move = session.exec(pieces_statement).all()
-                
-                for p in pieces_to_move:
-                    p.box_id = open_box.id
-                    session.add(p)
-                
-                # Fecha a caixa extra
-                extra_box.status = BoxStatus.CLOSED
-                extra_box.closed_at = datetime.utcnow()
+            pieces_statement = select(Piece).where(
+                Piece.box_id == extra_box.id,
+                Piece.status == PieceStatus.APPROVED
+            ).order_by(Piece.created_at)
+            pieces_to_move = session.exec(pieces_statement).all()
+            pieces_to_move = pieces_to_move[:max(capacity - open_box.piece_count, 0)]
+            
+            for p in pieces_to_move:
+                p.box_id = open_box.id
+                session.add(p)
             
-            session.add(extra_box)
+            open_box.piece_count += len(pieces_to_move)
+            extra_box.piece_count -= len(pieces_to_move)
+            
+            if open_box.piece_count >= capacity and extra_box.piece_count > 0:
+                # Caixa mantida encheu: fecha e continua com a caixa extra
+                close_box(session, open_box, now)
+                open_box = extra_box
+            else:
+                close_box(session, extra_box, now)
         
-        session.commit()
-        session.refresh(open_box)
+        if open_box.piece_count >= capacity:
+            close_box(session, open_box, now)
+        session.add(open_box)
+        closed += len(open_boxes) - sum(1 for b in open_boxes if b.status == BoxStatus.OPEN)
     
-    return open_box
+    session.commit()
+    return closed
 
 
 def allocate_piece_to_box(session: Session, piece: Piece, box: Box) -> Box:
@@ -84,23 +227,10 @@ def allocate_piece_to_box(session: Session, piece: Piece, box: Box) -> Box:
     Returns:
         Box atualizada (pode estar fechada se atingiu capacidade)
     """
-    # Conta peças existentes na caixa (antes de adicionar a nova)
-    statement = select(Piece).where(
-        Piece.box_id == box.id,
-        Piece.status == PieceStatus.APPROVED
-    )
-    pieces_in_box = session.exec(statement).all()
-    piece_count = len(pieces_in_box)
-    
-    # Atualiza peça com box_id
+    # Atualiza peça com box_id e o contador da caixa
     piece.box_id = box.id
     session.add(piece)
-    
-    # Se após adicionar esta peça atingir capacidade, fecha a caixa
-    if (piece_count + 1) >= BOX_CAPACITY and box.status == BoxStatus.OPEN:
-        box.status = BoxStatus.CLOSED
-        box.closed_at = datetime.utcnow()
-        session.add(box)
+    count_piece_in_box(session, box)
     
     session.commit()
     session.refresh(box)
@@ -108,9 +238,127 @@ def allocate_piece_to_box(session: Session, piece: Piece, box: Box) -> Box:
     return box
 
 
+def count_piece_in_box(session: Session, box: Box) -> None:
+    """
+    Soma uma peça ao contador da caixa; fecha a caixa ao atingir a capacidade.
+    
+    A peça já deve estar gravada (ou adicionada à sessão) com box_id da
+    caixa. Não faz commit.
+    
+    Args:
+        session: Sessão do banco de dados
+        box: Caixa (travada) que recebeu a peça
+    """
+    box.piece_count += 1
+    session.add(box)
+    
+    # Se após adicionar esta peça atingir capacidade, fecha a caixa
+    if box.piece_count >= box_capacity(box.partition) and box.status == BoxStatus.OPEN:
+        close_box(session, box)
+    else:
+        emit_box_event(session, "box.updated", box)
+
+
+def allocate_pieces_in_batch(session: Session, pieces: List[Piece]) -> Dict[str, Any]:
+    """
+    Aloca várias peças aprovadas de uma vez, planejando as caixas em memória.
+    
+    Em cada partição (piece_partition), preenche a caixa aberta atual (se
+    houver) e abre novas caixas conforme necessário, fechando cada uma ao
+    atingir a capacidade da partição. Só as caixas abertas das partições
+    do lote são travadas. Não faz commit: o chamador decide quando
+    encerrar a transação.
+    
+    Args:
+        session: Sessão do banco de dados
+        pieces: Peças aprovadas a serem alocadas (ainda não persistidas)
+        
+    Returns:
+        Dicionário com:
+        - boxes_opened: Número de novas caixas criadas
+        - boxes_closed: Número de caixas fechadas
+    """
+    result = {
+        "boxes_opened": 0,
+        "boxes_closed": 0
+    }
+    
+    if not pieces:
+        return result
+    
+    pieces_by_partition: Dict[str, List[Piece]] = {}
+    for piece in pieces:
+        pieces_by_partition.setdefault(piece_partition(piece), []).append(piece)
+    
+    # Caixas abertas atuais (travadas) das partições do lote
+    open_boxes = lock_open_boxes(session, sorted(pieces_by_partition))
+    
+    new_boxes: List[Box] = []
+    closed_boxes: List[Box] = []
+    updated_boxes: List[Box] = []
+    assignments = []
+    
+    for partition in sorted(pieces_by_partition):
+        capacity = box_capacity(partition)
+        current_box = open_boxes.get(partition)
+        if current_box is None:
+            current_box, created = _create_open_box(session, partition)
+            if created:
+                result["boxes_opened"] += 1
+        
+        for piece in pieces_by_partition[partition]:
+            if current_box is None:
+                current_box = Box(
+                    partition=partition,
+                    status=BoxStatus.OPEN,
+                    opened_at=datetime.utcnow()
+                )
+                new_boxes.append(current_box)
+            
+            assignments.append((piece, current_box))
+            current_box.piece_count += 1
+            session.add(current_box)
+            
+            # Caixa cheia: fecha e a próxima peça abre uma nova
+            if current_box.piece_count >= capacity:
+                current_box.status = BoxStatus.CLOSED
+                current_box.closed_at = datetime.utcnow()
+                closed_boxes.append(current_box)
+                result["boxes_closed"] += 1
+                current_box = None
+        
+        if current_box is not None:
+            updated_boxes.append(current_box)
+    
+    # Insere as novas caixas de uma vez para obter os IDs
+    if new_boxes:
+        session.add_all(new_boxes)
+        session.flush()
+        record_boxes_created(session, new_boxes)
+        result["boxes_opened"] += len(new_boxes)
+        for box in new_boxes:
+            emit_box_event(session, "box.opened", box)
+    
+    for piece, box in assignments:
+        piece.box_id = box.id
+    
+    # Fechamentos do lote contabilizados de uma vez no relatório por intervalo
+    record_box_closures(session, closed_boxes)
+    count_metric(session, BOXES_CLOSED, len(closed_boxes))
+    for box in closed_boxes:
+        emit_box_event(session, "box.closed", box)
+    for box in updated_boxes:
+        emit_box_event(session, "box.updated", box)
+    
+    return result
+
+
 def count_pieces_in_box(session: Session, box_id: int) -> int:
     """
-    Conta quantas peças aprovadas existem em uma caixa.
+    Conta quantas peças aprovadas existem em uma caixa direto na tabela de peças.
+    
+    Os fluxos de alocação usam o contador Box.piece_count; esta contagem
+    serve para conferir o contador.
     
     Args:
         session: Sessão do banco de dados
@@ -119,12 +367,11 @@ def count_pieces_in_box(session: Session, box_id: int) -> int:
     Returns:
         Número de peças aprovadas na caixa
     """
-    statement = select(Piece).where(
+    statement = select(func.count(Piece.id)).where(
         Piece.box_id == box_id,
         Piece.status == PieceStatus.APPROVED
     )
-    pieces = session.exec(statement).all()
-    return len(pieces)
+    return session.exec(statement).one() or 0
 
 
 def remove_piece_from_box(session: Session, piece: Piece) -> Dict[str, Any]:
@@ -135,14 +382,17 @@ def remove_piece_from_box(session: Session, piece: Piece) -> Dict[str, Any]:
     - Se peça reprovada: remove diretamente
     - Se peça aprovada em caixa aberta: remove normalmente
     - Se peça aprovada em caixa fechada:
-      - Se restarem < 10 peças após remoção:
-        - Se houver caixa aberta: move peças da aberta para a fechada até completar 10
+      - Se restarem menos peças que a capacidade da partição após remoção:
+        - Se houver caixa aberta na partição: move peças da aberta para a
+          fechada até completar a capacidade
         - Se não houver caixa aberta: reabre a caixa fechada
-    
+        
     Args:
         session: Sessão do banco de dados
         piece: Peça a ser removida
         
+    Não faz commit: a remoção da peça e os ajustes ficam na transação do chamador.
+    
     Returns:
         Dicionário com informações sobre peças movidas:
         - moved_pieces: Lista de IDs das peças movidas (None se nenhuma)
@@ -163,32 +413,38 @@ def remove_piece_from_box(session: Session, piece: Piece) -> Dict[str, Any]:
         # Peça aprovada mas sem caixa (não deveria acontecer, mas trata)
         return result
     
-    # Busca a caixa
-    box = session.get(Box, piece.box_id)
+    # A partição da caixa não muda: lida sem trava para saber qual caixa aberta travar
+    partition = session.exec(select(Box.partition).where(Box.id == piece.box_id)).first()
+    if partition is None:
+        return result
+    
+    # Trava a caixa aberta da partição e depois a caixa da peça (ordem fixa evita deadlock)
+    open_box = lock_open_box(session, partition)
+    box = session.get(Box, piece.box_id, with_for_update=True, populate_existing=True)
     if box is None:
         return result
+    capacity = box_capacity(partition)
     
-    # Remove referência da peça
+    # Remove referência da peça e atualiza o contador da caixa
     piece.box_id = None
     session.add(piece)
+    box.piece_count -= 1
+    session.add(box)
     session.flush()  # Flush para garantir que a remoção seja refletida
     
+    emit_box_event(session, "box.updated", box)
+    
     # Se caixa estava aberta, apenas remove (não precisa fazer mais nada)
     if box.status == BoxStatus.OPEN:
-        session.commit()
         return result
     
     # Se caixa estava fechada, verifica se precisa de ajuste
-    remaining_pieces = count_pieces_in_box(session, box.id)
+    remaining_pieces = box.piece_count
     
-    if remaining_pieces < BOX_CAPACITY:
-        # Busca caixa aberta
-        open_box_statement = select(Box).where(Box.status == BoxStatus.OPEN).order_by(Box.opened_at)
-        open_box = session.exec(open_box_statement).first()
-        
+    if remaining_pieces < capacity:
         if open_box is not None:
             # Existe caixa aberta: move peças necessárias
-            pieces_needed = BOX_CAPACITY - remaining_pieces
+            pieces_needed = capacity - remaining_pieces
             
             # Busca peças da caixa aberta (ordena por created_at para manter ordem)
             open_box_pieces_statement = select(Piece).where(
@@ -206,151 +462,473 @@ def remove_piece_from_box(session: Session, piece: Piece) -> Dict[str, Any]:
                 session.add(p)
                 moved_piece_ids.append(p.id)
             
+            box.piece_count += len(moved_piece_ids)
+            open_box.piece_count -= len(moved_piece_ids)
+            session.add(open_box)
+            
             if moved_piece_ids:
                 result["moved_pieces"] = moved_piece_ids
                 result["from_box_id"] = open_box.id
                 result["to_box_id"] = box.id
-                
-                # Se a caixa aberta ficou vazia, pode ser removida ou mantida aberta
-                # (de acordo com a regra de não ter mais de 1 caixa aberta)
-                remaining_in_open = len(open_box_pieces) - len(pieces_to_move)
-                if remaining_in_open == 0:
-                    # Se ficou vazia, pode ser deletada ou mantida aberta para futuras peças
-                    # Vamos manter aberta para futuras peças
-                    pass
+                count_metric(session, PIECES_MOVED, len(moved_piece_ids), cause="piece_removed")
+                emit_event(session, "pieces.moved", {
+                    "piece_ids": moved_piece_ids,
+                    "from_box_id": open_box.id,
+                    "to_box_id": box.id
+                })
+                emit_box_event(session, "box.updated", open_box)
         else:
             # Não existe caixa aberta: reabre a caixa fechada
+            record_box_closures(session, [box], sign=-1)
             box.status = BoxStatus.OPEN
             box.closed_at = None
             session.add(box)
+            count_metric(session, BOXES_REOPENED)
+            emit_box_event(session, "box.reopened", box)
     
-    session.commit()
+    session.flush()
     return result
 
 
-def reallocate_pieces_from_box(session: Session, box: Box) -> Dict[str, Any]:
+def plan_compaction(
+    boxes: List[Tuple[int, int, bool]],
+    capacity: int = BOX_CAPACITY
+) -> Tuple[List[int], Optional[int], List[int]]:
     """
-    Realoca todas as peças de uma caixa que será excluída.
+    Decide, em memória, o papel de cada caixa na compactação.
     
-    Regras:
-    - Busca todas as peças da caixa
-    - Realoca peças para caixa aberta existente (ou cria nova)
-    - Preenche cada caixa até 10 peças
-    - Cria novas caixas conforme necessário
-    - Garante que não haja mais de 1 caixa aberta no final
+    Com T peças no total, as T // capacity caixas com mais peças ficam
+    completas (fechadas); a sobra (T % capacity) fica na caixa aberta,
+    escolhida entre as restantes pela maior quantidade de peças (com
+    preferência pela caixa já aberta); as demais são esvaziadas. Escolher
+    as caixas mais cheias minimiza as peças movidas.
+    
+    Args:
+        boxes: (box_id, piece_count, está aberta) da caixa aberta e das
+            caixas fechadas incompletas
+        capacity: Capacidade das caixas (da partição)
+        
+    Returns:
+        Tupla (caixas completas, caixa aberta ou None se não houver sobra,
+        caixas esvaziadas)
+    """
+    total = sum(count for _, count, _ in boxes)
+    full_count, remainder = divmod(total, capacity)
+    
+    ranked = sorted(boxes, key=lambda box: (-box[1], box[2], box[0]))
+    full, rest = ranked[:full_count], ranked[full_count:]
+    
+    open_box_id = None
+    if remainder and rest:
+        open_box_id = max(rest, key=lambda box: (box[1], box[2]))[0]
+    emptied = [box_id for box_id, _, _ in rest if box_id != open_box_id]
+    return [box_id for box_id, _, _ in full], open_box_id, emptied
+
+
+def compact_boxes(session: Session, open_box: Optional[Box], incomplete_boxes: List[Box]) -> Dict[str, Any]:
+    """
+    Recompõe caixas fechadas que perderam peças, em uma única passada.
+    
+    Aplica o plano de plan_compaction sobre a caixa aberta e as caixas
+    fechadas incompletas de uma mesma partição: as caixas completas ficam
+    fechadas (a aberta é fechada se for completada), a sobra fica em uma
+    única caixa aberta (uma fechada é reaberta se for a escolhida) e as
+    caixas esvaziadas são excluídas. Se não houver sobra, a caixa aberta esvaziada continua
+    aberta, como na remoção unitária. As peças são movidas com UPDATEs em
+    bloco. Não faz commit.
     
     Args:
         session: Sessão do banco de dados
-        box: Caixa que será excluída
+        open_box: Caixa aberta da partição travada (lock_open_box), ou None
+        incomplete_boxes: Caixas fechadas da partição com menos peças que a
+            capacidade, travadas
+            
+    Returns:
+        Dicionário com:
+        - moved_pieces: Lista de (piece_id, from_box_id, to_box_id)
+        - closed_box_ids / reopened_box_ids / removed_box_ids
+    """
+    result = {
+        "moved_pieces": [],
+        "closed_box_ids": [],
+        "reopened_box_ids": [],
+        "removed_box_ids": []
+    }
+    if not incomplete_boxes:
+        return result
+    
+    capacity = box_capacity(incomplete_boxes[0].partition)
+    candidates = ([open_box] if open_box is not None else []) + list(incomplete_boxes)
+    boxes_by_id = {box.id: box for box in candidates}
+    full_ids, open_box_id, emptied_ids = plan_compaction([
+        (box.id, box.piece_count, box.status == BoxStatus.OPEN) for box in candidates
+    ], capacity)
+    remainder = sum(box.piece_count for box in candidates) % capacity
+    
+    # Sem sobra, a caixa aberta esvaziada continua aberta (vazia)
+    if open_box is not None and open_box_id is None and open_box.id in emptied_ids:
+        emptied_ids.remove(open_box.id)
+        keep_open = open_box
+    else:
+        keep_open = None
+    
+    # Peças que saem: todas das caixas esvaziadas e o excedente da caixa aberta
+    donor_ids = list(emptied_ids) + ([keep_open.id] if keep_open is not None else [])
+    surplus = 0
+    if open_box_id is not None:
+        surplus = max(boxes_by_id[open_box_id].piece_count - remainder, 0)
+    if surplus:
+        donor_ids.append(open_box_id)
+    
+    pool: List[Tuple[str, int]] = []
+    if donor_ids:
+        statement = select(Piece.id, Piece.box_id).where(
+            Piece.box_id.in_(donor_ids),
+            Piece.status == PieceStatus.APPROVED
+        ).order_by(Piece.created_at, Piece.id)
+        rows = session.exec(statement).all()
+        pool = [(piece_id, box_id) for piece_id, box_id in rows if box_id != open_box_id]
+        pool += [(piece_id, box_id) for piece_id, box_id in rows if box_id == open_box_id][:surplus]
+    
+    # Completa as caixas em ordem de ID; o que sobrar vai para a caixa aberta
+    moves: List[Tuple[str, int, int]] = []
+    for box_id in sorted(full_ids):
+        box = boxes_by_id[box_id]
+        needed = capacity - box.piece_count
+        moves.extend((piece_id, from_box_id, box_id) for piece_id, from_box_id in pool[:needed])
+        pool = pool[needed:]
+    if open_box_id is not None:
+        moves.extend((piece_id, from_box_id, open_box_id) for piece_id, from_box_id in pool)
+    
+    _move_pieces(session, moves)
+    result["moved_pieces"] = moves
+    for box_id in full_ids:
+        boxes_by_id[box_id].piece_count = capacity
+    if open_box_id is not None:
+        boxes_by_id[open_box_id].piece_count = remainder
+    if keep_open is not None:
+        keep_open.piece_count = 0
+        session.add(keep_open)
+        emit_box_event(session, "box.updated", keep_open)
+    
+    # Exclui as caixas esvaziadas antes de reabrir outra (índice de caixa aberta única)
+    if emptied_ids:
+        emptied = [boxes_by_id[box_id] for box_id in emptied_ids]
+        record_boxes_deleted(session, emptied)
+        record_box_closures(session, emptied, sign=-1)
+        session.execute(
+            delete(Box)
+            .where(Box.id.in_(emptied_ids))
+            .execution_options(synchronize_session=False)
+        )
+        for box in emptied:
+            session.expunge(box)
+            emit_event(session, "box.deleted", {"id": box.id})
+        result["removed_box_ids"] = sorted(emptied_ids)
+    
+    now = datetime.utcnow()
+    newly_closed = []
+    for box_id in full_ids:
+        box = boxes_by_id[box_id]
+        if box.status == BoxStatus.OPEN:
+            box.status = BoxStatus.CLOSED
+            box.closed_at = now
+            newly_closed.append(box)
+            emit_box_event(session, "box.closed", box)
+        else:
+            emit_box_event(session, "box.updated", box)
+        session.add(box)
+    if newly_closed:
+        record_box_closures(session, newly_closed)
+        count_metric(session, BOXES_CLOSED, len(newly_closed))
+        result["closed_box_ids"] = [box.id for box in newly_closed]
+        session.flush()
+    
+    if open_box_id is not None:
+        box = boxes_by_id[open_box_id]
+        if box.status == BoxStatus.CLOSED:
+            record_box_closures(session, [box], sign=-1)
+            box.status = BoxStatus.OPEN
+            box.closed_at = None
+            count_metric(session, BOXES_REOPENED)
+            result["reopened_box_ids"] = [box.id]
+            emit_box_event(session, "box.reopened", box)
+        else:
+            emit_box_event(session, "box.updated", box)
+        session.add(box)
+    
+    count_metric(session, PIECES_MOVED, len(moves), cause="compaction")
+    moved_by_route: Dict[Tuple[int, int], List[str]] = {}
+    for piece_id, from_box_id, to_box_id in moves:
+        moved_by_route.setdefault((from_box_id, to_box_id), []).append(piece_id)
+    for (from_box_id, to_box_id), piece_ids in moved_by_route.items():
+        emit_event(session, "pieces.moved", {
+            "piece_ids": piece_ids,
+            "from_box_id": from_box_id,
+            "to_box_id": to_box_id
+        })
+    
+    session.flush()
+    return result
+
+
+def plan_reallocation(
+    pieces: List[Tuple[str, int]],
+    open_box_space: int,
+    capacity: int = BOX_CAPACITY
+) -> List[List[Tuple[str, int]]]:
+    """
+    Divide as peças a realocar entre as caixas de destino, em memória.
+    
+    A primeira parte completa a caixa aberta atual (até open_box_space
+    peças); as demais formam caixas novas de capacity peças, e só a
+    última pode ficar incompleta (será a nova caixa aberta). O plano é
+    calculado em uma passada, O(n) no número de peças.
+    
+    Args:
+        pieces: Pares (piece_id, from_box_id) na ordem de realocação
+        open_box_space: Vagas na caixa aberta atual (0 se não houver)
+        capacity: Capacidade das caixas (da partição)
         
     Returns:
-        Dicionário com informações sobre realocação:
+        Partes na ordem das caixas de destino; a primeira é da caixa aberta
+        atual (vazia se não houver vagas)
+    """
+    parts = [pieces[:open_box_space]]
+    for start in range(open_box_space, len(pieces), capacity):
+        parts.append(pieces[start:start + capacity])
+    return parts
+
+
+def _move_pieces(session: Session, moves: List[Tuple[str, int, int]]) -> None:
+    """
+    Grava os destinos das peças com UPDATEs em bloco (WHERE id IN (...)).
+    
+    Um comando por REALLOCATION_UPDATE_CHUNK peças, com CASE por ID quando
+    o bloco tem mais de uma caixa de destino. As peças não são carregadas
+    na sessão.
+    """
+    for start in range(0, len(moves), REALLOCATION_UPDATE_CHUNK):
+        chunk = moves[start:start + REALLOCATION_UPDATE_CHUNK]
+        targets = {piece_id: to_box_id for piece_id, _, to_box_id in chunk}
+        box_ids = set(targets.values())
+        box_id = next(iter(box_ids)) if len(box_ids) == 1 else case(targets, value=Piece.id)
+        session.execute(
+            update(Piece)
+            .where(Piece.id.in_(list(targets)))
+            .values(box_id=box_id)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def delete_boxes(session: Session, box_ids: List[int]) -> Dict[str, Any]:
+    """
+    Exclui caixas realocando suas peças aprovadas.
+    
+    Lê de uma vez as caixas e as peças afetadas, calcula o plano completo
+    em memória (plan_reallocation) e o aplica com poucos comandos em bloco.
+    Cada peça vai para uma caixa da sua partição (piece_partition), que
+    normalmente é a da caixa excluída; excluir caixas de uma chave de
+    partição anterior redistribui suas peças nas partições atuais:
+    - Peças vão primeiro para a caixa aberta da partição, até completá-la
+    - As demais formam caixas novas completas (fechadas); a sobra fica na
+      nova caixa aberta da partição (nunca mais de 1 caixa aberta por partição)
+    - Várias caixas excluídas juntas são planejadas em conjunto, em ordem
+      de cadastro das peças
+      
+    Se algum ID não existir, nada é alterado e os IDs ausentes são
+    retornados em missing_box_ids. Não faz commit.
+    
+    Args:
+        session: Sessão do banco de dados
+        box_ids: IDs das caixas a excluir
+        
+    Returns:
+        Dicionário com:
+        - deleted_box_ids: IDs excluídos
+        - missing_box_ids: IDs não encontrados (nada foi excluído se houver)
         - reallocated_pieces: Lista de dicionários com piece_id, from_box_id, to_box_id
         - boxes_created: Número de novas caixas criadas
     """
     result = {
+        "deleted_box_ids": [],
+        "missing_box_ids": [],
         "reallocated_pieces": [],
         "boxes_created": 0
     }
+    box_ids = list(dict.fromkeys(box_ids))
+    
+    # Trava as caixas abertas das partições envolvidas e depois as caixas a
+    # excluir (ordem fixa evita deadlock); a partição de uma caixa não muda
+    partitions = set(session.exec(select(Box.partition).where(Box.id.in_(box_ids))).all())
+    open_boxes = lock_open_boxes(session, sorted(partitions))
+    statement = (
+        select(Box)
+        .where(Box.id.in_(box_ids))
+        .order_by(Box.id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    boxes = session.exec(statement).all()
+    found = {box.id for box in boxes}
+    result["missing_box_ids"] = [box_id for box_id in box_ids if box_id not in found]
+    if result["missing_box_ids"] or not boxes:
+        return result
     
-    # Busca todas as peças aprovadas da caixa
-    pieces_statement = select(Piece).where(
-        Piece.box_id == box.id,
+    deleted_ids = [box.id for box in boxes]
+    result["deleted_box_ids"] = deleted_ids
+    for box in boxes:
+        emit_event(session, "box.deleted", {"id": box.id})
+    
+    # A caixa aberta excluída deixa de contar como aberta, liberando a criação de outra
+    for partition, open_box in list(open_boxes.items()):
+        if open_box.id in found:
+            open_box.status = BoxStatus.CLOSED
+            session.add(open_box)
+            del open_boxes[partition]
+    session.flush()
+    
+    key = partition_key()
+    pieces_statement = select(Piece.id, Piece.box_id, *([getattr(Piece, key)] if key else [])).where(
+        Piece.box_id.in_(deleted_ids),
         Piece.status == PieceStatus.APPROVED
-    ).order_by(Piece.created_at)
-    pieces_to_reallocate = session.exec(pieces_statement).all()
+    ).order_by(Piece.created_at, Piece.id)
+    pieces_by_partition: Dict[str, List[Tuple[str, int]]] = {}
+    for row in session.exec(pieces_statement).all():
+        pieces_by_partition.setdefault(piece_partition(row), []).append((row.id, row.box_id))
     
-    # Se não há peças, retorna vazio
-    if not pieces_to_reallocate:
-        return result
+    now = datetime.utcnow()
+    moves: List[Tuple[str, int, int]] = []
+    closed_boxes: List[Box] = []
+    updated_boxes: List[Box] = []
     
-    # Processa peças em lotes de até BOX_CAPACITY
-    current_box = None
-    pieces_remaining = list(pieces_to_reallocate)
+    def assign(target: Box, part: List[Tuple[str, int]], capacity: int) -> None:
+        target.piece_count += len(part)
+        moves.extend((piece_id, from_box_id, target.id) for piece_id, from_box_id in part)
+        if target.piece_count >= capacity:
+            target.status = BoxStatus.CLOSED
+            target.closed_at = now
+            closed_boxes.append(target)
+        else:
+            updated_boxes.append(target)
+        session.add(target)
     
-    while pieces_remaining:
-        # Busca ou cria caixa aberta
-        if current_box is None:
-            # Busca caixa aberta existente
-            open_box_statement = select(Box).where(
-                Box.status == BoxStatus.OPEN,
-                Box.id != box.id  # Exclui a caixa que será deletada
-            ).order_by(Box.opened_at)
-            current_box = session.exec(open_box_statement).first()
-            
-            if current_box is None:
-                # Cria nova caixa aberta
-                current_box = Box(
-                    status=BoxStatus.OPEN,
-                    opened_at=datetime.utcnow()
-                )
-                session.add(current_box)
-                session.flush()
-                session.refresh(current_box)
-                result["boxes_created"] += 1
+    for partition in sorted(pieces_by_partition):
+        if partition not in partitions:
+            # Peças de outra partição (chave de partição alterada): trava a caixa aberta dela agora
+            open_box = lock_open_box(session, partition)
+            if open_box is not None and open_box.id not in found:
+                open_boxes[partition] = open_box
+        capacity = box_capacity(partition)
+        open_box = open_boxes.get(partition)
+        open_box_space = max(capacity - open_box.piece_count, 0) if open_box is not None else 0
+        parts = plan_reallocation(pieces_by_partition[partition], open_box_space, capacity)
         
-        # Conta peças na caixa atual
-        current_piece_count = count_pieces_in_box(session, current_box.id)
-        space_available = BOX_CAPACITY - current_piece_count
+        head, rest = parts[0], parts[1:]
+        if head:
+            assign(open_box, head, capacity)
+            # Fecha a caixa completada no banco antes de abrir outra
+            session.flush()
         
-        if space_available > 0:
-            # Move peças para a caixa atual
-            pieces_to_move = pieces_remaining[:space_available]
-            
-            for piece in pieces_to_move:
-                piece.box_id = current_box.id
-                session.add(piece)
-                result["reallocated_pieces"].append({
-                    "piece_id": piece.id,
-                    "from_box_id": box.id,
-                    "to_box_id": current_box.id
-                })
-            
-            pieces_remaining = pieces_remaining[space_available:]
-            
-            # Se a caixa ficou cheia, fecha ela
-            if count_pieces_in_box(session, current_box.id) >= BOX_CAPACITY:
-                current_box.status = BoxStatus.CLOSED
-                current_box.closed_at = datetime.utcnow()
-                session.add(current_box)
-                current_box = None  # Próxima iteração criará nova caixa
-        else:
-            # Caixa está cheia, fecha e cria nova
-            current_box.status = BoxStatus.CLOSED
-            current_box.closed_at = datetime.utcnow()
-            session.add(current_box)
-            current_box = None
-    
-    # Garante que não há mais de 1 caixa aberta após a realocação
-    # (sem criar nova se não houver nenhuma)
-    open_boxes_statement = select(Box).where(Box.status == BoxStatus.OPEN)
-    open_boxes = session.exec(open_boxes_statement).all()
-    
-    if len(open_boxes) > 1:
-        # Mantém apenas a mais antiga aberta, fecha as outras
-        open_boxes_sorted = sorted(open_boxes, key=lambda b: b.opened_at)
-        for extra_box in open_boxes_sorted[1:]:
-            piece_count = count_pieces_in_box(session, extra_box.id)
-            if piece_count >= BOX_CAPACITY:
-                extra_box.status = BoxStatus.CLOSED
-                extra_box.closed_at = datetime.utcnow()
-            else:
-                # Move peças para a caixa principal antes de fechar
-                pieces_statement = select(Piece).where(
-                    Piece.box_id == extra_box.id,
-                    Piece.status == PieceStatus.APPROVED
-                ).order_by(Piece.created_at)
-                pieces_to_move = session.exec(pieces_statement).all()
-                
-                for p in pieces_to_move:
-                    p.box_id = open_boxes_sorted[0].id
-                    session.add(p)
-                
-                extra_box.status = BoxStatus.CLOSED
-                extra_box.closed_at = datetime.utcnow()
-            
-            session.add(extra_box)
+        # Caixas novas completas já são criadas fechadas, em um único INSERT em
+        # bloco (as linhas são iguais, então a ordem dos IDs retornados não importa)
+        full_parts = [part for part in rest if len(part) == capacity]
+        tail = rest[-1] if rest and len(rest[-1]) < capacity else []
+        if full_parts:
+            row = {
+                "partition": partition,
+                "status": BoxStatus.CLOSED,
+                "opened_at": now,
+                "closed_at": now,
+                "piece_count": capacity
+            }
+            new_box_ids = session.scalars(insert(Box).returning(Box.id), [row] * len(full_parts)).all()
+            new_boxes = [Box(id=box_id, **row) for box_id in new_box_ids]
+            record_boxes_created(session, new_boxes)
+            result["boxes_created"] += len(new_boxes)
+            closed_boxes.extend(new_boxes)
+            for box, part in zip(new_boxes, full_parts):
+                moves.extend((piece_id, from_box_id, box.id) for piece_id, from_box_id in part)
+                emit_box_event(session, "box.opened", box)
+        
+        # Sobra: nova caixa aberta (_create_open_box respeita o índice único;
+        # no PostgreSQL outra transação pode ter aberto a caixa antes)
+        while tail:
+            target, created = _create_open_box(session, partition)
+            result["boxes_created"] += int(created)
+            space = capacity - target.piece_count
+            part, tail = tail[:space], tail[space:]
+            assign(target, part, capacity)
+            if tail:
+                session.flush()
+    
+    _move_pieces(session, moves)
+    result["reallocated_pieces"] = [
+        {"piece_id": piece_id, "from_box_id": from_box_id, "to_box_id": to_box_id}
+        for piece_id, from_box_id, to_box_id in moves
+    ]
+    
+    # Fechamentos e movimentações contabilizados de uma vez
+    record_box_closures(session, closed_boxes)
+    count_metric(session, BOXES_CLOSED, len(closed_boxes))
+    count_metric(session, PIECES_MOVED, len(moves), cause="box_deleted")
+    moved_by_route: Dict[Tuple[int, int], List[str]] = {}
+    for piece_id, from_box_id, to_box_id in moves:
+        moved_by_route.setdefault((from_box_id, to_box_id), []).append(piece_id)
+    for (from_box_id, to_box_id), piece_ids in moved_by_route.items():
+        emit_event(session, "pieces.moved", {
+            "piece_ids": piece_ids,
+            "from_box_id": from_box_id,
+            "to_box_id": to_box_id
+        })
+    for box in closed_boxes:
+        emit_box_event(session, "box.closed", box)
+    for box in updated_boxes:
+        emit_box_event(session, "box.updated", box)
+    
+    # Exclui as caixas (já sem peças aprovadas) em um único DELETE
+    record_boxes_deleted(session, boxes)
+    record_box_closures(session, boxes, sign=-1)
+    session.execute(
+        delete(Box)
+        .where(Box.id.in_(deleted_ids))
+        .execution_options(synchronize_session=False)
+    )
+    for box in boxes:
+        session.expunge(box)
     
-    session.commit()
     return result
 
+
+def verify_box_piece_counts(session: Session, repair: bool = False) -> List[Dict[str, int]]:
+    """
+    Confere o contador Box.piece_count com a contagem real de peças.
+    
+    Usa uma única consulta agrupada para todas as caixas.
+    
+    Args:
+        session: Sessão do banco de dados
+        repair: Se True, corrige os contadores divergentes e faz commit
+        
+    Returns:
+        Lista de divergências com box_id, stored (contador) e actual (contagem real)
+    """
+    statement = (
+        select(Box.id, Box.piece_count, func.count(Piece.id))
+        .outerjoin(Piece, (Piece.box_id == Box.id) & (Piece.status == PieceStatus.APPROVED))
+        .group_by(Box.id, Box.piece_count)
+    )
+    drifts = [
+        {"box_id": box_id, "stored": stored, "actual": actual}
+        for box_id, stored, actual in session.exec(statement).all()
+        if stored != actual
+    ]
+    
+    if repair and drifts:
+        for drift in drifts:
+            box = session.get(Box, drift["box_id"])
+            box.piece_count = drift["actual"]
+            session.add(box)
+        session.commit()
+    
+    return drifts
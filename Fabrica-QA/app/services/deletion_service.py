@@ -0,0 +1,137 @@
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import delete
+from sqlmodel import Session, select
+from app.models.box import Box
+from app.models.piece import Piece
+from app.models.enums import BoxStatus, PieceStatus
+from app.services.boxing_service import compact_boxes, lock_open_boxes
+from app.services.partition_service import box_capacity, partition_key
+from app.services.events_service import emit_box_event
+from app.services.report_service import record_pieces_deleted
+
+# Quantidade máxima de IDs por consulta IN / DELETE em bloco
+DELETE_CHUNK = 500
+
+
+def delete_pieces(
+    session: Session,
+    piece_ids: Optional[List[str]] = None,
+    desde: Optional[datetime] = None,
+    ate: Optional[datetime] = None,
+    limit: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Remove peças em bloco e compacta as caixas afetadas em uma única passada.
+    
+    As peças são selecionadas pelos IDs e/ou pelo intervalo de cadastro
+    (desde inclusive, ate exclusivo) e removidas com DELETEs em bloco; os
+    agregados são atualizados uma vez para o conjunto. Depois, as caixas
+    fechadas que perderam peças são recompostas por compact_boxes, em vez
+    de uma movimentação por peça removida, cada partição com a sua caixa
+    aberta. Não faz commit.
+    
+    Args:
+        session: Sessão do banco de dados
+        piece_ids: IDs das peças a remover
+        desde: Remove peças cadastradas a partir desta data
+        ate: Remove peças cadastradas antes desta data
+        limit: Máximo de peças removidas; acima disso nada é alterado
+        
+    Returns:
+        Dicionário com:
+        - deleted_piece_ids: IDs removidos
+        - missing_piece_ids: IDs informados e não encontrados
+        - limit_exceeded: True se o filtro selecionou mais de limit peças
+        - moved_pieces, closed_box_ids, reopened_box_ids, removed_box_ids:
+          resultado da compactação (ver compact_boxes)
+    """
+    result = {
+        "deleted_piece_ids": [],
+        "missing_piece_ids": [],
+        "limit_exceeded": False,
+        "moved_pieces": [],
+        "closed_box_ids": [],
+        "reopened_box_ids": [],
+        "removed_box_ids": []
+    }
+    
+    # Trava as caixas abertas (de todas as partições) antes de ler as peças:
+    # quem move peças entre caixas (remoções, exclusão de caixas) espera este commit
+    open_boxes = lock_open_boxes(session)
+    
+    filters = []
+    if desde is not None:
+        filters.append(Piece.created_at >= desde)
+    if ate is not None:
+        filters.append(Piece.created_at < ate)
+    # A coluna da chave de partição acompanha as demais: os agregados são por partição
+    key = partition_key()
+    columns = (Piece.id, Piece.status, Piece.rejection_mask, Piece.box_id, Piece.created_at)
+    if key:
+        columns += (getattr(Piece, key),)
+    
+    if piece_ids is not None:
+        piece_ids = list(dict.fromkeys(piece_ids))
+        pieces = []
+        for start in range(0, len(piece_ids), DELETE_CHUNK):
+            chunk = piece_ids[start:start + DELETE_CHUNK]
+            pieces.extend(session.exec(select(*columns).where(Piece.id.in_(chunk), *filters)).all())
+        found = {piece.id for piece in pieces}
+        result["missing_piece_ids"] = [piece_id for piece_id in piece_ids if piece_id not in found]
+    else:
+        statement = select(*columns).where(*filters)
+        if limit is not None:
+            statement = statement.limit(limit + 1)
+        pieces = session.exec(statement).all()
+    
+    if limit is not None and len(pieces) > limit:
+        result["limit_exceeded"] = True
+        return result
+    if not pieces:
+        return result
+    
+    deleted_ids = [piece.id for piece in pieces]
+    for start in range(0, len(deleted_ids), DELETE_CHUNK):
+        session.execute(
+            delete(Piece)
+            .where(Piece.id.in_(deleted_ids[start:start + DELETE_CHUNK]))
+            .execution_options(synchronize_session=False)
+        )
+    record_pieces_deleted(session, pieces)
+    result["deleted_piece_ids"] = deleted_ids
+    
+    # Ajusta as contagens das caixas que perderam peças
+    lost = Counter(piece.box_id for piece in pieces if piece.status == PieceStatus.APPROVED and piece.box_id is not None)
+    if not lost:
+        return result
+    
+    statement = (
+        select(Box)
+        .where(Box.id.in_(list(lost)))
+        .order_by(Box.id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    boxes = session.exec(statement).all()
+    incomplete_by_partition: Dict[str, List[Box]] = {}
+    for box in boxes:
+        box.piece_count = max(box.piece_count - lost[box.id], 0)
+        session.add(box)
+        # Caixas compactadas têm os eventos substituídos pelos da compactação
+        emit_box_event(session, "box.updated", box)
+        if box.status == BoxStatus.CLOSED and box.piece_count < box_capacity(box.partition):
+            incomplete_by_partition.setdefault(box.partition, []).append(box)
+    
+    if not incomplete_by_partition:
+        session.flush()
+        return result
+    
+    # O objeto da caixa aberta travada é o mesmo do identity map; cada
+    # partição é compactada com a sua caixa aberta
+    for partition in sorted(incomplete_by_partition):
+        compaction = compact_boxes(session, open_boxes.get(partition), incomplete_by_partition[partition])
+        for key, values in compaction.items():
+            result[key].extend(values)
+    return result
@@ -0,0 +1,285 @@
+import asyncio
+import json
+import itertools
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Set, Union
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session
+from app.models.box import Box
+
+# Eventos guardados por cliente; acima disso o cliente recebe "stream.resync"
+EVENT_BUFFER_SIZE = 1000
+
+# Intervalo do comentário de keep-alive enviado quando não há eventos
+EVENT_KEEPALIVE_SECONDS = 15.0
+
+# Chaves em session.info com os eventos da transação corrente
+PENDING_EVENTS_KEY = "pending_events"
+PENDING_REPORT_DELTA_KEY = "pending_report_delta"
+RESOLVED_EVENTS_KEY = "resolved_events"
+
+EventPayload = Union[Dict[str, Any], Callable[[], Dict[str, Any]]]
+
+
+class EventSubscriber:
+    """
+    Fila limitada de eventos de um cliente conectado.
+    
+    Os eventos são entregues pelo loop do cliente; quando a fila enche
+    (cliente lento), os eventos acumulados são descartados e substituídos
+    por um único "stream.resync", indicando que o cliente deve recarregar
+    os dados. A memória por cliente fica limitada a EVENT_BUFFER_SIZE eventos.
+    """
+    
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        buffer_size: int = EVENT_BUFFER_SIZE,
+        types: Optional[Sequence[str]] = None
+    ):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        self.types = tuple(types) if types else None
+        self.dropped = 0
+    
+    def wants(self, event_type: str) -> bool:
+        """Indica se o cliente assinou o tipo (ou a família, ex.: "box") do evento"""
+        if self.types is None:
+            return True
+        return any(event_type == t or event_type.startswith(t + ".") for t in self.types)
+    
+    def push(self, event_data: Dict[str, Any]) -> None:
+        """Enfileira o evento (executado no loop do cliente)"""
+        if self.queue.full():
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({
+                "id": None,
+                "type": "stream.resync",
+                "at": event_data["at"],
+                "data": {"dropped": self.dropped},
+            })
+        self.queue.put_nowait(event_data)
+    
+    async def get(self) -> Dict[str, Any]:
+        """Aguarda o próximo evento"""
+        return await self.queue.get()
+
+
+class EventBroker:
+    """
+    Distribui os eventos confirmados (após o commit) aos clientes conectados.
+    
+    publish() pode ser chamado de qualquer thread (threadpool no modo
+    síncrono, loop no modo assíncrono): cada evento é entregue no loop do
+    cliente via call_soon_threadsafe. O broker é do processo; com vários
+    workers, cada cliente recebe os eventos das requisições do seu worker.
+    """
+    
+    def __init__(self):
+        self._subscribers: Set[EventSubscriber] = set()
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+    
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+    
+    def subscribe(
+        self,
+        types: Optional[Sequence[str]] = None,
+        buffer_size: int = EVENT_BUFFER_SIZE
+    ) -> EventSubscriber:
+        """
+        Registra um cliente no loop atual.
+        
+        Args:
+            types: Tipos ou famílias de evento desejados (None para todos)
+            buffer_size: Máximo de eventos guardados para o cliente
+        """
+        subscriber = EventSubscriber(asyncio.get_running_loop(), buffer_size, types)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+    
+    def unsubscribe(self, subscriber: EventSubscriber) -> None:
+        """Remove o cliente (conexão encerrada)"""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+    
+    def publish(self, events: List[Dict[str, Any]]) -> None:
+        """
+        Numera os eventos e entrega a todos os clientes conectados.
+        
+        Args:
+            events: Eventos com type e data
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+            numbered = [
+                {"id": next(self._sequence), "type": e["type"], "at": e["at"], "data": e["data"]}
+                for e in events
+            ]
+        
+        for subscriber in subscribers:
+            for event_data in numbered:
+                if not subscriber.wants(event_data["type"]):
+                    continue
+                try:
+                    subscriber.loop.call_soon_threadsafe(subscriber.push, event_data)
+                except RuntimeError:
+                    # Loop do cliente já encerrado
+                    self.unsubscribe(subscriber)
+                    break
+
+
+broker = EventBroker()
+
+
+def emit_event(session: Session, event_type: str, payload: EventPayload) -> None:
+    """
+    Registra um evento na transação da sessão.
+    
+    O evento só é publicado se a transação for confirmada (descartado no
+    rollback). O payload pode ser uma função, avaliada logo antes do commit,
+    para refletir o estado final dos objetos. Sem clientes conectados, não
+    registra nada.
+    
+    Args:
+        session: Sessão do banco de dados
+        event_type: Tipo do evento (ex.: "piece.created")
+        payload: Dados do evento, ou função que os monta
+    """
+    if not broker.has_subscribers:
+        return
+    session.info.setdefault(PENDING_EVENTS_KEY, []).append((event_type, payload))
+
+
+def emit_report_delta(session: Session, delta: Dict[str, int]) -> None:
+    """
+    Acumula um delta dos agregados de produção na transação da sessão.
+    
+    Os deltas de uma transação são publicados como um único "report.delta".
+    """
+    if not broker.has_subscribers:
+        return
+    pending = session.info.setdefault(PENDING_REPORT_DELTA_KEY, Counter())
+    pending.update(delta)
+
+
+def format_sse(event_data: Dict[str, Any]) -> str:
+    """Serializa o evento no formato text/event-stream"""
+    lines = []
+    if event_data["id"] is not None:
+        lines.append(f"id: {event_data['id']}")
+    lines.append(f"event: {event_data['type']}")
+    lines.append("data: " + json.dumps(event_data, ensure_ascii=False))
+    return "\n".join(lines) + "\n\n"
+
+
+async def sse_stream(
+    subscriber: EventSubscriber,
+    keepalive: float = EVENT_KEEPALIVE_SECONDS
+) -> AsyncIterator[str]:
+    """
+    Gera o corpo da resposta SSE de um cliente até a desconexão.
+    
+    Envia um comentário de keep-alive quando não há eventos por
+    `keepalive` segundos (mantém proxies e o EventSource conectados) e
+    remove o cliente do broker ao encerrar.
+    """
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event_data = await asyncio.wait_for(subscriber.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(event_data)
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+def box_snapshot(box: Box) -> Dict[str, Any]:
+    """Estado público da caixa enviado nos eventos box.*"""
+    return {
+        "id": box.id,
+        "partition": box.partition,
+        "status": box.status.value,
+        "piece_count": box.piece_count,
+        "opened_at": box.opened_at.isoformat(),
+        "closed_at": box.closed_at.isoformat() if box.closed_at else None,
+    }
+
+
+def emit_box_event(session: Session, event_type: str, box: Box) -> None:
+    """Registra um evento box.* com o estado da caixa no momento do commit"""
+    emit_event(session, event_type, lambda: box_snapshot(box))
+
+
+def _without_redundant_box_updates(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Remove "box.updated" repetidos na mesma transação.
+    
+    Como os snapshots refletem o estado no commit, basta um evento por
+    caixa: o último box.updated, ou nenhum se a caixa já tem outro box.*.
+    """
+    other_box_events = {
+        e["data"]["id"] for e in events
+        if e["type"].startswith("box.") and e["type"] != "box.updated"
+    }
+    last_update = {
+        e["data"]["id"]: index for index, e in enumerate(events)
+        if e["type"] == "box.updated"
+    }
+    return [
+        e for index, e in enumerate(events)
+        if e["type"] != "box.updated"
+        or (e["data"]["id"] not in other_box_events and last_update[e["data"]["id"]] == index)
+    ]
+
+
+@event.listens_for(OrmSession, "before_commit")
+def _resolve_pending_events(session: OrmSession) -> None:
+    """Monta os payloads enquanto os objetos ainda não foram expirados pelo commit"""
+    # Savepoints (begin_nested) não encerram a transação
+    if session.in_nested_transaction():
+        return
+    
+    pending = session.info.pop(PENDING_EVENTS_KEY, None)
+    delta = session.info.pop(PENDING_REPORT_DELTA_KEY, None)
+    if not pending and not delta:
+        return
+    
+    at = datetime.utcnow().isoformat()
+    resolved = [
+        {"type": event_type, "at": at, "data": payload() if callable(payload) else payload}
+        for event_type, payload in pending or []
+    ]
+    resolved = _without_redundant_box_updates(resolved)
+    delta = {column: amount for column, amount in (delta or {}).items() if amount}
+    if delta:
+        resolved.append({"type": "report.delta", "at": at, "data": delta})
+    session.info.setdefault(RESOLVED_EVENTS_KEY, []).extend(resolved)
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _publish_committed_events(session: OrmSession) -> None:
+    if session.in_nested_transaction():
+        return
+    resolved: Optional[List[Dict[str, Any]]] = session.info.pop(RESOLVED_EVENTS_KEY, None)
+    if resolved:
+        broker.publish(resolved)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_rolled_back_events(session: OrmSession) -> None:
+    if session.in_nested_transaction():
+        return
+    for key in (PENDING_EVENTS_KEY, PENDING_REPORT_DELTA_KEY, RESOLVED_EVENTS_KEY):
+        session.info.pop(key, None)
@@ -0,0 +1,204 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Literal, Optional, Sequence
+from sqlalchemy import union_all
+from sqlmodel import select
+from app.models.archive import ArchivedBox, ArchivedPiece
+from app.models.piece import Piece
+from app.models.box import Box
+from app.models.enums import BoxStatus, PieceStatus
+from app.services.quality_service import reasons_from_mask
+
+# Linhas lidas do cursor do banco por vez (memória constante em qualquer volume)
+EXPORT_CHUNK_SIZE = 1000
+
+ExportFormat = Literal["ndjson", "csv"]
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+PIECE_EXPORT_COLUMNS = [
+    "id",
+    "peso",
+    "cor",
+    "comprimento",
+    "status",
+    "rejection_reasons",
+    "box_id",
+    "created_at",
+]
+
+BOX_EXPORT_COLUMNS = [
+    "id",
+    "partition",
+    "status",
+    "opened_at",
+    "closed_at",
+    "piece_count",
+]
+
+
+def pieces_export_statement(
+    status: Optional[PieceStatus] = None,
+    desde: Optional[datetime] = None,
+    ate: Optional[datetime] = None,
+    box_id: Optional[int] = None
+):
+    """
+    Monta a consulta de exportação de peças, em ordem de cadastro.
+    
+    Seleciona apenas colunas (sem instanciar Piece) para manter o custo por linha baixo.
+    Inclui as peças arquivadas (piece_archive), com os mesmos filtros.
+    
+    Args:
+        status: Filtrar por status
+        desde: Cadastradas a partir desta data (inclusive)
+        ate: Cadastradas antes desta data
+        box_id: Filtrar pela caixa
+        
+    Returns:
+        Select pronto para execução em streaming
+    """
+    statements = []
+    for model in (Piece, ArchivedPiece):
+        statement = select(
+            model.id,
+            model.peso,
+            model.cor,
+            model.comprimento,
+            model.status,
+            model.rejection_mask,
+            model.box_id,
+            model.created_at
+        )
+        if status:
+            statement = statement.where(model.status == status)
+        if desde:
+            statement = statement.where(model.created_at >= desde)
+        if ate:
+            statement = statement.where(model.created_at < ate)
+        if box_id is not None:
+            statement = statement.where(model.box_id == box_id)
+        statements.append(statement)
+    rows = union_all(*statements).subquery()
+    return select(*rows.c).order_by(rows.c.created_at, rows.c.id)
+
+
+def boxes_export_statement(
+    status: Optional[BoxStatus] = None,
+    desde: Optional[datetime] = None,
+    ate: Optional[datetime] = None,
+    partition: Optional[str] = None
+):
+    """
+    Monta a consulta de exportação de caixas, em ordem de abertura.
+    
+    Inclui as caixas arquivadas (box_archive), com os mesmos filtros.
+    
+    Args:
+        status: Filtrar por status
+        desde: Abertas a partir desta data (inclusive)
+        ate: Abertas antes desta data
+        partition: Filtrar pela partição
+        
+    Returns:
+        Select pronto para execução em streaming
+    """
+    statements = []
+    for model in (Box, ArchivedBox):
+        statement = select(model.id, model.partition, model.status, model.opened_at, model.closed_at, model.piece_count)
+        if partition is not None:
+            statement = statement.where(model.partition == partition)
+        if status:
+            statement = statement.where(model.status == status)
+        if desde:
+            statement = statement.where(model.opened_at >= desde)
+        if ate:
+            statement = statement.where(model.opened_at < ate)
+        statements.append(statement)
+    rows = union_all(*statements).subquery()
+    return select(*rows.c).order_by(rows.c.opened_at, rows.c.id)
+
+
+def piece_record(row: Sequence[Any]) -> Dict[str, Any]:
+    """Converte uma linha de pieces_export_statement em dicionário exportável"""
+    piece_id, peso, cor, comprimento, status, rejection_mask, box_id, created_at = row
+    return {
+        "id": piece_id,
+        "peso": peso,
+        "cor": cor.value,
+        "comprimento": comprimento,
+        "status": status.value,
+        "rejection_reasons": reasons_from_mask(rejection_mask),
+        "box_id": box_id,
+        "created_at": created_at.isoformat(),
+    }
+
+
+def box_record(row: Sequence[Any]) -> Dict[str, Any]:
+    """Converte uma linha de boxes_export_statement em dicionário exportável"""
+    box_id, partition, status, opened_at, closed_at, piece_count = row
+    return {
+        "id": box_id,
+        "partition": partition,
+        "status": status.value,
+        "opened_at": opened_at.isoformat(),
+        "closed_at": closed_at.isoformat() if closed_at else None,
+        "piece_count": piece_count,
+    }
+
+
+def encode_ndjson(records: List[Dict[str, Any]]) -> str:
+    """Serializa os registros como NDJSON (um objeto JSON por linha)"""
+    return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+
+
+def encode_csv(records: List[Dict[str, Any]], columns: List[str], header: bool = False) -> str:
+    """
+    Serializa os registros como CSV.
+    
+    Listas (rejection_reasons) são unidas por ";" e None vira campo vazio.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(columns)
+    for record in records:
+        writer.writerow([
+            ";".join(value) if isinstance(value, list) else ("" if value is None else value)
+            for value in (record[column] for column in columns)
+        ])
+    return buffer.getvalue()
+
+
+async def export_chunks(
+    partitions: AsyncIterator[Sequence[Sequence[Any]]],
+    to_record: Callable[[Sequence[Any]], Dict[str, Any]],
+    columns: List[str],
+    export_format: ExportFormat
+) -> AsyncIterator[str]:
+    """
+    Converte blocos de linhas do banco em blocos de texto NDJSON ou CSV.
+    
+    Cada bloco lido do cursor vira um único pedaço da resposta, então a
+    memória usada depende de EXPORT_CHUNK_SIZE e não do total exportado.
+    
+    Args:
+        partitions: Blocos de linhas vindos do cursor do banco
+        to_record: Função que converte uma linha em dicionário
+        columns: Colunas (ordem do CSV)
+        export_format: "ndjson" ou "csv"
+    """
+    if export_format == "csv":
+        yield encode_csv([], columns, header=True)
+    
+    async for rows in partitions:
+        records = [to_record(row) for row in rows]
+        if export_format == "csv":
+            yield encode_csv(records, columns)
+        else:
+            yield encode_ndjson(records)
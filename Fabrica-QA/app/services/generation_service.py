@@ -0,0 +1,154 @@
+import logging
+from contextvars import ContextVar
+from itertools import chain
+from typing import Optional, Tuple
+from sqlalchemy import event, insert, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import ORMExecuteState, Session as OrmSession, SessionTransaction
+from sqlmodel import Session, select
+from app.models.data_generation import DataGeneration
+
+logger = logging.getLogger(__name__)
+
+# Tabelas cujas alterações invalidam as respostas em cache
+VERSIONED_TABLES = {"piece", "box", "production_stats"}
+
+# Chave em session.info marcando que a transação alterou VERSIONED_TABLES
+DATA_CHANGED_KEY = "data_changed"
+
+# Chave em session.info: a transação confirmada alterou VERSIONED_TABLES e a
+# versão ainda não foi incrementada
+BUMP_PENDING_KEY = "data_generation_bump_pending"
+
+
+class CommittedVersion:
+    """Maior versão dos dados gravada por transações confirmadas no contexto"""
+    
+    __slots__ = ("version",)
+    
+    def __init__(self):
+        self.version: Optional[Tuple[str, int]] = None
+    
+    def record(self, version: Tuple[str, int]) -> None:
+        if self.version is None or self.version[0] != version[0] or version[1] > self.version[1]:
+            self.version = version
+
+
+# Definido por requisição (app.api.replica.DataVersionMiddleware); como em
+# current_request_stats, o objeto é compartilhado com o threadpool e com o
+# greenlet do AsyncSession, então commits feitos pela rota são registrados
+committed_version: ContextVar[Optional[CommittedVersion]] = ContextVar("committed_version", default=None)
+
+
+def current_generation(session: Session) -> Tuple[str, int]:
+    """
+    Lê a versão atual dos dados.
+    
+    Args:
+        session: Sessão do banco de dados
+        
+    Returns:
+        Tupla (epoch, generation); ("", 0) se a linha ainda não existir
+    """
+    row = session.exec(select(DataGeneration.epoch, DataGeneration.generation).where(DataGeneration.id == 1)).first()
+    if row is None:
+        return "", 0
+    return row[0], row[1]
+
+
+def ensure_data_generation(session: Session) -> None:
+    """Cria a linha do contador de versão, se ainda não existir"""
+    if session.get(DataGeneration, 1) is None:
+        session.add(DataGeneration(id=1))
+        session.commit()
+
+
+def bump_data_generation(bind: Engine) -> Tuple[str, int]:
+    """
+    Incrementa a versão dos dados em uma transação própria e curta.
+    
+    Chamado automaticamente depois do commit de transações que alteraram
+    peças, caixas ou agregados: a linha única de data_generation fica
+    bloqueada só durante este UPDATE, e não durante a transação de escrita
+    inteira (que serializaria todas as escritas no PostgreSQL).
+    
+    Args:
+        bind: Engine do banco
+        
+    Returns:
+        Versão gravada (epoch, generation)
+    """
+    with bind.begin() as connection:
+        version = connection.execute(
+            update(DataGeneration)
+            .where(DataGeneration.id == 1)
+            .values(generation=DataGeneration.generation + 1)
+            .returning(DataGeneration.epoch, DataGeneration.generation)
+        ).first()
+        if version is None:
+            epoch = DataGeneration().epoch
+            connection.execute(insert(DataGeneration).values(id=1, epoch=epoch, generation=1))
+            version = (epoch, 1)
+    return version[0], version[1]
+
+
+def _touches_versioned_tables(objects) -> bool:
+    return any(getattr(obj, "__tablename__", None) in VERSIONED_TABLES for obj in objects)
+
+
+@event.listens_for(OrmSession, "do_orm_execute")
+def _track_bulk_changes(state: ORMExecuteState) -> None:
+    """Marca a transação em UPDATE/DELETE/INSERT em massa (ex.: apply_stats_delta)"""
+    if state.is_update or state.is_delete or state.is_insert:
+        table = getattr(state.statement, "table", None)
+        if table is not None and table.name in VERSIONED_TABLES:
+            state.session.info[DATA_CHANGED_KEY] = True
+
+
+@event.listens_for(OrmSession, "after_flush")
+def _track_flushed_changes(session: OrmSession, flush_context) -> None:
+    """Marca a transação quando o flush grava objetos das tabelas versionadas"""
+    if _touches_versioned_tables(chain(session.new, session.dirty, session.deleted)):
+        session.info[DATA_CHANGED_KEY] = True
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _mark_bump_pending(session: OrmSession) -> None:
+    """Marca a transação confirmada que alterou os dados (o flush do commit já passou por after_flush)"""
+    if session.in_nested_transaction():
+        return
+    if session.info.pop(DATA_CHANGED_KEY, False):
+        session.info[BUMP_PENDING_KEY] = True
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _reset_tracking(session: OrmSession) -> None:
+    if session.in_nested_transaction():
+        return
+    session.info.pop(DATA_CHANGED_KEY, None)
+    session.info.pop(BUMP_PENDING_KEY, None)
+
+
+@event.listens_for(OrmSession, "after_transaction_end")
+def _bump_after_commit(session: OrmSession, transaction: SessionTransaction) -> None:
+    """
+    Incrementa a versão depois do commit das alterações.
+    
+    after_transaction_end roda com a conexão da transação já devolvida ao
+    pool (e o lock de escrita do SQLite liberado). Entre os dois commits,
+    leitores podem ver os dados novos com a versão anterior; a requisição
+    que gravou só responde depois do incremento. Registra a versão para o
+    cabeçalho X-Data-Version da requisição.
+    """
+    if transaction.parent is not None or not session.info.pop(BUMP_PENDING_KEY, False):
+        return
+    try:
+        version = bump_data_generation(session.get_bind().engine)
+    except DBAPIError as e:
+        # Os dados já foram confirmados: a próxima escrita incrementa a versão
+        logger.warning("Falha ao incrementar a versão dos dados: %s", str(e).splitlines()[0])
+        return
+    tracker = committed_version.get()
+    if tracker is not None:
+        tracker.record(version)
@@ -0,0 +1,199 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+from sqlmodel import Session, select
+from app.models.enums import IngestStatus
+from app.models.ingest_ticket import IngestTicket
+from app.schemas.piece import PieceCreate
+from app.services.ingestion_service import add_pieces
+
+# Peças processadas por transação pelo consumidor do journal
+INGEST_BATCH_SIZE = 500
+
+# Tempo até uma entrada reservada por um consumidor (que pode ter caído)
+# voltar a ficar disponível para outro
+INGEST_CLAIM_LEASE_SECONDS = 60.0
+
+# Quantidade máxima de tickets por consulta IN
+TICKET_LOOKUP_CHUNK = 500
+
+
+class JournalEntry(NamedTuple):
+    """Cadastro aguardando processamento no journal"""
+    seq: int
+    ticket: str
+    piece: PieceCreate
+    received_at: datetime
+
+
+class IngestJournal:
+    """
+    Fila durável de cadastros em um arquivo SQLite local.
+    
+    Cada append é confirmado em disco (WAL + synchronous=FULL) antes do 202,
+    sem depender do banco principal. Vários workers na mesma máquina podem
+    compartilhar o arquivo: cada consumidor reserva as entradas que vai
+    processar (claim) por INGEST_CLAIM_LEASE_SECONDS; se cair, a reserva
+    expira e outro consumidor as reprocessa.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.owner = uuid.uuid4().hex
+        self._local = threading.local()
+        self._connect()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Conexão da thread atual (sqlite3 não compartilha conexões entre threads)"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=FULL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS ingest_journal ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " ticket TEXT NOT NULL UNIQUE,"
+                " piece TEXT NOT NULL,"
+                " received_at TEXT NOT NULL,"
+                " claimed_by TEXT,"
+                " claimed_until REAL)"
+            )
+            self._local.connection = connection
+        return connection
+    
+    def append(self, piece: PieceCreate) -> JournalEntry:
+        """
+        Grava o cadastro no journal e retorna a entrada com o ticket.
+        
+        Args:
+            piece: Peça recebida (já validada)
+            
+        Returns:
+            Entrada gravada (durável ao retornar)
+        """
+        ticket = uuid.uuid4().hex
+        received_at = datetime.utcnow()
+        cursor = self._connect().execute(
+            "INSERT INTO ingest_journal (ticket, piece, received_at) VALUES (?, ?, ?)",
+            (ticket, piece.model_dump_json(), received_at.isoformat())
+        )
+        return JournalEntry(cursor.lastrowid, ticket, piece, received_at)
+    
+    def claim(self, limit: int = INGEST_BATCH_SIZE, lease: float = INGEST_CLAIM_LEASE_SECONDS) -> List[JournalEntry]:
+        """
+        Reserva as próximas entradas (em ordem de chegada) para este consumidor.
+        
+        Entradas reservadas por outro consumidor só são retornadas depois
+        que a reserva expira.
+        """
+        connection = self._connect()
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            rows = connection.execute(
+                "SELECT seq, ticket, piece, received_at FROM ingest_journal"
+                " WHERE claimed_until IS NULL OR claimed_until < ?"
+                " ORDER BY seq LIMIT ?",
+                (now, limit)
+            ).fetchall()
+            if rows:
+                connection.executemany(
+                    "UPDATE ingest_journal SET claimed_by = ?, claimed_until = ? WHERE seq = ?",
+                    [(self.owner, now + lease, row[0]) for row in rows]
+                )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        
+        return [
+            JournalEntry(seq, ticket, PieceCreate.model_validate_json(piece), datetime.fromisoformat(received_at))
+            for seq, ticket, piece, received_at in rows
+        ]
+    
+    def release(self, entries: List[JournalEntry]) -> None:
+        """Devolve entradas reservadas (ex.: banco indisponível) para nova tentativa"""
+        self._connect().executemany(
+            "UPDATE ingest_journal SET claimed_by = NULL, claimed_until = NULL WHERE seq = ? AND claimed_by = ?",
+            [(entry.seq, self.owner) for entry in entries]
+        )
+    
+    def complete(self, entries: List[JournalEntry]) -> None:
+        """Remove do journal as entradas já gravadas no banco"""
+        self._connect().executemany(
+            "DELETE FROM ingest_journal WHERE seq = ?",
+            [(entry.seq,) for entry in entries]
+        )
+    
+    def get(self, ticket: str) -> Optional[JournalEntry]:
+        """Busca uma entrada ainda não processada pelo ticket"""
+        row = self._connect().execute(
+            "SELECT seq, ticket, piece, received_at FROM ingest_journal WHERE ticket = ?",
+            (ticket,)
+        ).fetchone()
+        if row is None:
+            return None
+        seq, ticket, piece, received_at = row
+        return JournalEntry(seq, ticket, PieceCreate.model_validate_json(piece), datetime.fromisoformat(received_at))
+    
+    def pending(self) -> int:
+        """Quantidade de entradas aguardando processamento"""
+        return self._connect().execute("SELECT COUNT(*) FROM ingest_journal").fetchone()[0]
+
+
+def apply_journal_entries(session: Session, entries: List[JournalEntry]) -> Dict[str, int]:
+    """
+    Cadastra as peças do journal e grava os tickets em uma única transação.
+    
+    Entradas cujo ticket já existe no banco (processadas antes de uma queda,
+    mas ainda não removidas do journal) são ignoradas: cada cadastro é
+    aplicado exatamente uma vez. A data de cadastro das peças é a de
+    recebimento no journal.
+    
+    Args:
+        session: Sessão do banco de dados
+        entries: Entradas reservadas do journal, em ordem de chegada
+        
+    Returns:
+        Dicionário com created, duplicates e already_applied
+    """
+    tickets = [entry.ticket for entry in entries]
+    applied = set()
+    for start in range(0, len(tickets), TICKET_LOOKUP_CHUNK):
+        chunk = tickets[start:start + TICKET_LOOKUP_CHUNK]
+        applied.update(session.exec(select(IngestTicket.ticket).where(IngestTicket.ticket.in_(chunk))).all())
+    
+    pending = [entry for entry in entries if entry.ticket not in applied]
+    pieces, _ = add_pieces(
+        session,
+        [entry.piece for entry in pending],
+        created_at=[entry.received_at for entry in pending]
+    )
+    
+    now = datetime.utcnow()
+    session.add_all([
+        IngestTicket(
+            ticket=entry.ticket,
+            piece_id=entry.piece.id,
+            status=IngestStatus.CREATED if piece is not None else IngestStatus.DUPLICATE,
+            received_at=entry.received_at,
+            processed_at=now,
+            box_id=piece.box_id if piece is not None else None
+        )
+        for entry, piece in zip(pending, pieces)
+    ])
+    created = sum(1 for piece in pieces if piece is not None)
+    session.commit()
+    
+    return {
+        "created": created,
+        "duplicates": len(pending) - created,
+        "already_applied": len(applied),
+    }
@@ -0,0 +1,270 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+from sqlalchemy import exists, literal, union_all
+from sqlmodel import Session, select
+from app.models.archive import ArchivedPiece
+from app.models.piece import Piece
+from app.models.enums import PieceStatus
+from app.schemas.piece import PieceCreate
+from app.services.quality_service import evaluate_piece, evaluate_pieces, reasons_from_mask
+from app.services.boxing_service import find_or_create_open_box, count_piece_in_box, allocate_pieces_in_batch
+from app.services.partition_service import piece_partition
+from app.services.report_service import record_pieces_created
+
+# Quantidade máxima de IDs por consulta IN (evita limites de parâmetros do SQLite)
+ID_LOOKUP_CHUNK = 500
+
+
+def find_existing_piece_ids(session: Session, piece_ids: List[str]) -> Set[str]:
+    """
+    Retorna quais IDs da lista já estão cadastrados (inclusive no arquivo).
+    
+    Args:
+        session: Sessão do banco de dados
+        piece_ids: IDs a verificar
+        
+    Returns:
+        Conjunto com os IDs já existentes no banco
+    """
+    existing: Set[str] = set()
+    for start in range(0, len(piece_ids), ID_LOOKUP_CHUNK):
+        chunk = piece_ids[start:start + ID_LOOKUP_CHUNK]
+        statement = union_all(
+            select(Piece.id).where(Piece.id.in_(chunk)),
+            select(ArchivedPiece.id).where(ArchivedPiece.id.in_(chunk))
+        )
+        existing.update(session.execute(statement).scalars().all())
+    return existing
+
+
+def insert_piece_if_absent(session: Session, piece: Piece) -> bool:
+    """
+    Grava a peça se o ID ainda não existir (nem no arquivo), em um único comando.
+    
+    SQLite e PostgreSQL: INSERT ... SELECT ... WHERE NOT EXISTS (piece_archive)
+    ON CONFLICT (id) DO NOTHING RETURNING id. Não há leitura prévia, e dois
+    cadastros concorrentes do mesmo ID (reenvio após timeout, outro worker)
+    não geram erro de integridade: o segundo simplesmente não grava nada.
+    A peça continua transiente (fora da sessão). Não faz commit.
+    
+    Args:
+        session: Sessão do banco de dados
+        piece: Peça com todos os campos preenchidos (inclusive box_id)
+        
+    Returns:
+        True se a peça foi gravada, False se o ID já existia
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        # Alternativa para bancos sem ON CONFLICT: consulta antes de gravar
+        if session.get(Piece, piece.id) or session.get(ArchivedPiece, piece.id):
+            return False
+        session.add(piece)
+        session.flush()
+        session.expunge(piece)
+        return True
+    
+    table = Piece.__table__
+    values = select(*[literal(getattr(piece, column.name), column.type) for column in table.columns])
+    values = values.where(~exists().where(ArchivedPiece.id == piece.id))
+    statement = (
+        insert(table)
+        .from_select([column.name for column in table.columns], values)
+        .on_conflict_do_nothing(index_elements=[table.c.id])
+        .returning(table.c.id)
+    )
+    return session.execute(statement).first() is not None
+
+
+def ingest_piece(session: Session, piece_data: PieceCreate) -> Optional[Piece]:
+    """
+    Cadastra uma peça, avalia sua qualidade e, se aprovada, aloca em caixa.
+    
+    A alocação bloqueia a caixa aberta da partição da peça até o commit,
+    então cadastros concorrentes (em várias threads ou processos) não
+    ultrapassam a capacidade nem abrem caixas duplicadas. A peça é gravada com
+    insert_piece_if_absent: um ID repetido (inclusive de peça arquivada ou
+    gravada ao mesmo tempo por outro worker) desfaz a transação e retorna None.
+    
+    Args:
+        session: Sessão do banco de dados
+        piece_data: Dados da peça
+        
+    Returns:
+        Peça cadastrada (transiente, com todos os campos), ou None se já
+        existir peça com o mesmo ID
+    """
+    evaluation = evaluate_piece(piece_data)
+    
+    piece = Piece(
+        id=piece_data.id,
+        peso=piece_data.peso,
+        cor=piece_data.cor,
+        comprimento=piece_data.comprimento,
+        status=evaluation["status"],
+        rejection_reasons=evaluation["rejection_reasons"],
+        rejection_mask=evaluation["rejection_mask"],
+        created_at=datetime.utcnow()
+    )
+    
+    # Se aprovada, a caixa aberta da partição da peça é travada antes de
+    # gravar a peça, que já entra com box_id
+    box = None
+    if piece.status == PieceStatus.APPROVED:
+        box = find_or_create_open_box(session, piece_partition(piece))
+        piece.box_id = box.id
+    
+    if not insert_piece_if_absent(session, piece):
+        session.rollback()
+        return None
+    
+    record_pieces_created(session, [piece])
+    if box is not None:
+        count_piece_in_box(session, box)
+    session.commit()
+    return piece
+
+
+def add_pieces(
+    session: Session,
+    pieces_data: List[PieceCreate],
+    created_at: Optional[List[datetime]] = None
+) -> Tuple[List[Optional[Piece]], Dict[str, int]]:
+    """
+    Avalia, aloca e adiciona à sessão as peças novas de um lote, sem commit.
+    
+    Args:
+        session: Sessão do banco de dados
+        pieces_data: Peças recebidas
+        created_at: Data de cadastro de cada peça (padrão: agora), na ordem da entrada
+        
+    Returns:
+        Tupla (peça criada ou None se duplicada, na ordem da entrada;
+        resultado de allocate_pieces_in_batch)
+    """
+    existing_ids = find_existing_piece_ids(session, list({p.id for p in pieces_data}))
+    
+    # Descarta duplicados antes de avaliar
+    seen_ids: Set[str] = set()
+    accepted: List[PieceCreate] = []
+    accepted_created_at: List[Optional[datetime]] = []
+    for index, piece_data in enumerate(pieces_data):
+        if piece_data.id in existing_ids or piece_data.id in seen_ids:
+            continue
+        seen_ids.add(piece_data.id)
+        accepted.append(piece_data)
+        accepted_created_at.append(created_at[index] if created_at else None)
+    
+    # Avalia todas as peças aceitas de uma vez
+    evaluation = evaluate_pieces(
+        [p.peso for p in accepted],
+        [p.comprimento for p in accepted],
+        [p.cor for p in accepted]
+    )
+    
+    new_pieces: List[Piece] = []
+    pieces_by_id: Dict[str, Piece] = {}
+    for piece_data, status, mask, piece_created_at in zip(
+        accepted, evaluation["status"], evaluation["rejection_mask"].tolist(), accepted_created_at
+    ):
+        piece = Piece(
+            id=piece_data.id,
+            peso=piece_data.peso,
+            cor=piece_data.cor,
+            comprimento=piece_data.comprimento,
+            status=status,
+            rejection_reasons=reasons_from_mask(mask),
+            rejection_mask=mask
+        )
+        if piece_created_at is not None:
+            piece.created_at = piece_created_at
+        new_pieces.append(piece)
+        pieces_by_id[piece.id] = piece
+    
+    approved = [p for p in new_pieces if p.status == PieceStatus.APPROVED]
+    allocation = allocate_pieces_in_batch(session, approved)
+    
+    session.add_all(new_pieces)
+    record_pieces_created(session, new_pieces)
+    
+    # Só a primeira ocorrência de cada ID recebe a peça
+    return [pieces_by_id.pop(piece_data.id, None) for piece_data in pieces_data], allocation
+
+
+def ingest_pieces_batch(session: Session, pieces_data: List[PieceCreate]) -> Dict[str, Any]:
+    """
+    Cadastra um lote de peças em uma única transação.
+    
+    - Descarta IDs já existentes (ou repetidos no próprio lote)
+    - Avalia a qualidade de todas as peças
+    - Aloca as aprovadas em caixas, planejando o preenchimento em memória
+    - Insere tudo com um único commit
+    
+    Args:
+        session: Sessão do banco de dados
+        pieces_data: Peças recebidas
+        
+    Returns:
+        Dicionário com:
+        - items: Lista de dicionários (id, status, box_id, rejection_reasons, duplicate)
+          na mesma ordem da entrada
+        - created: Número de peças cadastradas
+        - duplicates: Número de peças ignoradas por ID duplicado
+        - boxes_opened / boxes_closed: Caixas abertas e fechadas pelo lote
+    """
+    pieces, allocation = add_pieces(session, pieces_data)
+    
+    # Monta o resultado antes do commit (evita recarregar cada peça depois)
+    results = []
+    for piece_data, piece in zip(pieces_data, pieces):
+        if piece is None:
+            results.append({
+                "id": piece_data.id,
+                "status": None,
+                "box_id": None,
+                "rejection_reasons": [],
+                "duplicate": True
+            })
+        else:
+            results.append({
+                "id": piece.id,
+                "status": piece.status,
+                "box_id": piece.box_id,
+                "rejection_reasons": piece.rejection_reasons,
+                "duplicate": False
+            })
+    created = sum(1 for piece in pieces if piece is not None)
+    
+    session.commit()
+    
+    return {
+        "items": results,
+        "created": created,
+        "duplicates": len(pieces_data) - created,
+        "boxes_opened": allocation["boxes_opened"],
+        "boxes_closed": allocation["boxes_closed"]
+    }
+
+
+def ingest_pieces_group(session: Session, pieces_data: List[PieceCreate]) -> List[Optional[Piece]]:
+    """
+    Cadastra, em uma única transação, peças vindas de várias requisições unitárias.
+    
+    Usado pelo modo de group commit: o resultado de cada peça é o mesmo de
+    chamar ingest_piece em sequência, na ordem da lista (a segunda peça com
+    o mesmo ID é duplicada), mas com um único commit para todas.
+    
+    Args:
+        session: Sessão do banco de dados
+        pieces_data: Peças recebidas, na ordem de chegada
+        
+    Returns:
+        Para cada entrada, a peça cadastrada ou None se o ID já existia
+    """
+    pieces, _ = add_pieces(session, pieces_data)
+    session.commit()
+    return pieces
@@ -0,0 +1,61 @@
+from collections import Counter
+from typing import Iterable, Optional
+from prometheus_client import Counter as PrometheusCounter
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session
+from app.core.metrics import PIECES_CREATED, PIECES_REJECTED_BY_REASON
+from app.models.enums import PieceStatus
+from app.models.piece import Piece
+from app.services.quality_service import REASON_BITS
+
+# Chave em session.info com os incrementos da transação corrente
+PENDING_METRICS_KEY = "pending_metrics"
+
+
+def count_metric(session: Session, metric: PrometheusCounter, amount: int = 1, **labels: str) -> None:
+    """
+    Registra o incremento de um contador de produção na transação da sessão.
+    
+    O contador só é incrementado se a transação for confirmada (descartado
+    no rollback), como os eventos de events_service.
+    
+    Args:
+        session: Sessão do banco de dados
+        metric: Contador Prometheus (app.core.metrics)
+        amount: Valor a somar
+        **labels: Labels do contador
+    """
+    if amount <= 0:
+        return
+    pending = session.info.setdefault(PENDING_METRICS_KEY, Counter())
+    pending[(metric, tuple(sorted(labels.items())))] += amount
+
+
+def count_pieces_created(session: Session, pieces: Iterable[Piece]) -> None:
+    """Contabiliza peças cadastradas por status e as reprovadas por motivo"""
+    for piece in pieces:
+        count_metric(session, PIECES_CREATED, status=piece.status.value)
+        if piece.status == PieceStatus.REJECTED:
+            for reason, bit in REASON_BITS.items():
+                if piece.rejection_mask & bit:
+                    count_metric(session, PIECES_REJECTED_BY_REASON, reason=reason.value)
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _apply_committed_metrics(session: OrmSession) -> None:
+    # Savepoints (begin_nested) não encerram a transação
+    if session.in_nested_transaction():
+        return
+    pending: Optional[Counter] = session.info.pop(PENDING_METRICS_KEY, None)
+    if not pending:
+        return
+    for (metric, labels), amount in pending.items():
+        (metric.labels(**dict(labels)) if labels else metric).inc(amount)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_rolled_back_metrics(session: OrmSession) -> None:
+    if session.in_nested_transaction():
+        return
+    session.info.pop(PENDING_METRICS_KEY, None)
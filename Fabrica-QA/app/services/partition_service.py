@@ -0,0 +1,83 @@
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Dict
+from sqlalchemy import true
+from app.core.config import get_settings
+
+# Capacidade máxima de peças por caixa (padrão das partições sem capacidade própria)
+BOX_CAPACITY = 10
+
+# Partição das caixas quando BOX_PARTITION_BY está vazio (uma única caixa aberta)
+DEFAULT_PARTITION = ""
+
+# Atributos da peça aceitos em BOX_PARTITION_BY
+PARTITION_KEYS = ("cor",)
+
+
+def partition_key() -> str:
+    """Atributo da peça que separa as caixas (BOX_PARTITION_BY); "" sem particionamento"""
+    key = get_settings().box_partition_by
+    if key and key not in PARTITION_KEYS:
+        raise ValueError(f"BOX_PARTITION_BY inválido: '{key}' (use vazio ou um de {', '.join(PARTITION_KEYS)})")
+    return key
+
+
+def piece_partition(piece: Any) -> str:
+    """
+    Partição de caixas de uma peça: o valor do atributo BOX_PARTITION_BY.
+    
+    Args:
+        piece: Peça (Piece, PieceCreate ou linha com o atributo da chave)
+        
+    Returns:
+        Valor da partição (ex.: "azul"), ou DEFAULT_PARTITION sem particionamento
+    """
+    key = partition_key()
+    if not key:
+        return DEFAULT_PARTITION
+    return partition_value(getattr(piece, key))
+
+
+def partition_value(value: Any) -> str:
+    """Partição correspondente a um valor do atributo BOX_PARTITION_BY (ex.: Color.AZUL -> "azul")"""
+    return value.value if isinstance(value, Enum) else str(value)
+
+
+def partition_filter(model, partition: str):
+    """
+    Condição SQL das peças de uma partição, para consultas em Piece ou ArchivedPiece.
+    
+    Raises:
+        ValueError: Se a partição não existe na chave configurada
+    """
+    key = partition_key()
+    if not key:
+        if partition != DEFAULT_PARTITION:
+            raise ValueError("Caixas não particionadas (BOX_PARTITION_BY vazio)")
+        return true()
+    column = getattr(model, key)
+    enum_class = getattr(column.type, "enum_class", None)
+    if enum_class is None:
+        return column == partition
+    try:
+        return column == enum_class(partition)
+    except ValueError:
+        raise ValueError(f"Partição '{partition}' inválida para BOX_PARTITION_BY={key}")
+
+
+@lru_cache
+def _parse_capacities(value: str) -> Dict[str, int]:
+    capacities = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        partition, _, capacity = item.partition("=")
+        if not capacity.strip().isdigit() or int(capacity) < 1:
+            raise ValueError(f"BOX_CAPACITIES inválido: '{item.strip()}' (use particao=capacidade)")
+        capacities[partition.strip()] = int(capacity)
+    return capacities
+
+
+def box_capacity(partition: str = DEFAULT_PARTITION) -> int:
+    """Capacidade das caixas da partição (BOX_CAPACITIES, ou BOX_CAPACITY)"""
+    return _parse_capacities(get_settings().box_capacities).get(partition, BOX_CAPACITY)
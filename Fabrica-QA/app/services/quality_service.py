@@ -1,5 +1,6 @@
-from typing import Dict, List
-from app.models.enums import PieceStatus, Color
+from typing import Dict, List, Sequence
+import numpy as np
+from app.models.enums import PieceStatus, Color, RejectionReason
 from app.schemas.piece import PieceCreate
 
 
@@ -10,6 +11,29 @@ COMPRIMENTO_MIN = 10.0
 COMPRIMENTO_MAX = 20.0
 CORES_PERMITIDAS = [Color.AZUL, Color.VERDE]
 
+# Bits de motivo de reprovação (um por critério)
+REASON_PESO = 1
+REASON_COR = 2
+REASON_COMPRIMENTO = 4
+
+# Motivos na mesma ordem em que evaluate_piece os registra
+REJECTION_REASONS = [
+    (REASON_PESO, "peso fora da faixa"),
+    (REASON_COR, "cor inválida"),
+    (REASON_COMPRIMENTO, "comprimento fora da faixa"),
+]
+
+# Bit de cada critério usado nos filtros por motivo
+REASON_BITS = {
+    RejectionReason.PESO: REASON_PESO,
+    RejectionReason.COR: REASON_COR,
+    RejectionReason.COMPRIMENTO: REASON_COMPRIMENTO,
+}
+
+# PieceStatus indexado por "reprovada" (evaluate_pieces); dtype object para
+# manter os membros do Enum
+STATUS_BY_REJECTED = np.array([PieceStatus.APPROVED, PieceStatus.REJECTED], dtype=object)
+
 
 def evaluate_piece(piece_data: PieceCreate) -> Dict[str, any]:
     """
@@ -24,27 +48,106 @@ def evaluate_piece(piece_data: PieceCreate) -> Dict[str, any]:
         piece_data: Dados da peça a ser avaliada
         
     Returns:
-        Dict com 'status' (PieceStatus) e 'rejection_reasons' (List[str])
+        Dict com 'status' (PieceStatus), 'rejection_reasons' (List[str]) e
+        'rejection_mask' (int com os bits REASON_*)
     """
     rejection_reasons: List[str] = []
+    rejection_mask = 0
     
     # Verifica peso
     if piece_data.peso < PESO_MIN or piece_data.peso > PESO_MAX:
         rejection_reasons.append("peso fora da faixa")
+        rejection_mask |= REASON_PESO
     
     # Verifica cor
     if piece_data.cor not in CORES_PERMITIDAS:
         rejection_reasons.append("cor inválida")
+        rejection_mask |= REASON_COR
     
     # Verifica comprimento
     if piece_data.comprimento < COMPRIMENTO_MIN or piece_data.comprimento > COMPRIMENTO_MAX:
         rejection_reasons.append("comprimento fora da faixa")
+        rejection_mask |= REASON_COMPRIMENTO
     
     # Determina status
     status = PieceStatus.APPROVED if len(rejection_reasons) == 0 else PieceStatus.REJECTED
     
     return {
         "status": status,
-        "rejection_reasons": rejection_reasons
+        "rejection_reasons": rejection_reasons,
+        "rejection_mask": rejection_mask
     }
 
+
+def mask_from_reasons(reasons: Sequence[str]) -> int:
+    """
+    Converte uma lista de motivos legíveis na máscara de bits equivalente.
+    
+    Args:
+        reasons: Motivos como registrados por evaluate_piece
+        
+    Returns:
+        Máscara com os bits REASON_* (motivos desconhecidos são ignorados)
+    """
+    mask = 0
+    for bit, reason in REJECTION_REASONS:
+        if reason in reasons:
+            mask |= bit
+    return mask
+
+
+def reasons_from_mask(mask: int) -> List[str]:
+    """
+    Converte uma máscara de motivos na lista de motivos legíveis.
+    
+    Args:
+        mask: Máscara com os bits REASON_*
+        
+    Returns:
+        Lista de motivos na mesma ordem de evaluate_piece
+    """
+    return [reason for bit, reason in REJECTION_REASONS if mask & bit]
+
+
+def evaluate_pieces(
+    pesos: Sequence[float],
+    comprimentos: Sequence[float],
+    cores: Sequence[str]
+) -> Dict[str, np.ndarray]:
+    """
+    Avalia várias peças de uma vez com operações vetorizadas (NumPy).
+    
+    Aplica exatamente os mesmos critérios de evaluate_piece.
+    
+    Args:
+        pesos: Pesos em gramas
+        comprimentos: Comprimentos em centímetros
+        cores: Cores (Color ou string)
+        
+    Returns:
+        Dict com 'status' (array de PieceStatus) e 'rejection_mask' (array
+        uint8 com os bits REASON_* de cada peça)
+    """
+    peso = np.asarray(pesos, dtype=np.float64)
+    comprimento = np.asarray(comprimentos, dtype=np.float64)
+    if isinstance(cores, np.ndarray):
+        cor = cores
+    else:
+        cor = np.asarray([getattr(c, "value", c) for c in cores], dtype=np.str_)
+    
+    cor_valida = np.zeros(cor.shape, dtype=bool)
+    for cor_permitida in CORES_PERMITIDAS:
+        cor_valida |= cor == cor_permitida.value
+    
+    mask = np.zeros(peso.shape, dtype=np.uint8)
+    mask |= ((peso < PESO_MIN) | (peso > PESO_MAX)).astype(np.uint8) * REASON_PESO
+    mask |= (~cor_valida).astype(np.uint8) * REASON_COR
+    mask |= ((comprimento < COMPRIMENTO_MIN) | (comprimento > COMPRIMENTO_MAX)).astype(np.uint8) * REASON_COMPRIMENTO
+    
+    # Índice 0 (sem motivo) -> aprovada; 1 -> reprovada
+    status = STATUS_BY_REJECTED[(mask != 0).astype(np.intp)]
+    
+    return {
+        "status": status,
+        "rejection_mask": mask
+    }
@@ -1,53 +1,323 @@
-from collections import Counter
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import case
 from sqlmodel import Session, select, func
 from app.models.piece import Piece
 from app.models.box import Box
-from app.models.enums import PieceStatus, BoxStatus
+from app.models.archive import ArchivedBox, ArchivedPiece
+from app.models.production_stats import ProductionStats
+from app.models.enums import PieceStatus
 from app.schemas.report import FinalReportResponse, RejectionReasonCount
+from app.services.quality_service import (
+    REJECTION_REASONS,
+    REASON_PESO,
+    REASON_COR,
+    REASON_COMPRIMENTO,
+    reasons_from_mask,
+)
+from app.services.partition_service import (
+    DEFAULT_PARTITION,
+    partition_filter,
+    partition_key,
+    partition_value,
+    piece_partition,
+)
+from app.services.timeseries_service import record_pieces_rollup
+from app.services.events_service import emit_event, emit_report_delta
+from app.services.metrics_service import count_metric, count_pieces_created
+from app.core.metrics import BOXES_OPENED
 
+# Coluna de ProductionStats que acumula cada bit de motivo de reprovação
+REASON_COLUMNS = {
+    REASON_PESO: "motivo_peso",
+    REASON_COR: "motivo_cor",
+    REASON_COMPRIMENTO: "motivo_comprimento",
+}
 
-def generate_final_report(session: Session) -> FinalReportResponse:
+# Colunas de contagem (todas exceto a partição)
+STATS_COLUMNS = [
+    "total_aprovadas",
+    "total_reprovadas",
+    "motivo_peso",
+    "motivo_cor",
+    "motivo_comprimento",
+    "total_caixas",
+]
+
+
+def apply_stats_delta(session: Session, deltas: Dict[str, Dict[str, int]]) -> None:
     """
-    Gera relatório final consolidado com estatísticas de produção.
+    Soma os deltas informados aos agregados de produção de cada partição.
+    
+    Usa INSERT ... ON CONFLICT DO UPDATE (coluna = coluna + delta; SQLite e
+    PostgreSQL) na mesma transação do chamador, criando a linha da partição
+    no primeiro uso: transações de partições diferentes não disputam a
+    mesma linha. O commit fica a cargo de quem chamou. O delta somado das
+    partições também é publicado aos clientes de /events como
+    "report.delta" após o commit.
     
     Args:
         session: Sessão do banco de dados
+        deltas: Partição -> coluna -> valor a somar (valores zero são ignorados)
+    """
+    rows = []
+    total: Counter = Counter()
+    # Em ordem de partição: transações com várias partições travam as linhas na mesma ordem
+    for partition in sorted(deltas):
+        values = {column: amount for column, amount in deltas[partition].items() if amount}
+        if not values:
+            continue
+        row = {"partition": partition}
+        row.update({column: values.get(column, 0) for column in STATS_COLUMNS})
+        rows.append(row)
+        total.update(values)
+    if not rows:
+        return
+    
+    _upsert_stats_rows(session, rows)
+    emit_report_delta(session, dict(total))
+
+
+def _upsert_stats_rows(session: Session, rows: List[dict]) -> None:
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        _apply_stats_rows_orm(session, rows)
+        return
+    
+    table = ProductionStats.__table__
+    statement = insert(table).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.partition],
+        set_={column: table.c[column] + statement.excluded[column] for column in STATS_COLUMNS}
+    )
+    session.execute(statement)
+
+
+def _apply_stats_rows_orm(session: Session, rows: List[dict]) -> None:
+    """Alternativa para bancos sem ON CONFLICT: lê e atualiza cada linha"""
+    for row in rows:
+        stats = session.get(ProductionStats, row["partition"])
+        if stats is None:
+            stats = ProductionStats(partition=row["partition"])
+        for column in STATS_COLUMNS:
+            setattr(stats, column, (getattr(stats, column) or 0) + row[column])
+        session.add(stats)
+
+
+def pieces_stats_delta(pieces: Iterable[Piece], sign: int = 1) -> Dict[str, Counter]:
+    """
+    Calcula o delta dos agregados para peças cadastradas (sign=1) ou removidas (sign=-1).
+    
+    Args:
+        pieces: Peças cadastradas ou removidas
+        sign: 1 para cadastro, -1 para remoção
         
     Returns:
-        FinalReportResponse com totais e contagens
+        Dicionário partição da peça -> Counter coluna -> delta
+    """
+    deltas: Dict[str, Counter] = defaultdict(Counter)
+    for piece in pieces:
+        delta = deltas[piece_partition(piece)]
+        if piece.status == PieceStatus.APPROVED:
+            delta["total_aprovadas"] += sign
+        else:
+            delta["total_reprovadas"] += sign
+            for bit, column in REASON_COLUMNS.items():
+                if piece.rejection_mask & bit:
+                    delta[column] += sign
+    return deltas
+
+
+def boxes_stats_delta(boxes: Iterable[Box], sign: int = 1) -> Dict[str, Counter]:
+    """Delta de total_caixas por partição para caixas criadas (sign=1) ou excluídas (sign=-1)"""
+    deltas: Dict[str, Counter] = defaultdict(Counter)
+    for box in boxes:
+        deltas[box.partition]["total_caixas"] += sign
+    return deltas
+
+
+def piece_event_data(piece: Piece) -> Dict[str, Any]:
+    """Dados da peça enviados nos eventos piece.*"""
+    return {
+        "id": piece.id,
+        "status": piece.status.value,
+        "box_id": piece.box_id,
+        "rejection_reasons": reasons_from_mask(piece.rejection_mask),
+    }
+
+
+def record_pieces_created(session: Session, pieces: Iterable[Piece]) -> None:
+    """
+    Atualiza os agregados (totais e por intervalo) para peças cadastradas.
+    
+    Registra também o evento "piece.created"; os dados são montados no
+    commit, depois da alocação em caixa (box_id).
+    """
+    pieces = list(pieces)
+    apply_stats_delta(session, pieces_stats_delta(pieces, sign=1))
+    record_pieces_rollup(session, pieces, sign=1)
+    count_pieces_created(session, pieces)
+    emit_event(session, "piece.created", lambda: {"pieces": [piece_event_data(p) for p in pieces]})
+
+
+def record_pieces_deleted(session: Session, pieces: Iterable[Piece]) -> None:
+    """Atualiza os agregados (totais e por intervalo) e registra o evento "piece.deleted" """
+    pieces = list(pieces)
+    apply_stats_delta(session, pieces_stats_delta(pieces, sign=-1))
+    record_pieces_rollup(session, pieces, sign=-1)
+    emit_event(session, "piece.deleted", {"pieces": [{"id": p.id, "status": p.status.value} for p in pieces]})
+
+
+def record_boxes_created(session: Session, boxes: Iterable[Box]) -> None:
+    """Atualiza os agregados e o contador de caixas abertas para caixas criadas"""
+    boxes = list(boxes)
+    apply_stats_delta(session, boxes_stats_delta(boxes, sign=1))
+    count_metric(session, BOXES_OPENED, len(boxes))
+
+
+def record_boxes_deleted(session: Session, boxes: Iterable[Box]) -> None:
+    """Atualiza os agregados para caixas excluídas"""
+    apply_stats_delta(session, boxes_stats_delta(boxes, sign=-1))
+
+
+def compute_partition_stats(session: Session) -> Dict[str, Dict[str, int]]:
     """
-    # Conta peças aprovadas
-    statement_approved = select(func.count(Piece.id)).where(Piece.status == PieceStatus.APPROVED)
-    total_aprovadas = session.exec(statement_approved).one() or 0
+    Recalcula os agregados de cada partição a partir das tabelas de peças e caixas (ativas e arquivadas).
     
-    # Conta peças reprovadas
-    statement_rejected = select(func.count(Piece.id)).where(Piece.status == PieceStatus.REJECTED)
-    total_reprovadas = session.exec(statement_rejected).one() or 0
+    Peças contam na partição da chave configurada (BOX_PARTITION_BY, como em
+    piece_partition); caixas, na partição gravada na caixa. Os motivos são
+    somados no banco com operações de bits sobre rejection_mask.
     
-    # Busca todas as peças reprovadas para contar motivos
-    statement_rejected_pieces = select(Piece).where(Piece.status == PieceStatus.REJECTED)
-    rejected_pieces = session.exec(statement_rejected_pieces).all()
+    Args:
+        session: Sessão do banco de dados
+        
+    Returns:
+        Dicionário partição -> coluna -> valor recalculado
+    """
+    stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {column: 0 for column in STATS_COLUMNS})
+    key = partition_key()
     
-    # Conta motivos de reprovação
-    motivo_counter = Counter()
-    for piece in rejected_pieces:
-        for motivo in piece.rejection_reasons:
-            motivo_counter[motivo] += 1
+    # Dados arquivados (archive_service) continuam contados nos agregados
+    for piece_model, box_model in ((Piece, Box), (ArchivedPiece, ArchivedBox)):
+        partition_columns = [getattr(piece_model, key)] if key else []
+        
+        # Contagem por status e uma soma por bit de motivo, em uma única consulta
+        statement = select(
+            *partition_columns,
+            piece_model.status,
+            func.count(piece_model.id),
+            *[
+                func.coalesce(func.sum(case((piece_model.rejection_mask.op("&")(bit) != 0, 1), else_=0)), 0)
+                for bit in REASON_COLUMNS
+            ]
+        ).group_by(*partition_columns, piece_model.status)
+        for row in session.exec(statement).all():
+            partition = partition_value(row[0]) if partition_columns else DEFAULT_PARTITION
+            status, quantidade, *reason_totals = row[len(partition_columns):]
+            partition_stats = stats[partition]
+            if status == PieceStatus.APPROVED:
+                partition_stats["total_aprovadas"] += quantidade
+            else:
+                partition_stats["total_reprovadas"] += quantidade
+            for column, total in zip(REASON_COLUMNS.values(), reason_totals):
+                partition_stats[column] += total
+        
+        boxes_statement = select(box_model.partition, func.count(box_model.id)).group_by(box_model.partition)
+        for partition, quantidade in session.exec(boxes_statement).all():
+            stats[partition]["total_caixas"] += quantidade
+    return dict(stats)
+
+
+def rebuild_production_stats(session: Session) -> Dict[Tuple[str, str], Dict[str, Optional[int]]]:
+    """
+    Recalcula os agregados de todas as partições a partir dos dados brutos e grava o resultado.
     
-    # Converte para lista de RejectionReasonCount
-    motivo_contagem = [
-        RejectionReasonCount(motivo=motivo, quantidade=quantidade)
-        for motivo, quantidade in motivo_counter.items()
-    ]
+    Args:
+        session: Sessão do banco de dados
+        
+    Returns:
+        Divergências encontradas: (partição, coluna) -> {"stored": valor antigo, "actual": valor recalculado}
+    """
+    actual = compute_partition_stats(session)
+    stored = {stats.partition: stats for stats in session.exec(select(ProductionStats)).all()}
+    if not actual and not stored:
+        # Banco vazio: a linha da partição padrão marca os agregados como criados
+        actual[DEFAULT_PARTITION] = {column: 0 for column in STATS_COLUMNS}
     
-    # Conta todas as caixas utilizadas (abertas e fechadas)
-    statement_all_boxes = select(func.count(Box.id))
-    total_caixas = session.exec(statement_all_boxes).one() or 0
+    drifts = {}
+    for partition in sorted(set(actual) | set(stored)):
+        values = actual.get(partition) or {column: 0 for column in STATS_COLUMNS}
+        stats = stored.get(partition)
+        if stats is None:
+            stats = ProductionStats(partition=partition)
+            drifts.update({
+                (partition, column): {"stored": None, "actual": value}
+                for column, value in values.items()
+            })
+        else:
+            drifts.update({
+                (partition, column): {"stored": getattr(stats, column), "actual": value}
+                for column, value in values.items()
+                if getattr(stats, column) != value
+            })
+        
+        for column, value in values.items():
+            setattr(stats, column, value)
+        session.add(stats)
+    session.commit()
+    
+    return drifts
+
+
+def ensure_production_stats(session: Session) -> None:
+    """Cria as linhas de agregados a partir dos dados existentes, se ainda não existirem"""
+    if session.exec(select(ProductionStats.partition).limit(1)).first() is None:
+        rebuild_production_stats(session)
+
+
+def generate_final_report(session: Session, partition: Optional[str] = None) -> FinalReportResponse:
+    """
+    Gera relatório final consolidado com estatísticas de produção.
+    
+    Lê os agregados mantidos incrementalmente (ProductionStats): o relatório
+    de uma partição é a linha dela; o da fábrica, a soma das linhas (uma
+    por partição).
+    
+    Args:
+        session: Sessão do banco de dados
+        partition: Restringe o relatório às peças e caixas da partição
+        
+    Returns:
+        FinalReportResponse com totais e contagens
+        
+    Raises:
+        ValueError: Se a partição não existe na chave configurada
+    """
+    if partition is not None:
+        # Valida a partição na chave configurada (ValueError se não existir)
+        partition_filter(Piece, partition)
+        stats = session.get(ProductionStats, partition) or ProductionStats(partition=partition)
+    else:
+        totals = session.exec(select(*[
+            func.coalesce(func.sum(getattr(ProductionStats, column)), 0)
+            for column in STATS_COLUMNS
+        ])).one()
+        stats = ProductionStats(**dict(zip(STATS_COLUMNS, totals)))
+    
+    # Motivos na ordem dos critérios, apenas os que ocorreram
+    motivo_contagem: List[RejectionReasonCount] = []
+    for bit, motivo in REJECTION_REASONS:
+        quantidade = getattr(stats, REASON_COLUMNS[bit])
+        if quantidade:
+            motivo_contagem.append(RejectionReasonCount(motivo=motivo, quantidade=quantidade))
     
     return FinalReportResponse(
-        total_aprovadas=total_aprovadas,
-        total_reprovadas=total_reprovadas,
+        total_aprovadas=stats.total_aprovadas,
+        total_reprovadas=stats.total_reprovadas,
         motivo_contagem=motivo_contagem,
-        total_caixas=total_caixas
+        total_caixas=stats.total_caixas
     )
-
@@ -0,0 +1,297 @@
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete
+from sqlmodel import Session, select, func
+from app.models.piece import Piece
+from app.models.box import Box
+from app.models.archive import ArchivedBox, ArchivedPiece
+from app.models.production_rollup import ProductionRollup
+from app.models.enums import Granularity, PieceStatus
+from app.schemas.report import RejectionReasonCount, TimeseriesBucket, TimeseriesResponse
+from app.services.quality_service import REJECTION_REASONS, REASON_PESO, REASON_COR, REASON_COMPRIMENTO
+from app.services.partition_service import DEFAULT_PARTITION, partition_key, partition_value, piece_partition
+
+# Coluna de ProductionRollup que acumula cada bit de motivo de reprovação
+ROLLUP_REASON_COLUMNS = {
+    REASON_PESO: "motivo_peso",
+    REASON_COR: "motivo_cor",
+    REASON_COMPRIMENTO: "motivo_comprimento",
+}
+
+ROLLUP_COLUMNS = [
+    "aprovadas",
+    "reprovadas",
+    "motivo_peso",
+    "motivo_cor",
+    "motivo_comprimento",
+    "caixas_fechadas",
+]
+
+BUCKET_SIZES = {
+    Granularity.MINUTE: timedelta(minutes=1),
+    Granularity.HOUR: timedelta(hours=1),
+    Granularity.DAY: timedelta(days=1),
+}
+
+# Janela padrão quando o intervalo não é informado
+DEFAULT_WINDOWS = {
+    Granularity.MINUTE: timedelta(hours=1),
+    Granularity.HOUR: timedelta(days=1),
+    Granularity.DAY: timedelta(days=30),
+}
+
+# Limite de intervalos por consulta (ex.: 30 dias por minuto = 43200)
+MAX_TIMESERIES_BUCKETS = 50000
+
+# Linhas por INSERT ... ON CONFLICT (limite de parâmetros do SQLite)
+ROLLUP_UPSERT_CHUNK = 500
+
+# (granularity, bucket_start, partition)
+RollupKey = Tuple[str, datetime, str]
+
+
+def bucket_start(moment: datetime, granularity: Granularity) -> datetime:
+    """Trunca a data para o início do intervalo da granularidade"""
+    if granularity == Granularity.MINUTE:
+        return moment.replace(second=0, microsecond=0)
+    if granularity == Granularity.HOUR:
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_to_buckets(
+    deltas: Dict[RollupKey, Counter],
+    moment: datetime,
+    partition: str,
+    column: str,
+    amount: int
+) -> None:
+    for granularity in Granularity:
+        deltas[(granularity.value, bucket_start(moment, granularity), partition)][column] += amount
+
+
+def _expand_minutes(by_minute: Dict[Tuple[datetime, str], Counter]) -> Dict[RollupKey, Counter]:
+    """Expande contagens por (minuto, partição) para minuto, hora e dia"""
+    deltas: Dict[RollupKey, Counter] = defaultdict(Counter)
+    for (minute, partition), counter in by_minute.items():
+        for column, amount in counter.items():
+            _add_to_buckets(deltas, minute, partition, column, amount)
+    return deltas
+
+
+def pieces_rollup_delta(pieces: Iterable[Piece], sign: int = 1) -> Dict[RollupKey, Counter]:
+    """
+    Calcula o delta das contagens por intervalo para peças cadastradas ou removidas.
+    
+    Args:
+        pieces: Peças cadastradas (sign=1) ou removidas (sign=-1)
+        sign: 1 para cadastro, -1 para remoção
+        
+    Returns:
+        Dicionário (granularity, bucket_start, partition) -> Counter coluna -> delta
+    """
+    # Agrupa por minuto antes de expandir para hora/dia: um lote gera poucas linhas
+    by_minute: Dict[Tuple[datetime, str], Counter] = defaultdict(Counter)
+    for piece in pieces:
+        counter = by_minute[(bucket_start(piece.created_at, Granularity.MINUTE), piece_partition(piece))]
+        if piece.status == PieceStatus.APPROVED:
+            counter["aprovadas"] += sign
+        else:
+            counter["reprovadas"] += sign
+            for bit, column in ROLLUP_REASON_COLUMNS.items():
+                if piece.rejection_mask & bit:
+                    counter[column] += sign
+    return _expand_minutes(by_minute)
+
+
+def apply_rollup_delta(session: Session, deltas: Dict[RollupKey, Counter]) -> None:
+    """
+    Soma os deltas às linhas de ProductionRollup, criando as que faltarem.
+    
+    Usa INSERT ... ON CONFLICT DO UPDATE (SQLite e PostgreSQL) na transação
+    do chamador; o commit fica a cargo de quem chamou. As linhas são por
+    partição, então transações de partições diferentes não disputam as
+    linhas do mesmo intervalo.
+    
+    Args:
+        session: Sessão do banco de dados
+        deltas: (granularity, bucket_start, partition) -> coluna -> valor a somar
+    """
+    rows = []
+    # Em ordem de chave: transações concorrentes travam as linhas na mesma ordem
+    for (granularity, start, partition), counter in sorted(deltas.items(), key=lambda item: item[0]):
+        if not any(counter.values()):
+            continue
+        row = {"granularity": granularity, "bucket_start": start, "partition": partition}
+        row.update({column: counter.get(column, 0) for column in ROLLUP_COLUMNS})
+        rows.append(row)
+    if not rows:
+        return
+    
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        _apply_rollup_rows_orm(session, rows)
+        return
+    
+    table = ProductionRollup.__table__
+    for start in range(0, len(rows), ROLLUP_UPSERT_CHUNK):
+        statement = insert(table).values(rows[start:start + ROLLUP_UPSERT_CHUNK])
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.granularity, table.c.bucket_start, table.c.partition],
+            set_={column: table.c[column] + statement.excluded[column] for column in ROLLUP_COLUMNS}
+        )
+        session.execute(statement)
+
+
+def _apply_rollup_rows_orm(session: Session, rows: List[dict]) -> None:
+    """Alternativa para bancos sem ON CONFLICT: lê e atualiza cada linha"""
+    for row in rows:
+        key = (row["granularity"], row["bucket_start"], row["partition"])
+        rollup = session.get(ProductionRollup, key)
+        if rollup is None:
+            rollup = ProductionRollup(granularity=key[0], bucket_start=key[1], partition=key[2])
+        for column in ROLLUP_COLUMNS:
+            setattr(rollup, column, (getattr(rollup, column) or 0) + row[column])
+        session.add(rollup)
+
+
+def record_pieces_rollup(session: Session, pieces: Iterable[Piece], sign: int = 1) -> None:
+    """Atualiza as contagens por intervalo para peças cadastradas (1) ou removidas (-1)"""
+    apply_rollup_delta(session, pieces_rollup_delta(pieces, sign))
+
+
+def record_box_closures(session: Session, boxes: Iterable[Box], sign: int = 1) -> None:
+    """
+    Atualiza as contagens de caixas fechadas por intervalo.
+    
+    Args:
+        session: Sessão do banco de dados
+        boxes: Caixas fechadas (sign=1) ou prestes a serem reabertas/excluídas
+            (sign=-1), ainda com o closed_at do fechamento
+        sign: 1 para fechamento, -1 para reabertura ou exclusão de caixa fechada
+    """
+    deltas: Dict[RollupKey, Counter] = defaultdict(Counter)
+    for box in boxes:
+        if box.closed_at is not None:
+            _add_to_buckets(deltas, box.closed_at, box.partition, "caixas_fechadas", sign)
+    apply_rollup_delta(session, deltas)
+
+
+def rebuild_production_rollups(session: Session, chunk_size: int = 10000) -> int:
+    """
+    Recalcula todas as contagens por intervalo a partir de peças e caixas (ativas e arquivadas).
+    
+    Lê as tabelas em blocos (yield_per), agregando por minuto e partição em
+    memória. Peças contam na partição da chave configurada (como em
+    piece_partition); caixas, na partição gravada na caixa.
+    
+    Args:
+        session: Sessão do banco de dados
+        chunk_size: Linhas lidas por bloco
+        
+    Returns:
+        Número de linhas de ProductionRollup gravadas
+    """
+    by_minute: Dict[Tuple[datetime, str], Counter] = defaultdict(Counter)
+    key = partition_key()
+    
+    # Dados arquivados (archive_service) continuam contados nos intervalos
+    for piece_model, box_model in ((Piece, Box), (ArchivedPiece, ArchivedBox)):
+        partition_columns = [getattr(piece_model, key)] if key else []
+        pieces_statement = select(
+            piece_model.created_at,
+            piece_model.status,
+            piece_model.rejection_mask,
+            *partition_columns
+        )
+        rows = session.exec(pieces_statement.execution_options(yield_per=chunk_size))
+        for created_at, status, rejection_mask, *partition in rows:
+            partition = partition_value(partition[0]) if partition else DEFAULT_PARTITION
+            counter = by_minute[(bucket_start(created_at, Granularity.MINUTE), partition)]
+            if status == PieceStatus.APPROVED:
+                counter["aprovadas"] += 1
+            else:
+                counter["reprovadas"] += 1
+                for bit, column in ROLLUP_REASON_COLUMNS.items():
+                    if rejection_mask & bit:
+                        counter[column] += 1
+        
+        boxes_statement = select(box_model.closed_at, box_model.partition).where(box_model.closed_at.is_not(None))
+        for closed_at, partition in session.exec(boxes_statement.execution_options(yield_per=chunk_size)):
+            by_minute[(bucket_start(closed_at, Granularity.MINUTE), partition)]["caixas_fechadas"] += 1
+    
+    deltas = _expand_minutes(by_minute)
+    
+    session.execute(delete(ProductionRollup))
+    apply_rollup_delta(session, deltas)
+    session.commit()
+    return len(deltas)
+
+
+def generate_timeseries_report(
+    session: Session,
+    granularity: Granularity,
+    desde: Optional[datetime] = None,
+    ate: Optional[datetime] = None
+) -> TimeseriesResponse:
+    """
+    Gera o relatório de produção por intervalo de tempo.
+    
+    Lê apenas ProductionRollup (uma linha por intervalo e partição com
+    dados, somadas por intervalo), sem varrer a tabela de peças.
+    
+    Args:
+        session: Sessão do banco de dados
+        granularity: minute, hour ou day
+        desde: Início do período (inclusive); padrão depende da granularidade
+        ate: Fim do período (exclusivo); padrão é agora
+        
+    Returns:
+        TimeseriesResponse com um item por intervalo que teve produção
+        
+    Raises:
+        ValueError: Se o período for inválido ou tiver intervalos demais
+    """
+    ate = ate or datetime.utcnow()
+    desde = desde or ate - DEFAULT_WINDOWS[granularity]
+    if desde >= ate:
+        raise ValueError("O início do período deve ser anterior ao fim")
+    if (ate - desde) / BUCKET_SIZES[granularity] > MAX_TIMESERIES_BUCKETS:
+        raise ValueError(
+            f"Período grande demais para a granularidade '{granularity.value}' "
+            f"(máximo de {MAX_TIMESERIES_BUCKETS} intervalos)"
+        )
+    
+    statement = select(
+        ProductionRollup.bucket_start,
+        *[func.sum(getattr(ProductionRollup, column)) for column in ROLLUP_COLUMNS]
+    ).where(
+        ProductionRollup.granularity == granularity.value,
+        ProductionRollup.bucket_start >= bucket_start(desde, granularity),
+        ProductionRollup.bucket_start < ate
+    ).group_by(ProductionRollup.bucket_start).order_by(ProductionRollup.bucket_start)
+    
+    buckets: List[TimeseriesBucket] = []
+    for bucket, *values in session.exec(statement).all():
+        counts = dict(zip(ROLLUP_COLUMNS, values))
+        if not any(counts.values()):
+            continue
+        motivo_contagem = [
+            RejectionReasonCount(motivo=motivo, quantidade=counts[ROLLUP_REASON_COLUMNS[bit]])
+            for bit, motivo in REJECTION_REASONS
+            if counts[ROLLUP_REASON_COLUMNS[bit]]
+        ]
+        buckets.append(TimeseriesBucket(
+            bucket_start=bucket,
+            total_aprovadas=counts["aprovadas"],
+            total_reprovadas=counts["reprovadas"],
+            motivo_contagem=motivo_contagem,
+            caixas_fechadas=counts["caixas_fechadas"]
+        ))
+    
+    return TimeseriesResponse(granularity=granularity, desde=desde, ate=ate, buckets=buckets)
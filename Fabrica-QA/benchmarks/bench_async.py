@@ -0,0 +1,145 @@
+"""
+Benchmark de requisições/s do caminho síncrono vs. assíncrono de banco.
+
+Para cada modo (DATABASE_ASYNC=false e true) sobe um uvicorn com um worker
+sobre um banco populado e dispara N clientes concorrentes durante alguns
+segundos, alternando leituras (listagem de peças, relatório final) e
+cadastros de peças.
+
+Uso:
+    python -m benchmarks.bench_async --clients 500 --seconds 15 \\
+        --database-url sqlite:///./bench_async.db
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+
+def seed_database(database_url: str, pieces: int) -> None:
+    """Recria o banco e cadastra peças iniciais pelo caminho em lote"""
+    if database_url.startswith("sqlite:///"):
+        path = database_url[len("sqlite:///"):]
+        if os.path.exists(path):
+            os.remove(path)
+    
+    os.environ["DATABASE_URL"] = database_url
+    from sqlmodel import Session
+    from app.db.engine import engine
+    from app.db.init_db import prepare_database
+    from app.schemas.piece import PieceCreate
+    from app.services.ingestion_service import ingest_pieces_batch
+    
+    prepare_database()
+    with Session(engine) as session:
+        for start in range(0, pieces, 5000):
+            ingest_pieces_batch(session, [
+                PieceCreate(id=f"SEED-{i}", peso=100.0 if i % 4 else 80.0, cor="azul", comprimento=15.0)
+                for i in range(start, min(start + 5000, pieces))
+            ])
+    # Fecha as conexões: o arquivo SQLite é recriado na próxima rodada
+    engine.dispose()
+
+
+async def wait_ready(base_url: str, timeout: float = 30.0) -> None:
+    """Aguarda o /health responder"""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{base_url}/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Servidor não respondeu ao /health")
+
+
+async def run_load(base_url: str, clients: int, seconds: float, mode: str) -> Dict[str, object]:
+    """Dispara os clientes concorrentes e mede vazão e latência"""
+    latencies: List[float] = []
+    status_codes: Dict[int, int] = {}
+    deadline = time.monotonic() + seconds
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        async def worker(worker_id: int) -> None:
+            i = 0
+            while time.monotonic() < deadline:
+                kind = (worker_id + i) % 4
+                start = time.perf_counter()
+                try:
+                    if kind == 0:
+                        response = await client.post("/api/v1/pieces", json={
+                            "id": f"{mode}-{worker_id}-{i}",
+                            "peso": 100.0,
+                            "cor": "azul",
+                            "comprimento": 15.0
+                        })
+                    elif kind == 1:
+                        response = await client.get("/api/v1/reports/final")
+                    else:
+                        response = await client.get("/api/v1/pieces", params={"limit": 20})
+                    code = response.status_code
+                except httpx.HTTPError:
+                    code = 0
+                latencies.append(time.perf_counter() - start)
+                status_codes[code] = status_codes.get(code, 0) + 1
+                i += 1
+        
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(clients)))
+        elapsed = time.perf_counter() - start
+    
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 1) if latencies else None,
+        "status_codes": status_codes,
+    }
+
+
+def bench_mode(args, database_async: bool) -> Dict[str, object]:
+    """Sobe o servidor no modo pedido e executa a carga"""
+    env = dict(os.environ, DATABASE_URL=args.database_url, DATABASE_ASYNC="true" if database_async else "false")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=env
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    mode = "async" if database_async else "sync"
+    try:
+        asyncio.run(wait_ready(base_url))
+        return asyncio.run(run_load(base_url, args.clients, args.seconds, mode))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=500, help="Clientes concorrentes")
+    parser.add_argument("--seconds", type=float, default=15.0, help="Duração de cada rodada")
+    parser.add_argument("--seed-pieces", type=int, default=20000, help="Peças cadastradas antes da carga")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--database-url", default="sqlite:///./bench_async.db")
+    args = parser.parse_args()
+    
+    report = {"clients": args.clients, "seconds": args.seconds}
+    for database_async in (False, True):
+        seed_database(args.database_url, args.seed_pieces)
+        report["async" if database_async else "sync"] = bench_mode(args, database_async)
+    
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
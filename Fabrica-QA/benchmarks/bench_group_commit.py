@@ -0,0 +1,146 @@
+"""
+Benchmark de cadastros unitários concorrentes com e sem group commit.
+
+Para cada modo (GROUP_COMMIT=false e true) sobe um uvicorn sobre um banco
+novo e dispara N clientes fazendo POST /api/v1/pieces durante alguns
+segundos. O número de transações de escrita (commits, e portanto fsyncs)
+é medido pelo contador data_generation, incrementado uma vez por commit.
+
+Uso:
+    python -m benchmarks.bench_group_commit --clients 200 --seconds 10 \\
+        --database-url sqlite:///./bench_group_commit.db
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.bench_async import wait_ready
+
+
+def reset_database(database_url: str) -> None:
+    """Recria o banco vazio"""
+    if database_url.startswith("sqlite:///"):
+        path = database_url[len("sqlite:///"):]
+        if os.path.exists(path):
+            os.remove(path)
+    
+    os.environ["DATABASE_URL"] = database_url
+    from app.db.engine import engine
+    from app.db.init_db import prepare_database
+    
+    prepare_database()
+    engine.dispose()
+
+
+def read_generation(database_url: str) -> int:
+    """Lê o contador de transações de escrita"""
+    os.environ["DATABASE_URL"] = database_url
+    from sqlmodel import Session
+    from app.db.engine import engine
+    from app.services.generation_service import current_generation
+    
+    with Session(engine) as session:
+        _, generation = current_generation(session)
+    engine.dispose()
+    return generation
+
+
+async def run_load(base_url: str, clients: int, seconds: float, mode: str) -> Dict[str, object]:
+    """Dispara os clientes concorrentes cadastrando peças"""
+    latencies: List[float] = []
+    status_codes: Dict[int, int] = {}
+    deadline = time.monotonic() + seconds
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        async def worker(worker_id: int) -> None:
+            i = 0
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/api/v1/pieces", json={
+                        "id": f"{mode}-{worker_id}-{i}",
+                        "peso": 100.0 if i % 5 else 80.0,
+                        "cor": "azul",
+                        "comprimento": 15.0
+                    })
+                    code = response.status_code
+                except httpx.HTTPError:
+                    code = 0
+                latencies.append(time.perf_counter() - start)
+                status_codes[code] = status_codes.get(code, 0) + 1
+                i += 1
+        
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(clients)))
+        elapsed = time.perf_counter() - start
+    
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 1) if latencies else None,
+        "status_codes": status_codes,
+    }
+
+
+def bench_mode(args, group_commit: bool) -> Dict[str, object]:
+    """Sobe o servidor no modo pedido, executa a carga e conta os commits"""
+    import subprocess
+    import sys
+    
+    reset_database(args.database_url)
+    generation_before = read_generation(args.database_url)
+    
+    env = dict(
+        os.environ,
+        DATABASE_URL=args.database_url,
+        GROUP_COMMIT="true" if group_commit else "false",
+        GROUP_COMMIT_WINDOW_MS=str(args.window_ms),
+        GROUP_COMMIT_MAX_PIECES=str(args.max_pieces),
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=env
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    mode = "group" if group_commit else "single"
+    try:
+        asyncio.run(wait_ready(base_url))
+        result = asyncio.run(run_load(base_url, args.clients, args.seconds, mode))
+    finally:
+        server.terminate()
+        server.wait()
+    
+    commits = read_generation(args.database_url) - generation_before
+    created = result["status_codes"].get(201, 0)
+    result["commits"] = commits
+    result["pieces_per_commit"] = round(created / commits, 1) if commits else None
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200, help="Clientes concorrentes")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duração de cada rodada")
+    parser.add_argument("--window-ms", type=float, default=2.0, help="GROUP_COMMIT_WINDOW_MS")
+    parser.add_argument("--max-pieces", type=int, default=64, help="GROUP_COMMIT_MAX_PIECES")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--database-url", default="sqlite:///./bench_group_commit.db")
+    args = parser.parse_args()
+    
+    report = {"clients": args.clients, "seconds": args.seconds}
+    for group_commit in (False, True):
+        report["group_commit" if group_commit else "single_commit"] = bench_mode(args, group_commit)
+    
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Micro-benchmark do avaliador de qualidade.
+
+Compara evaluate_piece (uma peça por vez) com evaluate_pieces (vetorizado)
+sobre dados aleatórios que cobrem os limites de cada critério. O tempo
+escalar mede apenas as chamadas a evaluate_piece; a equivalência entre os
+dois caminhos é verificada em tests/test_quality_service.py.
+
+Uso:
+    python -m benchmarks.bench_quality --n 1000000 --scalar-n 100000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.models.enums import Color, PieceStatus
+from app.schemas.piece import PieceCreate
+from app.services.quality_service import (
+    PESO_MIN,
+    PESO_MAX,
+    COMPRIMENTO_MIN,
+    COMPRIMENTO_MAX,
+    evaluate_piece,
+    evaluate_pieces,
+)
+
+
+def generate_data(n: int, seed: int):
+    """Gera pesos, comprimentos e cores, incluindo valores exatamente nos limites"""
+    rng = np.random.default_rng(seed)
+    pesos = rng.uniform(PESO_MIN - 10, PESO_MAX + 10, n)
+    comprimentos = rng.uniform(COMPRIMENTO_MIN - 5, COMPRIMENTO_MAX + 5, n)
+
+    # Força alguns valores de borda (limites são inclusivos)
+    bordas_peso = np.array([PESO_MIN, PESO_MAX, np.nextafter(PESO_MIN, 0), np.nextafter(PESO_MAX, np.inf)])
+    bordas_comprimento = np.array([COMPRIMENTO_MIN, COMPRIMENTO_MAX,
+                                   np.nextafter(COMPRIMENTO_MIN, 0), np.nextafter(COMPRIMENTO_MAX, np.inf)])
+    k = min(n, len(bordas_peso))
+    pesos[:k] = bordas_peso[:k]
+    comprimentos[:k] = bordas_comprimento[:k]
+
+    cores = rng.choice(np.array([Color.AZUL.value, Color.VERDE.value, "vermelho"]), n)
+    return pesos, comprimentos, cores
+
+
+def build_pieces(pesos, comprimentos, cores):
+    """Monta as peças do teste escalar (fora da medição)"""
+    # model_construct evita a validação para permitir cores inválidas
+    return [
+        PieceCreate.model_construct(
+            id=f"B{i}",
+            peso=float(pesos[i]),
+            comprimento=float(comprimentos[i]),
+            cor=str(cores[i])
+        )
+        for i in range(len(pesos))
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=1_000_000, help="Peças no teste vetorizado")
+    parser.add_argument("--scalar-n", type=int, default=100_000, help="Peças no teste escalar")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    pesos, comprimentos, cores = generate_data(args.n, args.seed)
+
+    start = time.perf_counter()
+    result = evaluate_pieces(pesos, comprimentos, cores)
+    vector_seconds = time.perf_counter() - start
+
+    m = min(args.scalar_n, args.n)
+    pieces = build_pieces(pesos[:m], comprimentos[:m], cores[:m])
+    start = time.perf_counter()
+    for piece in pieces:
+        evaluate_piece(piece)
+    scalar_seconds = time.perf_counter() - start
+
+    report = {
+        "vectorized": {"pieces": args.n, "seconds": round(vector_seconds, 4),
+                       "pieces_per_second": round(args.n / vector_seconds)},
+        "scalar": {"pieces": m, "seconds": round(scalar_seconds, 4),
+                   "pieces_per_second": round(m / scalar_seconds)},
+        "speedup": round((args.n / vector_seconds) / (m / scalar_seconds), 1),
+        "approved": int((result["status"] == PieceStatus.APPROVED).sum()),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Perfil SQLite (WAL, PRAGMAs e lock de escrita) vs. padrões anteriores.
+
+Para cada perfil, recria o banco, cadastra --seed-pieces peças em lote e
+então, por --seconds segundos, executa ao mesmo tempo em --processes
+processos:
+- --writers threads cadastrando peças uma a uma (ingest_piece, o mesmo
+  caminho de POST /api/v1/pieces)
+- --readers threads lendo como o dashboard: página de peças, página de
+  caixas e relatório final
+
+Perfis:
+- legacy: journal DELETE, synchronous FULL, sem PRAGMAs de cache/mmap e
+  sem lock de escrita (configuração antes do perfil SQLite)
+- tuned: padrões atuais de Settings (WAL, synchronous NORMAL,
+  busy_timeout, mmap, cache, temp_store em memória e lock de escrita)
+
+Imprime um JSON com cadastros/s, leituras/s, latências p50/p95 e erros
+(ex.: "database is locked") de cada perfil.
+
+Uso:
+    python -m benchmarks.bench_sqlite --processes 2 --writers 8 --readers 8 \\
+        --seconds 10 --database-url sqlite:///./bench_sqlite.db
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.bench_api import percentile
+
+PROFILES: Dict[str, Dict[str, str]] = {
+    "legacy": {
+        "SQLITE_JOURNAL_MODE": "DELETE",
+        "SQLITE_SYNCHRONOUS": "FULL",
+        "SQLITE_BUSY_TIMEOUT_MS": "0",
+        "SQLITE_MMAP_SIZE": "0",
+        "SQLITE_CACHE_SIZE_KB": "0",
+        "SQLITE_TEMP_STORE": "",
+        "SQLITE_WRITER_LOCK": "false",
+    },
+    "tuned": {},
+}
+
+# Peças por lote na carga inicial
+SEED_BATCH_SIZE = 5000
+
+
+def _apply_profile(database_url: str, profile: str) -> None:
+    """Configura o ambiente antes de importar a aplicação (Settings lê o ambiente)"""
+    os.environ["DATABASE_URL"] = database_url
+    for name in PROFILES["legacy"]:
+        os.environ.pop(name, None)
+    os.environ.update(PROFILES[profile])
+
+
+def _seed(args) -> None:
+    """Recria o banco e cadastra as peças iniciais"""
+    database_url, profile, pieces = args
+    _apply_profile(database_url, profile)
+    from sqlmodel import Session
+    from app.db.engine import engine
+    from app.db.init_db import prepare_database
+    from app.schemas.piece import PieceCreate
+    from app.services.ingestion_service import ingest_pieces_batch
+    
+    prepare_database()
+    for start in range(0, pieces, SEED_BATCH_SIZE):
+        batch = [
+            PieceCreate(id=f"seed-{i}", peso=100.0 if i % 10 else 50.0, cor="azul", comprimento=15.0)
+            for i in range(start, min(start + SEED_BATCH_SIZE, pieces))
+        ]
+        with Session(engine) as session:
+            ingest_pieces_batch(session, batch)
+
+
+def _run_process(args) -> Dict[str, object]:
+    """Executa as threads de escrita e leitura de um processo até o prazo"""
+    database_url, profile, process_index, writers, readers, start_at, seconds = args
+    _apply_profile(database_url, profile)
+    from sqlmodel import Session
+    from app.api.v1.boxes import _list_boxes
+    from app.api.v1.pieces import _list_pieces
+    from app.db.engine import engine
+    from app.schemas.piece import PieceCreate
+    from app.services.ingestion_service import ingest_piece
+    from app.services.report_service import generate_final_report
+    
+    deadline = start_at + seconds
+    lock = threading.Lock()
+    write_latencies: List[float] = []
+    read_latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    
+    def record(latencies: List[float], elapsed: float, error: Optional[str]) -> None:
+        with lock:
+            if error is None:
+                latencies.append(elapsed)
+            else:
+                errors[error] = errors.get(error, 0) + 1
+    
+    def writer(thread_index: int) -> None:
+        sequence = 0
+        while time.time() < deadline:
+            piece = PieceCreate(
+                id=f"w{process_index}-{thread_index}-{sequence}",
+                peso=100.0, cor="verde", comprimento=15.0
+            )
+            sequence += 1
+            start = time.perf_counter()
+            error = None
+            try:
+                with Session(engine) as session:
+                    ingest_piece(session, piece)
+            except Exception as e:
+                error = f"{type(e).__name__}: {str(e).splitlines()[0][:80]}"
+            record(write_latencies, time.perf_counter() - start, error)
+    
+    def reader(thread_index: int) -> None:
+        operations = [
+            lambda session: _list_pieces(session, None, None, False, 50, 0, None, "none"),
+            lambda session: _list_boxes(session, None, 50, None),
+            lambda session: generate_final_report(session),
+        ]
+        sequence = thread_index
+        while time.time() < deadline:
+            operation = operations[sequence % len(operations)]
+            sequence += 1
+            start = time.perf_counter()
+            error = None
+            try:
+                with Session(engine) as session:
+                    operation(session)
+            except Exception as e:
+                error = f"{type(e).__name__}: {str(e).splitlines()[0][:80]}"
+            record(read_latencies, time.perf_counter() - start, error)
+    
+    time.sleep(max(start_at - time.time(), 0))
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    return {"writes": write_latencies, "reads": read_latencies, "errors": errors}
+
+
+def summarize(latencies: List[float], seconds: float) -> Dict[str, object]:
+    latencies = sorted(latencies)
+    p50, p95 = percentile(latencies, 0.50), percentile(latencies, 0.95)
+    return {
+        "count": len(latencies),
+        "per_second": round(len(latencies) / seconds, 1),
+        "p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+        "p95_ms": round(p95 * 1000, 2) if p95 is not None else None,
+    }
+
+
+def bench_profile(args, profile: str) -> Dict[str, object]:
+    """Recria o banco e mede um perfil"""
+    if args.database_url.startswith("sqlite:///"):
+        path = args.database_url[len("sqlite:///"):]
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        pool.map(_seed, [(args.database_url, profile, args.seed_pieces)])
+    
+    # Os processos começam juntos, depois de importar a aplicação
+    start_at = time.time() + 3.0
+    work = [
+        (args.database_url, profile, index, args.writers, args.readers, start_at, args.seconds)
+        for index in range(args.processes)
+    ]
+    with context.Pool(args.processes) as pool:
+        results = pool.map(_run_process, work)
+    
+    writes = [latency for result in results for latency in result["writes"]]
+    reads = [latency for result in results for latency in result["reads"]]
+    errors: Dict[str, int] = {}
+    for result in results:
+        for error, count in result["errors"].items():
+            errors[error] = errors.get(error, 0) + count
+    
+    return {
+        "writes": summarize(writes, args.seconds),
+        "reads": summarize(reads, args.seconds),
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--writers", type=int, default=8, help="Threads de cadastro por processo")
+    parser.add_argument("--readers", type=int, default=8, help="Threads de leitura por processo")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--seed-pieces", type=int, default=20000, help="Peças cadastradas antes da medição")
+    parser.add_argument("--profiles", default="legacy,tuned", help="Perfis separados por vírgula")
+    parser.add_argument("--database-url", default="sqlite:///./bench_sqlite.db")
+    args = parser.parse_args()
+    
+    if not args.database_url.startswith("sqlite"):
+        raise SystemExit("bench_sqlite mede apenas SQLite")
+    
+    report = {
+        "processes": args.processes,
+        "writers_per_process": args.writers,
+        "readers_per_process": args.readers,
+        "seconds": args.seconds,
+        "seed_pieces": args.seed_pieces,
+        "profiles": {
+            profile: bench_profile(args, profile)
+            for profile in args.profiles.split(",")
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark do tempo de startup até a primeira requisição.
+
+Sobe um uvicorn (um worker) e mede, a partir do Popen, quanto tempo leva
+até o /health responder (processo no ar), até o /ready responder 200
+(migrações aplicadas e pool aquecido) e até a primeira requisição real
+(GET /api/v1/reports/final) responder. Três cenários:
+
+- fresh: banco vazio (migração 1 cria o schema completo)
+- upgrade: banco populado de uma versão anterior ao versionamento
+  (sem schema_version e sem os índices da migração 2)
+- current: banco populado com o schema em dia (apenas lê a versão)
+
+Uso:
+    python -m benchmarks.bench_startup --runs 5 --seed-pieces 50000 \\
+        --database-url sqlite:///./bench_startup.db
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+# Índices criados pela migração 2; removidos no cenário "upgrade"
+MIGRATION_2_INDEXES = ("ix_piece_status", "ix_piece_box_id_created_at", "ix_box_status_opened_at")
+
+
+def remove_database(database_url: str) -> None:
+    """Apaga o arquivo SQLite (e os arquivos do WAL)"""
+    if database_url.startswith("sqlite:///"):
+        path = database_url[len("sqlite:///"):]
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def seed_database(database_url: str, pieces: int) -> None:
+    """Recria o banco e cadastra peças iniciais pelo caminho em lote"""
+    remove_database(database_url)
+    
+    os.environ["DATABASE_URL"] = database_url
+    from sqlmodel import Session
+    from app.db.engine import engine
+    from app.db.init_db import prepare_database
+    from app.schemas.piece import PieceCreate
+    from app.services.ingestion_service import ingest_pieces_batch
+    
+    prepare_database()
+    with Session(engine) as session:
+        for start in range(0, pieces, 5000):
+            ingest_pieces_batch(session, [
+                PieceCreate(id=f"SEED-{i}", peso=100.0 if i % 4 else 80.0, cor="azul", comprimento=15.0)
+                for i in range(start, min(start + 5000, pieces))
+            ])
+    engine.dispose()
+
+
+def downgrade_database() -> None:
+    """Deixa o banco como uma versão anterior ao versionamento de schema"""
+    from sqlalchemy import text
+    from app.db.engine import engine
+    
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS schema_version"))
+        for name in MIGRATION_2_INDEXES:
+            connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    engine.dispose()
+
+
+def wait_for(client: httpx.Client, path: str, deadline: float) -> None:
+    """Repete a requisição até responder 200"""
+    while time.monotonic() < deadline:
+        try:
+            if client.get(path).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    raise RuntimeError(f"Servidor não respondeu 200 em {path}")
+
+
+def measure_startup(args) -> Dict[str, float]:
+    """Sobe o servidor e mede os tempos até /health, /ready e a primeira requisição"""
+    env = dict(os.environ, DATABASE_URL=args.database_url)
+    start = time.monotonic()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=env
+    )
+    deadline = start + args.timeout
+    timings = {}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.port}", timeout=args.timeout) as client:
+            wait_for(client, "/health", deadline)
+            timings["health_ms"] = (time.monotonic() - start) * 1000
+            wait_for(client, "/ready", deadline)
+            timings["ready_ms"] = (time.monotonic() - start) * 1000
+            wait_for(client, "/api/v1/reports/final", deadline)
+            timings["first_request_ms"] = (time.monotonic() - start) * 1000
+    finally:
+        server.terminate()
+        server.wait()
+    return timings
+
+
+def summarize(runs: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    return {
+        key: {
+            "median": round(statistics.median(run[key] for run in runs), 1),
+            "max": round(max(run[key] for run in runs), 1),
+        }
+        for key in runs[0]
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Startups medidos por cenário")
+    parser.add_argument("--seed-pieces", type=int, default=50000, help="Peças cadastradas nos cenários upgrade e current")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Tempo máximo de cada startup")
+    parser.add_argument("--database-url", default="sqlite:///./bench_startup.db")
+    args = parser.parse_args()
+    
+    report = {"runs": args.runs, "seed_pieces": args.seed_pieces}
+    
+    fresh = []
+    for _ in range(args.runs):
+        remove_database(args.database_url)
+        fresh.append(measure_startup(args))
+    report["fresh"] = summarize(fresh)
+    
+    seed_database(args.database_url, args.seed_pieces)
+    upgrade = []
+    for _ in range(args.runs):
+        downgrade_database()
+        upgrade.append(measure_startup(args))
+    report["upgrade"] = summarize(upgrade)
+    
+    report["current"] = summarize([measure_startup(args) for _ in range(args.runs)])
+    
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
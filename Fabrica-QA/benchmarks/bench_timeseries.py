@@ -0,0 +1,97 @@
+"""
+Benchmark do relatório por intervalo (/api/v1/reports/timeseries).
+
+Popula production_rollup com contagens sintéticas equivalentes a
+--pieces-per-minute peças por minuto durante --days dias (sem criar as
+peças: a consulta lê apenas as contagens, então o tempo não depende do
+tamanho da tabela de peças) e mede generate_timeseries_report.
+
+Uso:
+    python -m benchmarks.bench_timeseries --days 30 --pieces-per-minute 1200 \\
+        --database-url sqlite:///./bench_timeseries.db
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--pieces-per-minute", type=int, default=1200, help="1200/min por 30 dias ~ 52M peças")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database-url", default="sqlite:///./bench_timeseries.db")
+    args = parser.parse_args()
+    
+    if args.database_url.startswith("sqlite:///"):
+        path = args.database_url[len("sqlite:///"):]
+        if os.path.exists(path):
+            os.remove(path)
+    
+    os.environ["DATABASE_URL"] = args.database_url
+    from sqlmodel import Session
+    from app.db.engine import engine
+    from app.db.init_db import prepare_database
+    from app.models.enums import Granularity
+    from app.services.partition_service import DEFAULT_PARTITION
+    from app.services.timeseries_service import apply_rollup_delta, bucket_start, generate_timeseries_report
+    
+    prepare_database()
+    
+    ate = bucket_start(datetime.utcnow(), Granularity.DAY)
+    desde = ate - timedelta(days=args.days)
+    rejected = args.pieces_per_minute // 20
+    
+    start = time.perf_counter()
+    with Session(engine) as session:
+        minute = desde
+        while minute < ate:
+            # Um dia por vez: minutos, horas e o dia
+            deltas = {}
+            for offset in range(24 * 60):
+                moment = minute + timedelta(minutes=offset)
+                counter = Counter(
+                    aprovadas=args.pieces_per_minute - rejected,
+                    reprovadas=rejected,
+                    motivo_peso=rejected,
+                    caixas_fechadas=(args.pieces_per_minute - rejected) // 10
+                )
+                for granularity in Granularity:
+                    key = (granularity.value, bucket_start(moment, granularity), DEFAULT_PARTITION)
+                    deltas[key] = deltas.get(key, Counter()) + counter
+            apply_rollup_delta(session, deltas)
+            session.commit()
+            minute += timedelta(days=1)
+    seed_seconds = time.perf_counter() - start
+    
+    results = {}
+    for name, granularity, period in (
+        ("hourly_30d", Granularity.HOUR, timedelta(days=min(args.days, 30))),
+        ("minute_1d", Granularity.MINUTE, timedelta(days=1)),
+        ("daily_all", Granularity.DAY, timedelta(days=args.days)),
+    ):
+        timings = []
+        with Session(engine) as session:
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                report = generate_timeseries_report(session, granularity, ate - period, ate)
+                timings.append(time.perf_counter() - t0)
+        timings.sort()
+        results[name] = {
+            "buckets": len(report.buckets),
+            "median_ms": round(timings[len(timings) // 2] * 1000, 2),
+            "max_ms": round(timings[-1] * 1000, 2),
+        }
+    
+    print(json.dumps({
+        "simulated_pieces": args.pieces_per_minute * 24 * 60 * args.days,
+        "seed_seconds": round(seed_seconds, 2),
+        "queries": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Teste de estresse do alocador de caixas com vários processos e threads.
+
+Dispara cadastros concorrentes de peças aprovadas (ingest_piece, o mesmo
+caminho de POST /api/v1/pieces) a partir de vários processos, cada um com
+várias threads e sessões próprias, contra o mesmo banco. As peças alternam
+entre azul e verde (uma partição cada com BOX_PARTITION_BY=cor). Ao final
+confere que:
+- existe no máximo uma caixa aberta por partição
+- toda caixa fechada tem exatamente a capacidade da sua partição
+- box.piece_count e os agregados do relatório batem com os dados brutos
+- todos os cadastros foram gravados (nenhum erro, como "database is locked")
+
+O banco é preparado e verificado dentro dos processos do pool, então
+run_stress pode ser chamado de um processo que já usa outro banco (testes).
+
+Uso:
+    python -m benchmarks.stress_allocation --pieces 5000 --processes 4 --threads 8 \\
+        --database-url sqlite:///./stress.db --reset
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+
+def _ingest_pieces(piece_ids: List[str]) -> Dict[str, int]:
+    """Cadastra as peças em sequência com uma sessão própria, contando os resultados"""
+    from sqlmodel import Session
+    from app.db.engine import engine
+    from app.schemas.piece import PieceCreate
+    from app.services.ingestion_service import ingest_piece
+    
+    results: Dict[str, int] = {}
+    for piece_id in piece_ids:
+        cor = "azul" if int(piece_id.rsplit("-", 1)[1]) % 2 == 0 else "verde"
+        piece_data = PieceCreate(id=piece_id, peso=100.0, cor=cor, comprimento=15.0)
+        try:
+            with Session(engine) as session:
+                outcome = "created" if ingest_piece(session, piece_data) else "duplicate"
+        except Exception as e:
+            # Primeira linha da mensagem (sem o SQL anexado pelo SQLAlchemy)
+            outcome = f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+        results[outcome] = results.get(outcome, 0) + 1
+    return results
+
+
+def _run_process(args) -> Dict[str, int]:
+    """Executa as threads de um processo e soma os resultados"""
+    database_url, piece_ids, threads = args
+    os.environ["DATABASE_URL"] = database_url
+    
+    chunks = [piece_ids[i::threads] for i in range(threads)]
+    totals: Dict[str, int] = {}
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for results in executor.map(_ingest_pieces, chunks):
+            for outcome, count in results.items():
+                totals[outcome] = totals.get(outcome, 0) + count
+    return totals
+
+
+def _prepare(database_url: str) -> None:
+    """Cria as tabelas antes dos cadastros"""
+    os.environ["DATABASE_URL"] = database_url
+    from app.db.init_db import prepare_database
+    prepare_database()
+
+
+def remove_database(database_url: str) -> None:
+    """Apaga o arquivo SQLite (e os arquivos do WAL)"""
+    if database_url.startswith("sqlite:///"):
+        path = database_url[len("sqlite:///"):]
+        for suffix in ("", "-wal", "-shm", "-lock"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def verify(database_url: str) -> Dict[str, object]:
+    """Confere as invariantes de caixas e agregados após o estresse"""
+    os.environ["DATABASE_URL"] = database_url
+    from sqlmodel import Session, select
+    from app.db.engine import engine
+    from app.models.box import Box
+    from app.models.enums import BoxStatus
+    from app.models.production_stats import ProductionStats
+    from app.services.boxing_service import verify_box_piece_counts
+    from app.services.partition_service import box_capacity
+    from app.services.report_service import STATS_COLUMNS, compute_partition_stats
+    
+    with Session(engine) as session:
+        boxes = session.exec(select(Box)).all()
+        open_partitions = [b.partition for b in boxes if b.status == BoxStatus.OPEN]
+        bad_closed = [
+            b.id for b in boxes
+            if b.status == BoxStatus.CLOSED and b.piece_count != box_capacity(b.partition)
+        ]
+        drifts = verify_box_piece_counts(session)
+        stored = {
+            stats.partition: {column: getattr(stats, column) for column in STATS_COLUMNS}
+            for stats in session.exec(select(ProductionStats)).all()
+        }
+        actual = compute_partition_stats(session)
+        zeros = {column: 0 for column in STATS_COLUMNS}
+        stats_ok = bool(stored) and all(
+            stored.get(partition, zeros) == actual.get(partition, zeros)
+            for partition in set(stored) | set(actual)
+        )
+    
+    return {
+        "boxes": len(boxes),
+        "open_boxes": len(open_partitions),
+        "closed_boxes_not_full": bad_closed,
+        "piece_count_drifts": len(drifts),
+        "report_stats_consistent": stats_ok,
+        "ok": len(open_partitions) == len(set(open_partitions)) and not bad_closed and not drifts and stats_ok,
+    }
+
+
+def run_stress(database_url: str, pieces: int, processes: int, threads: int,
+               prefix: Optional[str] = None) -> Dict[str, object]:
+    """
+    Executa o estresse e confere o resultado.
+    
+    Returns:
+        Relatório com tempos, resultados dos cadastros (outcomes) e a
+        verificação; "ok" só é True se todas as peças foram gravadas e as
+        invariantes valem
+    """
+    prefix = prefix or f"S{int(time.time())}-"
+    piece_ids = [f"{prefix}{i}" for i in range(pieces)]
+    work = [(database_url, piece_ids[i::processes], threads) for i in range(processes)]
+    
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes) as pool:
+        pool.apply(_prepare, (database_url,))
+        start = time.perf_counter()
+        results = pool.map(_run_process, work)
+        elapsed = time.perf_counter() - start
+        verification = pool.apply(verify, (database_url,))
+    
+    outcomes: Dict[str, int] = {}
+    for totals in results:
+        for outcome, count in totals.items():
+            outcomes[outcome] = outcomes.get(outcome, 0) + count
+    
+    all_created = outcomes == {"created": pieces}
+    return {
+        "pieces": pieces,
+        "processes": processes,
+        "threads_per_process": threads,
+        "seconds": round(elapsed, 3),
+        "pieces_per_second": round(pieces / elapsed, 1),
+        "outcomes": outcomes,
+        "verification": verification,
+        "ok": all_created and verification["ok"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pieces", type=int, default=2000, help="Total de peças a cadastrar")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8, help="Threads por processo")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///./stress.db"))
+    parser.add_argument("--reset", action="store_true", help="Apaga o banco SQLite antes de começar")
+    args = parser.parse_args()
+    
+    if args.reset:
+        remove_database(args.database_url)
+    
+    report = run_stress(args.database_url, args.pieces, args.processes, args.threads)
+    print(json.dumps(report, indent=2))
+    
+    if not report["ok"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
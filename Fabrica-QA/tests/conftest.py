@@ -0,0 +1,42 @@
+import os
+import tempfile
+import time
+
+import pytest
+
+# O engine é criado na importação de app.db.engine: o banco dos testes
+# precisa estar definido antes de qualquer import da aplicação
+_database_dir = tempfile.mkdtemp(prefix="fabrica-qa-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_database_dir}/test.db"
+
+
+@pytest.fixture
+def client():
+    """API sobre um banco vazio (tabelas recriadas a cada teste)"""
+    from fastapi.testclient import TestClient
+    from sqlmodel import SQLModel
+    from app.main import app
+    from app.db.engine import engine
+    from app.api.cache import response_cache
+    from app.api.idempotency import recent_pieces
+    
+    SQLModel.metadata.drop_all(engine)
+    response_cache.clear()
+    recent_pieces.clear()
+    with TestClient(app) as test_client:
+        # O banco é preparado em segundo plano após o startup
+        deadline = time.monotonic() + 30
+        while test_client.get("/ready").status_code != 200:
+            assert time.monotonic() < deadline, "banco não ficou pronto"
+            time.sleep(0.01)
+        yield test_client
+
+
+@pytest.fixture
+def session(client):
+    """Sessão no mesmo banco da API"""
+    from sqlmodel import Session
+    from app.db.engine import engine
+    
+    with Session(engine) as db_session:
+        yield db_session
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+from sqlmodel import select
+
+from app.models import ArchivedBox, ArchivedPiece, Box
+from app.models.enums import BoxStatus
+from app.services.archive_service import archive_older_than
+
+
+def piece(piece_id: str) -> dict:
+    return {"id": piece_id, "peso": 100.0, "cor": "azul", "comprimento": 15.0}
+
+
+def archive_closed_boxes(session) -> dict:
+    return archive_older_than(session, datetime.utcnow() + timedelta(seconds=1), 100)
+
+
+def test_box_ids_are_not_reused_after_archiving(client, session):
+    for i in range(21):
+        assert client.post("/api/v1/pieces", json=piece(f"P{i}")).status_code == 201
+    assert client.delete("/api/v1/pieces/P20").status_code == 200
+    assert archive_closed_boxes(session)["boxes"] == 2
+    
+    # Exclui a caixa aberta vazia: com as caixas 1 e 2 arquivadas, a tabela
+    # box fica vazia e o SQLite sem AUTOINCREMENT reutilizaria o ID 1
+    assert client.delete("/api/v1/boxes/3").status_code == 200
+    for i in range(21, 36):
+        assert client.post("/api/v1/pieces", json=piece(f"P{i}")).status_code == 201
+    
+    session.expire_all()
+    live_ids = set(session.exec(select(Box.id)).all())
+    archived_ids = set(session.exec(select(ArchivedBox.id)).all())
+    assert archived_ids == {1, 2}
+    assert not live_ids & archived_ids
+    assert min(live_ids) > 3
+    
+    exported = [line for line in client.get("/api/v1/boxes/export").text.splitlines() if line]
+    assert len(exported) == len(live_ids) + len(archived_ids)
+    
+    # Peças arquivadas continuam na caixa arquivada original
+    archived_piece = session.get(ArchivedPiece, "P0")
+    assert archived_piece.box_id == 1
+    
+    # O arquivamento periódico continua avançando
+    closed = session.exec(select(Box).where(Box.status == BoxStatus.CLOSED)).all()
+    assert closed
+    assert archive_closed_boxes(session)["boxes"] == len(closed)
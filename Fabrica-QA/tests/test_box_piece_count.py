@@ -0,0 +1,79 @@
+from sqlmodel import select
+
+from app.models import Box
+from app.services.boxing_service import verify_box_piece_counts
+
+
+def piece(piece_id: str, approved: bool = True) -> dict:
+    return {"id": piece_id, "peso": 100.0 if approved else 50.0, "cor": "azul", "comprimento": 15.0}
+
+
+def create_pieces(client, ids, approved: bool = True) -> None:
+    for piece_id in ids:
+        assert client.post("/api/v1/pieces", json=piece(piece_id, approved)).status_code == 201
+
+
+def assert_no_drift(session) -> None:
+    session.expire_all()
+    assert verify_box_piece_counts(session) == []
+
+
+def test_create(client, session):
+    create_pieces(client, [f"P{i}" for i in range(25)])
+    create_pieces(client, [f"R{i}" for i in range(5)], approved=False)
+    
+    assert_no_drift(session)
+    counts = [box.piece_count for box in session.exec(select(Box).order_by(Box.id)).all()]
+    assert counts == [10, 10, 5]
+
+
+def test_batch(client, session):
+    create_pieces(client, ["P0", "P1", "P2"])
+    response = client.post("/api/v1/pieces/batch", json={
+        "pieces": [piece(f"B{i}", approved=i % 4 != 0) for i in range(40)] + [piece("P0")]
+    })
+    assert response.status_code == 200
+    assert response.json()["duplicates"] == 1
+    
+    assert_no_drift(session)
+
+
+def test_single_delete(client, session):
+    create_pieces(client, [f"P{i}" for i in range(23)])
+    create_pieces(client, ["R0"], approved=False)
+    
+    # Caixa fechada completada com peças da caixa aberta
+    assert client.delete("/api/v1/pieces/P0").status_code == 200
+    assert_no_drift(session)
+    # Peça da caixa aberta
+    assert client.delete("/api/v1/pieces/P22").status_code == 200
+    assert_no_drift(session)
+    # Peça reprovada (sem caixa)
+    assert client.delete("/api/v1/pieces/R0").status_code == 200
+    assert_no_drift(session)
+    # Esvazia a caixa aberta e remove de uma fechada: sem caixa aberta para completar
+    for piece_id in ("P20", "P21", "P1"):
+        assert client.delete(f"/api/v1/pieces/{piece_id}").status_code == 200
+        assert_no_drift(session)
+
+
+def test_bulk_delete(client, session):
+    create_pieces(client, [f"P{i}" for i in range(47)])
+    create_pieces(client, ["R0", "R1"], approved=False)
+    
+    response = client.request("DELETE", "/api/v1/pieces", json={"ids": ["P0", "P5", "P11", "P12", "P30", "R1"]})
+    assert response.status_code == 200
+    assert response.json()["deleted"] == 6
+    assert_no_drift(session)
+
+
+def test_box_delete(client, session):
+    create_pieces(client, [f"P{i}" for i in range(36)])
+    
+    assert client.delete("/api/v1/boxes/1").status_code == 200
+    assert_no_drift(session)
+    
+    box_ids = [box.id for box in session.exec(select(Box).order_by(Box.id)).all()]
+    response = client.delete("/api/v1/boxes", params={"ids": box_ids[:2]})
+    assert response.status_code == 200
+    assert_no_drift(session)
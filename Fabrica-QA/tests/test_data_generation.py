@@ -0,0 +1,27 @@
+from sqlalchemy import update
+from sqlmodel import Session
+
+from app.api.replica import DATA_VERSION_HEADER, format_data_version
+from app.db.engine import engine
+from app.models.box import Box
+from app.services.generation_service import current_generation
+
+PIECE = {"id": "G1", "peso": 100.0, "cor": "azul", "comprimento": 15.0}
+
+
+def test_write_bumps_version_after_commit(client, session):
+    before = current_generation(session)
+    response = client.post("/api/v1/pieces", json=PIECE)
+    assert response.status_code == 201
+    
+    after = current_generation(session)
+    assert after == (before[0], before[1] + 1)
+    assert response.headers[DATA_VERSION_HEADER] == format_data_version(after)
+
+
+def test_rollback_does_not_bump_version(client, session):
+    before = current_generation(session)
+    with Session(engine) as other:
+        other.execute(update(Box).values(piece_count=Box.piece_count))
+        other.rollback()
+    assert current_generation(session) == before
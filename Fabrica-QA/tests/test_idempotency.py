@@ -0,0 +1,48 @@
+import pytest
+
+from app.core.config import get_settings
+from app.services.deletion_service import delete_pieces
+
+PIECE = {"id": "X1", "peso": 100.0, "cor": "azul", "comprimento": 15.0}
+
+
+def delete_in_other_worker(session) -> None:
+    """Remove a peça sem passar por este processo (o filtro de IDs recentes não fica sabendo)"""
+    delete_pieces(session, piece_ids=[PIECE["id"]])
+    session.commit()
+
+
+@pytest.fixture
+def idempotent_ingest():
+    settings = get_settings()
+    previous = settings.idempotent_ingest
+    settings.idempotent_ingest = True
+    yield
+    settings.idempotent_ingest = previous
+
+
+def test_resend_is_rejected(client):
+    assert client.post("/api/v1/pieces", json=PIECE).status_code == 201
+    assert client.post("/api/v1/pieces", json=PIECE).status_code == 400
+
+
+def test_recreate_after_delete_in_other_worker(client, session):
+    assert client.post("/api/v1/pieces", json=PIECE).status_code == 201
+    delete_in_other_worker(session)
+    assert client.get(f"/api/v1/pieces/{PIECE['id']}").status_code == 404
+    
+    assert client.post("/api/v1/pieces", json=PIECE).status_code == 201
+    assert client.get(f"/api/v1/pieces/{PIECE['id']}").status_code == 200
+
+
+def test_idempotent_resend_returns_stored_piece(client, session, idempotent_ingest):
+    created = client.post("/api/v1/pieces", json=PIECE)
+    assert created.status_code == 201
+    
+    resent = client.post("/api/v1/pieces", json=PIECE)
+    assert resent.status_code == 200
+    assert resent.json()["id"] == PIECE["id"]
+    
+    # Depois de removida por outro worker, o reenvio cadastra a peça de novo
+    delete_in_other_worker(session)
+    assert client.post("/api/v1/pieces", json=PIECE).status_code == 201
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from app.models.enums import Color, PieceStatus
+from app.schemas.piece import PieceCreate
+from app.services.quality_service import (
+    PESO_MIN,
+    PESO_MAX,
+    COMPRIMENTO_MIN,
+    COMPRIMENTO_MAX,
+    REJECTION_REASONS,
+    evaluate_piece,
+    evaluate_pieces,
+    mask_from_reasons,
+    reasons_from_mask,
+)
+
+PESO_OK = (PESO_MIN + PESO_MAX) / 2
+COMPRIMENTO_OK = (COMPRIMENTO_MIN + COMPRIMENTO_MAX) / 2
+
+# (peso, comprimento, cor): limites inclusivos, o primeiro valor representável
+# fora de cada limite, cor inválida e combinações de motivos
+BOUNDARY_CASES = [
+    (PESO_MIN, COMPRIMENTO_OK, "azul"),
+    (PESO_MAX, COMPRIMENTO_OK, "azul"),
+    (np.nextafter(PESO_MIN, 0), COMPRIMENTO_OK, "azul"),
+    (np.nextafter(PESO_MAX, np.inf), COMPRIMENTO_OK, "azul"),
+    (PESO_OK, COMPRIMENTO_MIN, "verde"),
+    (PESO_OK, COMPRIMENTO_MAX, "verde"),
+    (PESO_OK, np.nextafter(COMPRIMENTO_MIN, 0), "verde"),
+    (PESO_OK, np.nextafter(COMPRIMENTO_MAX, np.inf), "verde"),
+    (PESO_OK, COMPRIMENTO_OK, "vermelho"),
+    (PESO_OK, COMPRIMENTO_OK, ""),
+    (np.nextafter(PESO_MIN, 0), np.nextafter(COMPRIMENTO_MAX, np.inf), "vermelho"),
+    (0.0, 0.0, "azul"),
+]
+
+
+def scalar_result(peso: float, comprimento: float, cor: str):
+    """Status e motivos de evaluate_piece (model_construct permite cores inválidas)"""
+    piece = PieceCreate.model_construct(id="T", peso=float(peso), comprimento=float(comprimento), cor=cor)
+    result = evaluate_piece(piece)
+    return result["status"] == PieceStatus.APPROVED, result["rejection_reasons"]
+
+
+def assert_equivalent(pesos, comprimentos, cores) -> None:
+    result = evaluate_pieces(pesos, comprimentos, cores)
+    for i in range(len(pesos)):
+        cor = getattr(cores[i], "value", str(cores[i]))
+        approved, reasons = scalar_result(pesos[i], comprimentos[i], cor)
+        assert (result["status"][i] == PieceStatus.APPROVED) == approved, (pesos[i], comprimentos[i], cor)
+        assert reasons_from_mask(int(result["rejection_mask"][i])) == reasons, (pesos[i], comprimentos[i], cor)
+
+
+@pytest.mark.parametrize("peso, comprimento, cor", BOUNDARY_CASES)
+def test_boundary_case_matches_scalar(peso, comprimento, cor):
+    assert_equivalent([peso], [comprimento], [cor])
+
+
+def test_limits_are_inclusive():
+    result = evaluate_pieces([PESO_MIN, PESO_MAX], [COMPRIMENTO_MIN, COMPRIMENTO_MAX], ["azul", "verde"])
+    assert result["status"].tolist() == [PieceStatus.APPROVED, PieceStatus.APPROVED]
+
+
+def test_random_pieces_match_scalar():
+    rng = np.random.default_rng(42)
+    n = 5000
+    pesos = rng.uniform(PESO_MIN - 10, PESO_MAX + 10, n)
+    comprimentos = rng.uniform(COMPRIMENTO_MIN - 5, COMPRIMENTO_MAX + 5, n)
+    cores = rng.choice(np.array([Color.AZUL.value, Color.VERDE.value, "vermelho"]), n)
+    assert_equivalent(pesos, comprimentos, cores)
+
+
+def test_accepts_color_enums():
+    cores = [Color.AZUL, Color.VERDE, Color.AZUL]
+    assert_equivalent([PESO_OK, PESO_MAX + 1, PESO_OK], [COMPRIMENTO_OK, COMPRIMENTO_OK, COMPRIMENTO_MIN - 1], cores)
+
+
+def test_mask_round_trip():
+    for mask in range(1 << len(REJECTION_REASONS)):
+        assert mask_from_reasons(reasons_from_mask(mask)) == mask
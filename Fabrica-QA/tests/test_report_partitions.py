@@ -0,0 +1,44 @@
+import pytest
+from sqlmodel import select
+
+from app.core.config import get_settings
+from app.models.production_stats import ProductionStats
+from app.services.report_service import compute_partition_stats
+
+
+def piece(piece_id: str, cor: str, peso: float = 100.0) -> dict:
+    return {"id": piece_id, "peso": peso, "cor": cor, "comprimento": 15.0}
+
+
+@pytest.fixture
+def partition_by_cor():
+    settings = get_settings()
+    previous = settings.box_partition_by
+    settings.box_partition_by = "cor"
+    yield
+    settings.box_partition_by = previous
+
+
+def test_stats_are_stored_per_partition(client, session, partition_by_cor):
+    pieces = [piece(f"A{i}", "azul") for i in range(12)] + [piece("A-bad", "azul", peso=200.0)]
+    pieces += [piece(f"V{i}", "verde") for i in range(3)]
+    for payload in pieces:
+        assert client.post("/api/v1/pieces", json=payload).status_code == 201
+    assert client.delete("/api/v1/pieces/V0").status_code == 200
+    
+    stored = {stats.partition: stats for stats in session.exec(select(ProductionStats)).all()}
+    for partition, values in compute_partition_stats(session).items():
+        assert {column: getattr(stored[partition], column) for column in values} == values
+    
+    azul = client.get("/api/v1/reports/final", params={"partition": "azul"}).json()
+    verde = client.get("/api/v1/reports/final", params={"partition": "verde"}).json()
+    assert (azul["total_aprovadas"], azul["total_reprovadas"], azul["total_caixas"]) == (12, 1, 2)
+    assert (verde["total_aprovadas"], verde["total_reprovadas"], verde["total_caixas"]) == (2, 0, 1)
+    
+    total = client.get("/api/v1/reports/final").json()
+    for column in ("total_aprovadas", "total_reprovadas", "total_caixas"):
+        assert total[column] == azul[column] + verde[column]
+
+
+def test_unknown_partition_is_rejected(client, partition_by_cor):
+    assert client.get("/api/v1/reports/final", params={"partition": "roxo"}).status_code == 400
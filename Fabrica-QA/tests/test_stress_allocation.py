@@ -0,0 +1,18 @@
+from benchmarks.stress_allocation import run_stress
+
+
+def test_concurrent_ingestion_across_processes(tmp_path):
+    report = run_stress(f"sqlite:///{tmp_path}/stress.db", pieces=400, processes=2, threads=4)
+    
+    assert report["outcomes"] == {"created": 400}
+    assert report["verification"]["ok"], report["verification"]
+    assert report["ok"]
+
+
+def test_writer_lock_serializes_worker_processes(tmp_path):
+    # Vários processos (como workers do uvicorn) disputando o mesmo arquivo:
+    # o lock de escrita entre processos evita "database is locked"
+    report = run_stress(f"sqlite:///{tmp_path}/stress.db", pieces=800, processes=4, threads=8)
+    
+    assert report["outcomes"] == {"created": 800}
+    assert report["ok"], report["verification"]
@@ -4,6 +4,7 @@ import { LayoutDashboard, Package, PackageOpen, BarChart3, Plus, Menu } from 'lu
 import { Button } from './ui/button';
 import { Sheet, SheetContent, SheetTrigger } from './ui/sheet';
 import { useState } from 'react';
+import { useLiveEvents } from '../hooks/useLiveEvents';
 
 interface LayoutProps {
   children: ReactNode;
@@ -12,6 +13,7 @@ interface LayoutProps {
 const Layout = ({ children }: LayoutProps) => {
   const location = useLocation();
   const [mobileMenuOpen, setMobileMenuOpen] = useState(false);
+  useLiveEvents();
 
   const navItems = [
     { path: '/', label: 'Painel', icon: LayoutDashboard },
@@ -8,7 +8,7 @@ import { Filter } from 'lucide-react';
 
 export const PieceList = () => {
   const [statusFilter, setStatusFilter] = useState<PieceStatus | undefined>(undefined);
-  const { data, isLoading, error } = usePieces(statusFilter);
+  const { data, isLoading, error } = usePieces(statusFilter, 100, 0, true);
 
   if (isLoading) {
     return (
@@ -23,6 +23,9 @@ export const endpoints = {
     final: '/api/v1/reports/final',
   },
   
+  // Eventos em tempo real (Server-Sent Events)
+  events: '/api/v1/events',
+  
   // Geral
   health: '/health',
   root: '/',
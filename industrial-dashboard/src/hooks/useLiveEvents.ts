@@ -0,0 +1,147 @@
+import { useEffect } from 'react';
+import { QueryClient, useQueryClient } from '@tanstack/react-query';
+import { API_BASE_URL, endpoints } from '../constants/endpoints';
+import { REJECTION_REASONS } from '../constants/qualityCriteria';
+import { Box, BoxListResponse, FinalReport, LiveEvent, ReportDeltaData } from '../types';
+import { boxKeys } from './useBoxes';
+import { pieceKeys } from './usePieces';
+import { reportKeys } from './useReports';
+
+// Tipos de evento repassados pelo servidor
+const EVENT_TYPES: LiveEvent['type'][] = [
+  'piece.created',
+  'piece.deleted',
+  'box.opened',
+  'box.closed',
+  'box.reopened',
+  'box.updated',
+  'box.deleted',
+  'pieces.moved',
+  'report.delta',
+  'stream.resync',
+];
+
+// Intervalo mínimo entre recargas das listas de peças (várias peças por segundo)
+const PIECES_REFETCH_DELAY_MS = 1000;
+
+const REASON_COLUMNS: [keyof ReportDeltaData, string][] = [
+  ['motivo_peso', REJECTION_REASONS.PESO_FORA_FAIXA],
+  ['motivo_cor', REJECTION_REASONS.COR_INVALIDA],
+  ['motivo_comprimento', REJECTION_REASONS.COMPRIMENTO_FORA_FAIXA],
+];
+
+// Soma o delta ao relatório final em cache (sem nova requisição)
+const applyReportDelta = (report: FinalReport, delta: ReportDeltaData): FinalReport => {
+  const counts = new Map(report.motivo_contagem.map((item) => [item.motivo, item.quantidade]));
+  for (const [column, motivo] of REASON_COLUMNS) {
+    if (delta[column]) {
+      counts.set(motivo, (counts.get(motivo) ?? 0) + (delta[column] as number));
+    }
+  }
+
+  return {
+    total_aprovadas: report.total_aprovadas + (delta.total_aprovadas ?? 0),
+    total_reprovadas: report.total_reprovadas + (delta.total_reprovadas ?? 0),
+    total_caixas: report.total_caixas + (delta.total_caixas ?? 0),
+    // Mantém a ordem dos critérios e apenas os motivos que ocorreram
+    motivo_contagem: REASON_COLUMNS
+      .map(([, motivo]) => ({ motivo, quantidade: counts.get(motivo) ?? 0 }))
+      .filter((item) => item.quantidade > 0),
+  };
+};
+
+// Atualiza a caixa em todas as listas em cache; false se ela não estava em nenhuma
+const patchBoxLists = (queryClient: QueryClient, box: Box | { id: number }, remove = false): boolean => {
+  let found = false;
+  queryClient.setQueriesData<BoxListResponse>({ queryKey: boxKeys.lists() }, (list) => {
+    if (!list || !list.items.some((item) => item.id === box.id)) {
+      return list;
+    }
+    found = true;
+    return {
+      ...list,
+      items: remove
+        ? list.items.filter((item) => item.id !== box.id)
+        : list.items.map((item) => (item.id === box.id ? { ...item, ...box } : item)),
+      total: remove && list.total !== null ? list.total - 1 : list.total,
+    };
+  });
+  return found;
+};
+
+/**
+ * Mantém os dados do painel atualizados com os eventos de /api/v1/events.
+ *
+ * - report.delta: soma o delta ao relatório final em cache
+ * - box.*: atualiza a caixa nas listas em cache (recarrega se a caixa é nova)
+ * - piece.* e pieces.moved: recarrega as listas de peças (no máximo 1x por segundo)
+ * - stream.resync: eventos foram descartados no servidor; recarrega tudo
+ */
+export const useLiveEvents = () => {
+  const queryClient = useQueryClient();
+
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') {
+      return;
+    }
+
+    const source = new EventSource(`${API_BASE_URL}${endpoints.events}`);
+    let piecesTimer: ReturnType<typeof setTimeout> | null = null;
+
+    const refetchPieces = () => {
+      if (piecesTimer) {
+        return;
+      }
+      piecesTimer = setTimeout(() => {
+        piecesTimer = null;
+        queryClient.invalidateQueries({ queryKey: pieceKeys.lists() });
+      }, PIECES_REFETCH_DELAY_MS);
+    };
+
+    const handleEvent = (message: MessageEvent<string>) => {
+      const event = JSON.parse(message.data) as LiveEvent;
+
+      switch (event.type) {
+        case 'report.delta':
+          queryClient.setQueryData<FinalReport>(reportKeys.final(), (report) =>
+            report ? applyReportDelta(report, event.data) : report
+          );
+          break;
+        case 'box.opened':
+          queryClient.invalidateQueries({ queryKey: boxKeys.lists() });
+          break;
+        case 'box.closed':
+        case 'box.reopened':
+        case 'box.updated':
+          if (!patchBoxLists(queryClient, event.data)) {
+            queryClient.invalidateQueries({ queryKey: boxKeys.lists() });
+          }
+          queryClient.invalidateQueries({ queryKey: boxKeys.detail(event.data.id) });
+          break;
+        case 'box.deleted':
+          patchBoxLists(queryClient, event.data, true);
+          queryClient.removeQueries({ queryKey: boxKeys.detail(event.data.id) });
+          break;
+        case 'piece.created':
+        case 'piece.deleted':
+        case 'pieces.moved':
+          refetchPieces();
+          break;
+        case 'stream.resync':
+          queryClient.invalidateQueries();
+          break;
+      }
+    };
+
+    for (const type of EVENT_TYPES) {
+      source.addEventListener(type, handleEvent as EventListener);
+    }
+
+    return () => {
+      if (piecesTimer) {
+        clearTimeout(piecesTimer);
+      }
+      source.close();
+    };
+  }, [queryClient]);
+};
@@ -6,8 +6,8 @@ import { piecesService } from '../services/piecesService';
 export const pieceKeys = {
   all: ['pieces'] as const,
   lists: () => [...pieceKeys.all, 'list'] as const,
-  list: (status?: PieceStatus, limit?: number, offset?: number) =>
-    [...pieceKeys.lists(), status, limit, offset] as const,
+  list: (status?: PieceStatus, limit?: number, offset?: number, withTotal?: boolean) =>
+    [...pieceKeys.lists(), status, limit, offset, withTotal] as const,
   details: () => [...pieceKeys.all, 'detail'] as const,
   detail: (id: string) => [...pieceKeys.details(), id] as const,
 };
@@ -16,11 +16,12 @@ export const pieceKeys = {
 export const usePieces = (
   status?: PieceStatus,
   limit = 100,
-  offset = 0
+  offset = 0,
+  withTotal = false
 ) => {
   return useQuery({
-    queryKey: pieceKeys.list(status, limit, offset),
-    queryFn: () => piecesService.list(status, limit, offset),
+    queryKey: pieceKeys.list(status, limit, offset, withTotal),
+    queryFn: () => piecesService.list(status, limit, offset, withTotal),
   });
 };
 
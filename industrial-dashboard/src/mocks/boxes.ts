@@ -3,6 +3,7 @@ import { Box, BoxDetail, BoxListResponse, BoxStatus } from '../types';
 export const mockBoxes: Box[] = [
   {
     id: 1,
+    partition: '',
     status: BoxStatus.CLOSED,
     opened_at: '2024-01-15T10:00:00Z',
     closed_at: '2024-01-15T10:50:00Z',
@@ -10,6 +11,7 @@ export const mockBoxes: Box[] = [
   },
   {
     id: 2,
+    partition: '',
     status: BoxStatus.OPEN,
     opened_at: '2024-01-15T10:50:00Z',
     closed_at: null,
@@ -30,6 +32,8 @@ export const listBoxes = async (status?: BoxStatus): Promise<BoxListResponse> =>
   return {
     items: filtered,
     total: filtered.length,
+    total_estimated: false,
+    next_cursor: null,
   };
 };
 
@@ -1,14 +1,30 @@
 // Cliente HTTP base
 import { API_BASE_URL } from '../constants/endpoints';
 
+// Versão dos dados gravada pela última escrita (cabeçalho X-Data-Version).
+// Enviada nas consultas em X-Min-Data-Version: com réplica de leitura, a API
+// só responde pela réplica se ela já tiver aplicado as escritas deste cliente
+const DATA_VERSION_HEADER = 'X-Data-Version';
+const MIN_DATA_VERSION_HEADER = 'X-Min-Data-Version';
+
 export class ApiClient {
   private baseURL: string;
+  private dataVersion: string | null = null;
 
   constructor(baseURL: string = API_BASE_URL) {
     this.baseURL = baseURL;
   }
 
+  private rememberDataVersion(response: Response): void {
+    const version = response.headers.get(DATA_VERSION_HEADER);
+    if (version) {
+      this.dataVersion = version;
+    }
+  }
+
   private async handleResponse<T>(response: Response): Promise<T> {
+    this.rememberDataVersion(response);
+
     // Status 204 (No Content) não tem body
     if (response.status === 204) {
       return undefined as T;
@@ -54,7 +70,9 @@ export class ApiClient {
 
   async get<T>(endpoint: string): Promise<T> {
     try {
-      const response = await fetch(`${this.baseURL}${endpoint}`);
+      const response = await fetch(`${this.baseURL}${endpoint}`, {
+        headers: this.dataVersion ? { [MIN_DATA_VERSION_HEADER]: this.dataVersion } : undefined,
+      });
       return this.handleResponse<T>(response);
     } catch (error) {
       if (error instanceof Error) {
@@ -6,7 +6,8 @@ export const piecesService = {
   list: async (
     status?: PieceStatus,
     limit = 100,
-    offset = 0
+    offset = 0,
+    withTotal = false
   ): Promise<PieceListResponse> => {
     // Constrói query string com parâmetros opcionais
     const params = new URLSearchParams();
@@ -15,6 +16,10 @@ export const piecesService = {
     }
     params.append('limit', limit.toString());
     params.append('offset', offset.toString());
+    // O total só é calculado pela API quando solicitado
+    if (withTotal) {
+      params.append('count', 'exact');
+    }
     
     const queryString = params.toString();
     const endpoint = queryString 
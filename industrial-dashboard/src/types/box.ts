@@ -7,6 +7,7 @@ export enum BoxStatus {
 
 export interface Box {
   id: number;
+  partition: string;      // Partição da caixa (ex.: cor); vazio sem particionamento
   status: BoxStatus;
   opened_at: string;      // ISO 8601 datetime
   closed_at: string | null;
@@ -19,7 +20,9 @@ export interface BoxDetail extends Box {
 
 export interface BoxListResponse {
   items: Box[];
-  total: number;
+  total: number | null;         // null quando não solicitado (count=none)
+  total_estimated: boolean;     // true se total for estimativa do banco
+  next_cursor: string | null;  // Cursor da próxima página (null se for a última)
 }
 
 export interface ReallocatedPieceInfo {
@@ -0,0 +1,37 @@
+import { Box } from './box';
+import { PieceStatus } from './piece';
+
+// Eventos enviados por GET /api/v1/events (Server-Sent Events)
+
+export interface PieceEventData {
+  id: string;
+  status: PieceStatus;
+  box_id?: number | null;
+  rejection_reasons?: string[];
+}
+
+export interface PiecesMovedData {
+  piece_ids: string[];
+  from_box_id: number;
+  to_box_id: number;
+}
+
+// Variação dos agregados do relatório final (apenas colunas alteradas)
+export interface ReportDeltaData {
+  total_aprovadas?: number;
+  total_reprovadas?: number;
+  motivo_peso?: number;
+  motivo_cor?: number;
+  motivo_comprimento?: number;
+  total_caixas?: number;
+}
+
+export type LiveEvent =
+  | { id: number; type: 'piece.created' | 'piece.deleted'; at: string; data: { pieces: PieceEventData[] } }
+  | { id: number; type: 'box.opened' | 'box.closed' | 'box.reopened' | 'box.updated'; at: string; data: Box }
+  | { id: number; type: 'box.deleted'; at: string; data: { id: number } }
+  | { id: number; type: 'pieces.moved'; at: string; data: PiecesMovedData }
+  | { id: number; type: 'report.delta'; at: string; data: ReportDeltaData }
+  | { id: null; type: 'stream.resync'; at: string; data: { dropped: number } };
+
+export type LiveEventType = LiveEvent['type'];
@@ -1,3 +1,4 @@
 export * from './piece';
 export * from './box';
 export * from './report';
+export * from './event';
@@ -31,9 +31,11 @@ export interface Piece {
 
 export interface PieceListResponse {
   items: Piece[];
-  total: number;
+  total: number | null;         // null quando não solicitado (count=none)
+  total_estimated: boolean;     // true se total for estimativa do banco
   limit: number;
   offset: number;
+  next_cursor: string | null;   // Cursor da próxima página (null se for a última)
 }
 
 export interface PieceDeleteResponse {